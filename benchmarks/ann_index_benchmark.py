@@ -0,0 +1,76 @@
+# ann_index_benchmark.py
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.ann_index import IndexConfig, apply_search_params, build_index
+
+# Each index type with the query-time settings to sweep.
+SWEEPS = (
+    (IndexConfig("flat"), "-", [None]),
+    (IndexConfig("ivf"), "nprobe", [1, 4, 16, 64]),
+    (IndexConfig("hnsw"), "ef_search", [16, 32, 64, 128]),
+    (IndexConfig("ivfpq"), "nprobe", [4, 16, 64]),
+)
+
+
+def clustered_vectors(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """
+    Returns unit vectors scattered around random centres, which, like sentence
+    embeddings, are far from uniformly distributed.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    """
+    Returns the fraction of the exact top-k neighbours that were found.
+    """
+    hits = sum(len(set(row_found) & set(row_expected)) for row_found, row_expected in zip(found, expected))
+    return hits / expected.size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare recall@k and query latency of the FAISS index types.")
+    parser.add_argument('--vectors', type=int, default=50_000, help="Number of indexed vectors.")
+    parser.add_argument('--queries', type=int, default=500, help="Number of queries.")
+    parser.add_argument('--dimension', type=int, default=384, help="Vector dimension (all-MiniLM-L6-v2 uses 384).")
+    parser.add_argument('--k', type=int, default=8, help="Neighbours retrieved per query.")
+    parser.add_argument('--nlist', type=int, default=256, help="IVF centroids.")
+    args = parser.parse_args()
+
+    data = clustered_vectors(args.vectors + args.queries, args.dimension, clusters=200, seed=0)
+    corpus, queries = data[:args.vectors], data[args.vectors:]
+    print(f"{args.vectors} vectors, {args.queries} queries, dimension {args.dimension}, k={args.k}")
+
+    exact_index, _ = build_index(corpus, IndexConfig("flat"))
+    _, expected = exact_index.search(queries, args.k)
+
+    print(f"{'index':>6} {'setting':>14} {'build s':>8} {'recall@k':>9} {'ms/query':>9}")
+    for base_config, knob, values in SWEEPS:
+        start = time.perf_counter()
+        index, config = build_index(corpus, base_config._replace(nlist=args.nlist))
+        build_seconds = time.perf_counter() - start
+        for value in values:
+            if value is not None:
+                config = config._replace(**{knob: value})
+                apply_search_params(index, config)
+            start = time.perf_counter()
+            _, found = index.search(queries, args.k)
+            per_query_ms = (time.perf_counter() - start) * 1000 / args.queries
+            setting = "exact" if value is None else f"{knob}={value}"
+            print(f"{config.index_type:>6} {setting:>14} {build_seconds:8.2f} "
+                  f"{recall_at_k(found, expected):9.3f} {per_query_ms:9.3f}")
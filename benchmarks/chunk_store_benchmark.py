@@ -0,0 +1,83 @@
+# chunk_store_benchmark.py
+
+import argparse
+import gc
+import os
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from benchmarks.synthetic_corpus import generate_corpus
+from data_persistance.chunk_store import ChunkStore
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+
+
+def retained_mb(build):
+    """
+    Returns what build() returns and the memory it still holds afterwards, in MB.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, retained
+
+
+def lookup_microseconds(docstore, chunk_ids) -> float:
+    start = time.perf_counter()
+    for chunk_id in chunk_ids:
+        docstore.search(chunk_id)
+    return (time.perf_counter() - start) / len(chunk_ids) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Compare the memory held by LangChain's InMemoryDocstore and by the columnar "
+                    "ChunkStore for the chunks of a synthetic corpus."
+    )
+    parser.add_argument('--files', type=int, default=3000, help="Synthetic markdown files.")
+    parser.add_argument('--chunk_size', type=int, default=200, help="Chunk size in characters.")
+    parser.add_argument('--lookups', type=int, default=20000, help="Chunks looked up to time search().")
+    args = parser.parse_args()
+
+    manager = VectorStoreManager(chunk_size=args.chunk_size, embeddings=HashingEmbedder())
+    documents = manager._parse_markdown_to_documents(generate_corpus(args.files))
+    # Ids and texts are held by the FAISS wrapper and the other indexes as well,
+    # so only what each docstore adds on top of them is measured.
+    chunk_ids = [str(uuid.uuid4()) for _ in documents]
+    texts = [document.page_content for document in documents]
+    metadatas = [document.metadata for document in documents]
+    del documents
+
+    def documents():
+        # Every chunk gets its own metadata dict, as each chunk's Document does on ingest.
+        return ((chunk_id, Document(id=chunk_id, page_content=text, metadata=dict(metadata)))
+                for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas))
+
+    sample = random.Random(0).sample(chunk_ids, min(args.lookups, len(chunk_ids)))
+    print(f"{len(chunk_ids)} chunks from {args.files} files; memory held by the docstore (MB):")
+    print(f"{'docstore':<16}{'built':>10}{'loaded':>10}{'bytes/chunk':>14}{'search µs':>12}")
+    for name, build in (("InMemoryDocstore", lambda: InMemoryDocstore(dict(documents()))),
+                        ("ChunkStore", lambda: ChunkStore.from_documents(documents()))):
+        docstore, built = retained_mb(build)
+        data = pickle.dumps(docstore)
+        del docstore
+        docstore, loaded = retained_mb(lambda: pickle.loads(data))
+        print(f"{name:<16}{built:>10.1f}{loaded:>10.1f}{built * 1024 * 1024 / len(chunk_ids):>14.0f}"
+              f"{lookup_microseconds(docstore, sample):>12.2f}")
+        del docstore, data
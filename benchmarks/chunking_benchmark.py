@@ -0,0 +1,79 @@
+# chunking_benchmark.py
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.pipeline_benchmark import directory_size_mb
+from benchmarks.synthetic_corpus import generate_corpus
+from data_persistance.document_persistance import DEFAULT_TOKEN_CHUNK_OVERLAP, VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder, SentenceTransformerBackend
+
+
+def measure(corpus, embeddings, chunk_unit: str, chunk_size, chunk_overlap: int, work_dir: str):
+    """
+    Builds and saves a store with one chunking setting and describes its chunks and index.
+    """
+    manager = VectorStoreManager(chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunk_unit=chunk_unit,
+                                 embeddings=embeddings)
+    start = time.perf_counter()
+    manager.build_vector_store_from_dict(corpus)
+    seconds = time.perf_counter() - start
+    index_dir = os.path.join(work_dir, f"{chunk_unit}_{manager.chunk_size}")
+    manager.save_local(index_dir)
+    tokens = np.array([embeddings.count_tokens(document["content"])
+                       for document in manager.get_all_documents_in_store()])
+    return {
+        "setting": f"{manager.chunk_size} {chunk_unit} / {manager.chunk_overlap}",
+        "vectors": len(tokens),
+        "mean_tokens": float(tokens.mean()),
+        "truncated": int((tokens > embeddings.token_limit).sum()),
+        "index_mb": directory_size_mb(index_dir),
+        "seconds": seconds,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Compare character chunking with token-budget chunking: vectors, chunk lengths "
+                    "in model tokens, chunks the model would truncate, and index size."
+    )
+    parser.add_argument('--files', type=int, default=300, help="Synthetic markdown files.")
+    parser.add_argument('--words', type=int, default=400, help="Approximate words per section.")
+    parser.add_argument('--char_sizes', type=int, nargs='+', default=[200, 1500],
+                        help="Character chunk sizes to compare (overlap is 10%%).")
+    parser.add_argument('--token_overlap', type=int, default=DEFAULT_TOKEN_CHUNK_OVERLAP,
+                        help="Overlap of token chunks, in tokens.")
+    parser.add_argument('--model', type=str, default=None,
+                        help="A sentence-transformers model whose tokenizer and embeddings to use. "
+                             "Defaults to the offline hashing embedder and its stand-in tokenizer.")
+    args = parser.parse_args()
+
+    embeddings = SentenceTransformerBackend(args.model) if args.model else HashingEmbedder()
+    corpus = generate_corpus(args.files, words_per_section=args.words)
+    work_dir = tempfile.mkdtemp(prefix="rag_chunking_")
+    try:
+        runs = [measure(corpus, embeddings, "characters", size, size // 10, work_dir) for size in args.char_sizes]
+        runs.append(measure(corpus, embeddings, "tokens", None, args.token_overlap, work_dir))
+    finally:
+        shutil.rmtree(work_dir)
+
+    baseline = runs[0]
+    print(f"{args.files} files, {embeddings.model_name}, token limit {embeddings.token_limit}")
+    print(f"{'setting':<24}{'vectors':>10}{'vs first':>10}{'tokens':>8}{'truncated':>11}"
+          f"{'index MB':>10}{'vs first':>10}{'build s':>9}")
+    for run in runs:
+        print(f"{run['setting']:<24}{run['vectors']:>10}{run['vectors'] / baseline['vectors']:>10.2f}"
+              f"{run['mean_tokens']:>8.0f}{run['truncated']:>11}{run['index_mb']:>10.1f}"
+              f"{run['index_mb'] / baseline['index_mb']:>10.2f}{run['seconds']:>9.1f}")
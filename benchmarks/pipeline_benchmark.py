@@ -0,0 +1,218 @@
+# pipeline_benchmark.py
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic_corpus import generate_corpus, generate_queries, write_corpus
+from data_persistance.ann_index import INDEX_TYPES, IndexConfig
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.search_processor import SearchProcessor
+
+RESULTS_SCHEMA_VERSION = 1
+
+# Whether a larger value of a result is better, for comparisons between runs.
+HIGHER_IS_BETTER = {
+    "files_per_second": True,
+    "chunks_per_second": True,
+    "peak_rss_mb": False,
+    "index_size_mb": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+# Tail latencies rest on a handful of samples, so they may move further before
+# they count as a regression: this many times the tolerance.
+TAIL_TOLERANCE_FACTOR = {"p95_ms": 2.0, "p99_ms": 2.0}
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process so far.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def directory_size_mb(directory_path: str) -> float:
+    return sum(entry.stat().st_size for entry in os.scandir(directory_path) if entry.is_file()) / (1024 * 1024)
+
+
+def latency_percentiles(call: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    """
+    Times each query on its own and returns p50/p95/p99 and the mean, in milliseconds.
+    """
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "mean_ms": float(np.mean(timings))}
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """
+    Builds a store over a synthetic corpus, saves it and times queries against it.
+    """
+    corpus = generate_corpus(args.files, sections_per_file=args.sections, header_depth=args.depth,
+                             words_per_section=args.words, seed=args.seed)
+    queries = generate_queries(corpus, args.queries, seed=args.seed)
+    work_dir = tempfile.mkdtemp(prefix="rag_benchmark_")
+    try:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        write_corpus(corpus, corpus_dir)
+        del corpus
+        rss_before_ingest = peak_rss_mb()
+
+        manager = VectorStoreManager(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                                     embeddings=HashingEmbedder(), parse_workers=args.parse_workers,
+                                     index_config=IndexConfig(index_type=args.index_type))
+        start = time.perf_counter()
+        manager.process_directory_and_build_store(corpus_dir)
+        ingest_seconds = time.perf_counter() - start
+        chunks = manager.vector_store.index.ntotal
+
+        index_dir = os.path.join(work_dir, "index")
+        manager.save_local(index_dir)
+
+        # Caches are disabled so every call does the full work.
+        searcher = SearchProcessor(manager.vector_store, manager.section_index,
+                                   query_cache_size=0, result_cache_size=0)
+        # One untimed query loads anything loaded lazily.
+        searcher.retrieve_and_reconstruct_sections(queries[0], k=args.k)
+        return {
+            "ingest": {
+                "files": args.files,
+                "chunks": chunks,
+                "seconds": ingest_seconds,
+                "files_per_second": args.files / ingest_seconds,
+                "chunks_per_second": chunks / ingest_seconds,
+                "peak_rss_mb": peak_rss_mb(),
+                "rss_before_ingest_mb": rss_before_ingest,
+                "index_size_mb": directory_size_mb(index_dir),
+            },
+            "query_vector_store": latency_percentiles(lambda query: searcher.query_vector_store(query, k=args.k),
+                                                      queries),
+            "retrieve_and_reconstruct_sections": latency_percentiles(
+                lambda query: searcher.retrieve_and_reconstruct_sections(query, k=args.k), queries
+            ),
+        }
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def run_isolated(args: argparse.Namespace) -> Dict:
+    """
+    Runs the benchmark in a fresh process, so that its peak RSS and warm-up are
+    not inherited from an earlier run.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_benchmark, args).result()
+
+
+def median_results(runs: List[Dict]) -> Dict:
+    """
+    Combines repeated runs into one result, taking the median of every value.
+    """
+    return {
+        group: {name: float(np.median([run[group][name] for run in runs])) for name in values}
+        for group, values in runs[0].items()
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Prints each compared result next to the baseline and returns the regressions:
+    results that got worse by more than `tolerance` (a fraction of the baseline),
+    widened for tail latencies by TAIL_TOLERANCE_FACTOR.
+    """
+    if current["config"] != baseline["config"]:
+        print("Warning: the baseline was run with a different configuration.")
+    regressions = []
+    for group, values in current["results"].items():
+        for name, value in values.items():
+            base = baseline["results"].get(group, {}).get(name)
+            if name not in HIGHER_IS_BETTER or not base:
+                continue
+            change = (value - base) / base
+            worse = -change if HIGHER_IS_BETTER[name] else change
+            flag = "REGRESSION" if worse > tolerance * TAIL_TOLERANCE_FACTOR.get(name, 1.0) else ""
+            print(f"{group + '.' + name:<45} {base:12.3f} -> {value:12.3f} ({change:+7.1%}) {flag}")
+            if flag:
+                regressions.append(f"{group}.{name}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Measure ingest throughput, memory, index size and query latency on a synthetic corpus. "
+                    "Runs offline: chunks are embedded with the deterministic hashing embedder."
+    )
+    parser.add_argument('--files', type=int, default=500, help="Synthetic markdown files.")
+    parser.add_argument('--sections', type=int, default=8, help="Headed sections per file.")
+    parser.add_argument('--depth', type=int, default=3, help="Deepest header level (1-6).")
+    parser.add_argument('--words', type=int, default=150, help="Approximate words per section.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the corpus and the queries.")
+    parser.add_argument('--chunk_size', type=int, default=200, help="Chunk size in characters.")
+    parser.add_argument('--chunk_overlap', type=int, default=20, help="Chunk overlap in characters.")
+    parser.add_argument('--parse_workers', type=int, default=0, help="Processes used to parse files.")
+    parser.add_argument('--index_type', type=str, choices=INDEX_TYPES, default="flat", help="FAISS index type.")
+    parser.add_argument('--queries', type=int, default=200, help="Queries timed per method.")
+    parser.add_argument('--k', type=int, default=4, help="Chunks retrieved per query.")
+    parser.add_argument('--repeats', type=int, default=3,
+                        help="Runs, each in a fresh process, whose median is reported; "
+                             "timings of single runs vary by 10-20%%.")
+    parser.add_argument('--output', type=str, default=None, help="Write the results to this JSON file.")
+    parser.add_argument('--compare', type=str, default=None,
+                        help="A results file of an earlier run. Exits with status 1 on a regression.")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Fraction by which a result may get worse before it counts as a regression.")
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "tolerance")}
+    print(f"Benchmarking {args.files} files x {args.sections} sections (depth {args.depth}), "
+          f"index {args.index_type}, {args.queries} queries")
+    results = {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": median_results([run_isolated(args) for _ in range(args.repeats)]),
+    }
+    print(json.dumps(results["results"], indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions.")
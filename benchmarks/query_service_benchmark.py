@@ -0,0 +1,79 @@
+# query_service_benchmark.py
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.query_service import QueryService
+from data_persistance.search_processor import SearchProcessor
+
+
+def build_searcher(files: int) -> SearchProcessor:
+    """
+    Builds an in-memory store over a synthetic corpus with the hashing embedder.
+    The result cache is disabled so every request is searched.
+    """
+    manager = VectorStoreManager(embeddings=HashingEmbedder())
+    manager.build_vector_store_from_dict({
+        f"doc_{i}": (f"# Document {i}\n\n## Setup {i}\n\nInstall component {i} with option {i % 13}.\n\n"
+                     f"## Usage {i}\n\nRun the tool on dataset {i % 17} and compare the output with run {i % 5}.")
+        for i in range(files)
+    })
+    return SearchProcessor(manager.vector_store, manager.section_index, result_cache_size=0, query_cache_size=0)
+
+
+async def client(port: int, requests: int, client_id: int) -> None:
+    """
+    Sends `requests` queries one after the other over one keep-alive connection.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for i in range(requests):
+        body = json.dumps({"query": f"how do I run dataset {(client_id * 31 + i) % 17}", "k": 4}).encode()
+        writer.write(f"POST /query HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        await reader.readline()
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+    writer.close()
+
+
+async def measure(searcher: SearchProcessor, clients: int, requests: int, max_batch_size: int, max_wait_ms: float):
+    service = QueryService(searcher, port=0, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    await service.start()
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(service.port, requests, i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+        return clients * requests / elapsed, service.batcher.stats()["mean_batch_size"]
+    finally:
+        await service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure query service throughput with and without micro-batching.")
+    parser.add_argument('--files', type=int, default=2000, help="Synthetic markdown files in the store.")
+    parser.add_argument('--clients', type=int, default=64, help="Concurrent keep-alive clients.")
+    parser.add_argument('--requests', type=int, default=50, help="Requests sent by each client.")
+    parser.add_argument('--max_wait_ms', type=float, default=2.0, help="Batching wait for the batched runs.")
+    args = parser.parse_args()
+
+    searcher = build_searcher(args.files)
+    print(f"{args.clients} clients x {args.requests} requests, store of {searcher.vector_store.index.ntotal} chunks")
+    # The clients share the service's event loop, so this is a lower bound on server throughput.
+    for max_batch_size in (1, 8, 32, 64):
+        qps, mean_batch = asyncio.run(measure(searcher, args.clients, args.requests, max_batch_size, args.max_wait_ms))
+        print(f"max_batch_size={max_batch_size:>3}: {qps:8.0f} queries/s (mean batch {mean_batch:5.1f})")
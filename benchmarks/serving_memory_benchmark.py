@@ -0,0 +1,110 @@
+# serving_memory_benchmark.py
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic_corpus import generate_corpus, generate_queries
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+
+
+def memory_mb() -> Dict[str, float]:
+    """
+    Returns this process's resident, proportional (shared pages divided among
+    the processes mapping them) and private memory. Linux only.
+    """
+    fields = {}
+    with open('/proc/self/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def worker(layout: str, mode: str, folder_path: str, queries, baseline_ready, loaded, results) -> None:
+    """
+    Loads the store in one layout, answers the queries in one search mode, and
+    reports its memory once every worker has done the same, so shared pages are
+    split among all of them.
+    """
+    from data_persistance.search_processor import SearchProcessor
+    from data_persistance.serving_store import ServingStore
+
+    before = memory_mb()
+    baseline_ready.wait()
+    if layout == "pickle":
+        store = VectorStoreManager.load_local(folder_path, embeddings=HashingEmbedder())
+    else:
+        store = ServingStore.open(folder_path, embeddings=HashingEmbedder())
+    searcher = SearchProcessor(store.vector_store, store.section_index, bm25_index=store.bm25_index,
+                               search_mode=mode, metadata_index=store.metadata_index)
+    for query in queries:
+        searcher.retrieve_and_reconstruct_sections(query, k=4)
+    loaded.wait()
+    after = memory_mb()
+    results.put({key: after[key] - before[key] for key in after})
+    # Stay alive until every worker has measured.
+    loaded.wait()
+
+
+def measure(layout: str, mode: str, folder_path: str, workers: int, queries) -> Dict[str, float]:
+    context = multiprocessing.get_context("spawn")
+    baseline_ready, loaded = context.Barrier(workers), context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker,
+                                 args=(layout, mode, folder_path, queries, baseline_ready, loaded, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    deltas = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {key: sum(delta[key] for delta in deltas) for key in deltas[0]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Compare the memory that worker processes need to serve a store loaded from "
+                    "the pickled save_local layout and from the memory-mapped serving layout."
+    )
+    parser.add_argument('--files', type=int, default=1000, help="Synthetic markdown files in the store.")
+    parser.add_argument('--workers', type=int, default=4, help="Worker processes serving the store.")
+    parser.add_argument('--queries', type=int, default=200, help="Queries answered by each worker.")
+    parser.add_argument('--modes', nargs='+', choices=["vector", "lexical", "hybrid"], default=["vector", "hybrid"],
+                        help="Search modes to measure, each with its own set of workers.")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.files)
+    queries = generate_queries(corpus, args.queries)
+    manager = VectorStoreManager(embeddings=HashingEmbedder())
+    manager.build_vector_store_from_dict(corpus)
+    work_dir = tempfile.mkdtemp(prefix="rag_serving_")
+    try:
+        pickle_dir, serving_dir = os.path.join(work_dir, "pickle"), os.path.join(work_dir, "serving")
+        manager.save_local(pickle_dir)
+        manager.export_serving_store(serving_dir)
+        del manager, corpus
+        print(f"{args.workers} workers, store of {args.files} files; memory added by loading and querying (MB):")
+        print(f"{'layout':<10}{'mode':<10}{'RSS':>10}{'PSS':>10}{'private':>10}")
+        for mode in args.modes:
+            for layout, folder_path in (("pickle", pickle_dir), ("serving", serving_dir)):
+                totals = measure(layout, mode, folder_path, args.workers, queries)
+                print(f"{layout:<10}{mode:<10}{totals['rss']:>10.1f}{totals['pss']:>10.1f}{totals['private']:>10.1f}")
+    finally:
+        shutil.rmtree(work_dir)
@@ -0,0 +1,93 @@
+# startup_benchmark.py
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+DEFAULT_TARGET_MS = 200.0
+
+# Builds and loads a store in a fresh interpreter, as the CLIs do.
+_LOAD_INDEX_SNIPPET = (
+    "import sys; from data_persistance.document_persistance import VectorStoreManager; "
+    "VectorStoreManager.load_local(sys.argv[1])"
+)
+
+
+def build_sample_index(folder_path: str) -> None:
+    """
+    Saves a small store built with the hashing embedder, so no model is downloaded.
+    """
+    from data_persistance.document_persistance import VectorStoreManager
+    from data_persistance.embedding_backends import HashingEmbedder
+
+    manager = VectorStoreManager(embeddings=HashingEmbedder())
+    manager.build_vector_store_from_dict({
+        f"doc_{i}": f"# Document {i}\n\n## Setup\n\nInstall step {i}.\n\n## Usage\n\nRun the tool on input {i}."
+        for i in range(20)
+    })
+    manager.save_local(folder_path)
+
+
+def wall_time_ms(command: List[str], repeat: int) -> float:
+    """
+    Returns the best-of-`repeat` wall time of a command in milliseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def import_times_ms(command: List[str]) -> List[Tuple[str, float]]:
+    """
+    Runs a command under `python -X importtime` and returns the top-level imports
+    with their cumulative import time in milliseconds, slowest first.
+    """
+    result = subprocess.run([command[0], '-X', 'importtime'] + command[1:], cwd=project_root,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    totals: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented; only top-level ones are counted, so no time is counted twice.
+        if not name.startswith('  '):
+            totals[name.strip()] = totals.get(name.strip(), 0.0) + int(cumulative) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure CLI start-up time and the imports it is spent on.")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of timed runs per command; the best is reported.")
+    parser.add_argument('--top', type=int, default=8, help="Number of slowest top-level imports to list per command.")
+    parser.add_argument('--target_ms', type=float, default=DEFAULT_TARGET_MS, help="Start-up time budget per command.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_path:
+        build_sample_index(index_path)
+        commands = {
+            "interpreter only": [sys.executable, '-c', 'pass'],
+            "main_pipeline --help": [sys.executable, 'main_pipeline.py', '--help'],
+            "search_processor --help": [sys.executable, '-m', 'data_persistance.search_processor', '--help'],
+            "import document_persistance": [sys.executable, '-c', 'import data_persistance.document_persistance'],
+            "load persisted index": [sys.executable, '-c', _LOAD_INDEX_SNIPPET, index_path],
+        }
+
+        for label, command in commands.items():
+            elapsed = wall_time_ms(command, args.repeat)
+            verdict = "ok" if elapsed <= args.target_ms else "over budget"
+            print(f"{label}: {elapsed:.0f} ms ({verdict}, target {args.target_ms:.0f} ms)")
+            for module, module_ms in import_times_ms(command)[:args.top]:
+                print(f"    {module_ms:8.1f} ms  {module}")
@@ -0,0 +1,121 @@
+# synthetic_corpus.py
+
+import os
+import random
+from typing import Dict, List
+
+# Syllables combined into a fixed vocabulary, so every run with the same seed
+# produces the same corpus without any word list on disk.
+_SYLLABLES = ("ka", "ro", "mi", "tan", "vel", "os", "ur", "pe", "lin", "da", "qui", "sor", "ne", "bal", "fi", "go")
+_VOCABULARY_SIZE = 5000
+
+
+def _vocabulary(rng: random.Random) -> List[str]:
+    words = set()
+    while len(words) < _VOCABULARY_SIZE:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _paragraph(rng: random.Random, vocabulary: List[str], words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(6, 18))
+        sentence = " ".join(rng.choice(vocabulary) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def _section_body(rng: random.Random, vocabulary: List[str], words: int) -> str:
+    """
+    Prose with the occasional list, emphasis or code fence, so the cleaner has
+    the markdown syntax it sees in real documents to remove.
+    """
+    blocks = []
+    while words > 0:
+        length = min(words, rng.randint(30, 90))
+        kind = rng.random()
+        if kind < 0.15:
+            items = [_paragraph(rng, vocabulary, max(1, length // 4)) for _ in range(4)]
+            blocks.append("\n".join(f"* {item}" for item in items))
+        elif kind < 0.25:
+            command = " ".join(rng.choice(vocabulary) for _ in range(4))
+            blocks.append(f"```bash\n{command} --{rng.choice(vocabulary)}\n```")
+        else:
+            text = _paragraph(rng, vocabulary, length)
+            emphasised = rng.choice(vocabulary)
+            blocks.append(text.replace(f" {emphasised} ", f" **{emphasised}** ", 1))
+        words -= length
+    return "\n\n".join(blocks)
+
+
+def generate_corpus(files: int, sections_per_file: int = 8, header_depth: int = 3,
+                    words_per_section: int = 150, seed: int = 0) -> Dict[str, str]:
+    """
+    Generates a deterministic markdown corpus.
+
+    Each file has a "# " page title followed by sections whose header levels
+    range from 2 to header_depth, nested the way real documentation nests them
+    (a level never increases by more than one from the previous header).
+
+    Args:
+        files (int): The number of files.
+        sections_per_file (int): The number of headed sections per file.
+        header_depth (int): The deepest header level used, between 1 and 6.
+            1 gives files with a title and no section headers.
+        words_per_section (int): The approximate number of words per section.
+        seed (int): The random seed; the same arguments always give the same corpus.
+
+    Returns:
+        A dictionary mapping file names (without .md) to markdown content, as
+        MarkdownProcessor.read_markdown_files_from_directory returns.
+
+    Raises:
+        ValueError: If header_depth is not between 1 and 6.
+    """
+    if not 1 <= header_depth <= 6:
+        raise ValueError("header_depth must be between 1 and 6.")
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng)
+    corpus = {}
+    for file_number in range(files):
+        title = " ".join(rng.choice(vocabulary) for _ in range(3)).title()
+        parts = [f"# {title}", _paragraph(rng, vocabulary, 40)]
+        level = 1
+        for _ in range(sections_per_file if header_depth > 1 else 0):
+            level = rng.randint(2, min(header_depth, level + 1))
+            heading = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3))).title()
+            parts.append(f"{'#' * level} {heading}")
+            parts.append(_section_body(rng, vocabulary, words_per_section))
+        if header_depth == 1:
+            parts.append(_section_body(rng, vocabulary, words_per_section * sections_per_file))
+        corpus[f"doc_{file_number:06d}"] = "\n\n".join(parts) + "\n"
+    return corpus
+
+
+def generate_queries(corpus: Dict[str, str], count: int, words: int = 6, seed: int = 0) -> List[str]:
+    """
+    Draws queries from runs of words in the corpus, so every query has relevant chunks.
+    """
+    rng = random.Random(seed)
+    file_names = sorted(corpus)
+    queries = []
+    while len(queries) < count:
+        tokens = [token.strip("*.,`") for token in corpus[rng.choice(file_names)].split()
+                  if token.strip("*.,`").isalpha()]
+        if len(tokens) < words:
+            continue
+        start = rng.randrange(len(tokens) - words + 1)
+        queries.append(" ".join(tokens[start:start + words]))
+    return queries
+
+
+def write_corpus(corpus: Dict[str, str], directory_path: str) -> None:
+    """
+    Writes each file of a corpus as <name>.md under directory_path.
+    """
+    os.makedirs(directory_path, exist_ok=True)
+    for file_name, content in corpus.items():
+        with open(os.path.join(directory_path, f"{file_name}.md"), 'w', encoding='utf-8') as f:
+            f.write(content)
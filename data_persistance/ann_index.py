@@ -0,0 +1,212 @@
+# ann_index.py
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# To make this module runnable, you might need to install the following packages:
+# pip install faiss-cpu numpy
+import faiss
+import numpy as np
+
+# --- Index types ---
+# flat:  exact search, the LangChain default. Search cost is linear in the chunk count.
+# ivf:   vectors are bucketed under trained centroids; nprobe buckets are scanned per query.
+# hnsw:  a navigable small-world graph; efSearch sets the size of the search frontier.
+# ivfpq: ivf with product-quantized vectors, roughly pq_m bytes per vector instead of 4 * dim.
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+# faiss asks for at least this many training points per centroid.
+_MIN_POINTS_PER_CENTROID = 39
+
+# A filter matching at most this many chunks of an approximate index is searched
+# exactly over just those vectors: a graph or bucket walk restricted to a small
+# subset would mostly visit rejected neighbours and could miss the allowed ones.
+EXACT_FILTER_MAX_CHUNKS = 2048
+
+
+class IndexConfig(NamedTuple):
+    """
+    The FAISS index type of a store and its build and search parameters.
+    Only the parameters of the chosen index type are used.
+    """
+    index_type: str = "flat"
+    # ivf / ivfpq
+    nlist: int = 1024
+    nprobe: int = 8
+    # hnsw
+    hnsw_m: int = 32
+    ef_construction: int = 40
+    ef_search: int = 64
+    # ivfpq
+    pq_m: int = 16
+    pq_bits: int = 8
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> 'IndexConfig':
+        return cls(**(data or {}))
+
+    def validate(self, dimension: Optional[int] = None) -> None:
+        """
+        Raises:
+            ValueError: If the index type is unknown or the parameters do not fit the vectors.
+        """
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}'. Expected one of {', '.join(INDEX_TYPES)}.")
+        if self.index_type == "ivfpq" and dimension is not None and dimension % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dimension}.")
+
+
+def is_exact(index: faiss.Index) -> bool:
+    """
+    Returns whether an index is the exact flat index LangChain builds.
+    """
+    return isinstance(index, faiss.IndexFlat)
+
+
+def apply_search_params(index: faiss.Index, config: IndexConfig) -> None:
+    """
+    Sets the query-time knobs (nprobe, efSearch) of an index from a config.
+    """
+    if config.index_type in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(index).nprobe = config.nprobe
+    elif config.index_type == "hnsw":
+        index.hnsw.efSearch = config.ef_search
+
+
+def search_params(index: faiss.Index) -> Tuple[int, ...]:
+    """
+    Returns the query-time knobs an index currently searches with: (nprobe,) for
+    IVF, (efSearch,) for HNSW, and () for an exact index.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        return (index.hnsw.efSearch,)
+    if isinstance(index, faiss.IndexIVF):
+        return (index.nprobe,)
+    return ()
+
+
+def _selector_params(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """
+    Wraps a selector in search parameters that keep the index's own nprobe or
+    efSearch, since the per-search parameters otherwise fall back to the defaults.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def filtered_search(index: faiss.Index, vectors: np.ndarray, k: int,
+                    allowed_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Searches an index for the k nearest neighbours among the given positions only.
+
+    The restriction is applied inside the search through an ID selector over a
+    position bitmap, so the index skips other vectors instead of returning them
+    to be filtered out afterwards. Small subsets of an approximate index are
+    searched exactly instead (see EXACT_FILTER_MAX_CHUNKS).
+
+    Returns:
+        Distances and positions as index.search does, padded with -1.
+    """
+    count = len(vectors)
+    if not len(allowed_positions):
+        return np.full((count, k), np.inf, dtype=np.float32), np.full((count, k), -1, dtype=np.int64)
+
+    if not is_exact(index) and len(allowed_positions) <= EXACT_FILTER_MAX_CHUNKS:
+        subset = index.reconstruct_batch(allowed_positions)
+        found = min(k, len(allowed_positions))
+        distances, subset_positions = faiss.knn(vectors, subset, found, metric=index.metric_type)
+        padded_distances = np.full((count, k), np.inf, dtype=np.float32)
+        padded_positions = np.full((count, k), -1, dtype=np.int64)
+        padded_distances[:, :found] = distances
+        padded_positions[:, :found] = np.where(subset_positions >= 0, allowed_positions[subset_positions], -1)
+        return padded_distances, padded_positions
+
+    allowed = np.zeros(index.ntotal, dtype=bool)
+    allowed[allowed_positions] = True
+    # The selector reads this buffer during the search, so it must outlive it.
+    bitmap = np.packbits(allowed, bitorder='little')
+    selector = faiss.IDSelectorBitmap(index.ntotal, faiss.swig_ptr(bitmap))
+    return index.search(vectors, k, params=_selector_params(index, selector))
+
+
+def build_index(vectors: np.ndarray, config: IndexConfig) -> Tuple[faiss.Index, IndexConfig]:
+    """
+    Trains an index of the configured type on `vectors` and adds them, in order.
+
+    Centroid and codebook sizes are capped for small corpora, which do not have
+    enough points to train the configured ones.
+
+    Returns:
+        The index, and the config with the parameters that were actually used.
+    """
+    count, dimension = vectors.shape
+    config.validate(dimension)
+    if config.index_type == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    elif config.index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+    else:
+        config = config._replace(nlist=max(1, min(config.nlist, count // _MIN_POINTS_PER_CENTROID)))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if config.index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dimension, config.nlist)
+        else:
+            config = config._replace(pq_bits=max(1, min(config.pq_bits, int(math.log2(max(count, 2))))))
+            index = faiss.IndexIVFPQ(quantizer, dimension, config.nlist, config.pq_m, config.pq_bits)
+        index.train(vectors)
+        # Lets chunks be reconstructed (and so deleted) by position.
+        index.make_direct_map()
+    apply_search_params(index, config)
+    index.add(vectors)
+    return index, config
+
+
+def convert_store_index(vector_store, config: IndexConfig) -> IndexConfig:
+    """
+    Replaces the flat index of a LangChain FAISS store by one of the configured
+    type, built from the same vectors in the same positions.
+
+    Returns:
+        The config with the parameters that were actually used.
+    """
+    flat_index = vector_store.index
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    vector_store.index, config = build_index(vectors, config)
+    return config
+
+
+def delete_from_store(vector_store, ids: Iterable[str]) -> None:
+    """
+    Removes chunks by docstore id from a LangChain FAISS store of any index type.
+
+    LangChain's delete relies on the index renumbering positions after a removal,
+    which only the flat index does (HNSW cannot remove at all). Other indexes
+    are rebuilt from their remaining vectors under the same training, so deletes
+    should be batched.
+    """
+    ids = set(ids)
+    if is_exact(vector_store.index):
+        vector_store.delete(list(ids))
+        return
+
+    index = vector_store.index
+    index_to_docstore_id = vector_store.index_to_docstore_id
+    keep: List[int] = [position for position in range(index.ntotal) if index_to_docstore_id[position] not in ids]
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    if keep:
+        rebuilt.add(index.reconstruct_batch(np.asarray(keep, dtype=np.int64)))
+    vector_store.index = rebuilt
+    from data_persistance.chunk_store import document_mapping
+    stored = document_mapping(vector_store.docstore)
+    vector_store.docstore.delete([chunk_id for chunk_id in ids if chunk_id in stored])
+    vector_store.index_to_docstore_id = {
+        new_position: index_to_docstore_id[old_position] for new_position, old_position in enumerate(keep)
+    }
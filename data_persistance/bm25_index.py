@@ -0,0 +1,274 @@
+# bm25_index.py
+
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+BM25_INDEX_FILE_NAME = "bm25.npz"
+
+# Identifiers, error codes and commands ("ERR_CONN_42", "faiss-cpu", "v1.2",
+# "src/main.py") are kept whole and are also indexed by their parts.
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:[-.:/][a-z0-9_]+)*")
+_PART_PATTERN = re.compile(r"[a-z0-9]+")
+_MAX_TOKEN_LENGTH = 64
+
+# Deleted chunks stay in the postings until this fraction of slots is dead.
+_COMPACT_DEAD_FRACTION = 0.25
+
+# (live chunk count, total length in terms, document frequency per query term)
+TermStatistics = Tuple[int, int, Dict[str, int]]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lower-case terms for BM25.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if len(token) > _MAX_TOKEN_LENGTH:
+            continue
+        terms.append(token)
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1 or (parts and parts[0] != token):
+            terms.extend(parts)
+    return terms
+
+
+def combine_statistics(statistics: Iterable[TermStatistics]) -> TermStatistics:
+    """
+    Adds up the term statistics of indexes over disjoint parts of one corpus
+    into the statistics of the whole corpus.
+    """
+    live_count, total_length, frequencies = 0, 0, Counter()
+    for count, length, part_frequencies in statistics:
+        live_count += count
+        total_length += length
+        frequencies.update(part_frequencies)
+    return live_count, total_length, dict(frequencies)
+
+
+class BM25Index:
+    """
+    An in-process BM25 inverted index over chunk ids.
+
+    Each term has a postings list of chunk slots and term frequencies, stored as
+    compact uint32 arrays that are scored with numpy without copying. It is kept
+    alongside the vector store as chunks are added and deleted: deletions leave
+    dead slots that are skipped when scoring and compacted away in bulk.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initializes an empty index.
+
+        Args:
+            k1 (float): Term frequency saturation.
+            b (float): Document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self._term_ids: Dict[str, int] = {}
+        self._posting_slots: List[array] = []
+        self._posting_tfs: List[array] = []
+        # slot -> chunk id (None once deleted), and slot -> number of terms
+        self._chunk_ids: List[Optional[str]] = []
+        self._doc_lengths = array('I')
+        self._slot_of: Dict[str, int] = {}
+        self._dead_slots = array('I')
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def add(self, chunk_id: str, text: str) -> None:
+        slot = len(self._chunk_ids)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._term_ids[term] = len(self._posting_slots)
+                self._posting_slots.append(array('I'))
+                self._posting_tfs.append(array('I'))
+            self._posting_slots[term_id].append(slot)
+            self._posting_tfs[term_id].append(tf)
+        length = sum(counts.values())
+        self._chunk_ids.append(chunk_id)
+        self._doc_lengths.append(length)
+        self._slot_of[chunk_id] = slot
+        self._total_length += length
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        for chunk_id in chunk_ids:
+            slot = self._slot_of.pop(chunk_id, None)
+            if slot is None:
+                continue
+            self._chunk_ids[slot] = None
+            self._total_length -= self._doc_lengths[slot]
+            self._dead_slots.append(slot)
+        if len(self._dead_slots) > _COMPACT_DEAD_FRACTION * len(self._chunk_ids):
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Drops dead slots and empty terms, renumbering the remaining slots in order.
+        """
+        live = np.array([chunk_id is not None for chunk_id in self._chunk_ids], dtype=bool)
+        new_slot = np.cumsum(live, dtype=np.int64) - 1
+        term_ids: Dict[str, int] = {}
+        posting_slots: List[array] = []
+        posting_tfs: List[array] = []
+        for term, term_id in self._term_ids.items():
+            slots = np.frombuffer(self._posting_slots[term_id], dtype=np.uint32)
+            keep = live[slots]
+            if not keep.any():
+                continue
+            term_ids[term] = len(posting_slots)
+            posting_slots.append(array('I', new_slot[slots[keep]].astype(np.uint32).tobytes()))
+            posting_tfs.append(array('I', np.frombuffer(self._posting_tfs[term_id], dtype=np.uint32)[keep].tobytes()))
+        self._term_ids, self._posting_slots, self._posting_tfs = term_ids, posting_slots, posting_tfs
+        self._chunk_ids = [chunk_id for chunk_id in self._chunk_ids if chunk_id is not None]
+        self._doc_lengths = array('I', np.frombuffer(self._doc_lengths, dtype=np.uint32)[live].tobytes())
+        self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(self._chunk_ids)}
+        self._dead_slots = array('I')
+
+    # --- Storage access ---
+    # search and term_statistics read the index only through these, so
+    # serving_store.MappedBM25Index can score postings mapped from a file.
+
+    def _postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns the slots holding a term and the term's frequency in each, or None.
+        """
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            return None
+        return (np.frombuffer(self._posting_slots[term_id], dtype=np.uint32),
+                np.frombuffer(self._posting_tfs[term_id], dtype=np.uint32))
+
+    def _slot_lengths(self) -> np.ndarray:
+        return np.frombuffer(self._doc_lengths, dtype=np.uint32)
+
+    def _slot(self, chunk_id: str) -> Optional[int]:
+        return self._slot_of.get(chunk_id)
+
+    def _chunk_id(self, slot: int) -> str:
+        return self._chunk_ids[slot]
+
+    def term_statistics(self, query: str) -> TermStatistics:
+        """
+        Returns the live chunk count, their total length in terms and the
+        document frequency of each term of the query, which BM25 scores
+        depend on besides the chunks themselves.
+        """
+        frequencies = {}
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is not None:
+                frequencies[term] = len(postings[0])
+        return len(self), self._total_length, frequencies
+
+    def search(self, query: str, k: int, allowed_ids: Optional[Iterable[str]] = None,
+               statistics: Optional[TermStatistics] = None) -> List[Tuple[str, float]]:
+        """
+        Returns up to k (chunk id, BM25 score) pairs, best first. Chunks sharing
+        no term with the query are not returned.
+
+        Args:
+            query (str): The text to search for.
+            k (int): The number of results to return.
+            allowed_ids (Optional[Iterable[str]]): If given, only these chunks are ranked.
+            statistics (Optional[TermStatistics]): Corpus statistics to score with
+                instead of this index's own (see combine_statistics), so the scores
+                of indexes over parts of one corpus can be compared.
+        """
+        if not len(self) or k < 1:
+            return []
+        live_count, total_length, frequencies = statistics or self.term_statistics(query)
+        average_length = total_length / live_count or 1.0
+        lengths = self._slot_lengths()
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            slots, tfs = postings[0], postings[1].astype(np.float32)
+            document_frequency = frequencies[term]
+            idf = math.log(1 + (live_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            norms = self.k1 * (1 - self.b + self.b * lengths[slots] / average_length)
+            scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + norms)
+        if self._dead_slots:
+            scores[np.frombuffer(self._dead_slots, dtype=np.uint32)] = 0
+        if allowed_ids is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[[slot for slot in map(self._slot, allowed_ids) if slot is not None]] = True
+            scores[~allowed] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(self._chunk_id(slot), float(scores[slot])) for slot in candidates.tolist()]
+
+    @classmethod
+    def from_docstore(cls, docstore_dict: Mapping) -> 'BM25Index':
+        """
+        Builds an index from an existing docstore, in docstore insertion order.
+        """
+        index = cls()
+        for chunk_id, document in docstore_dict.items():
+            index.add(chunk_id, document.page_content)
+        return index
+
+    def slots(self) -> Tuple[List[Optional[str]], np.ndarray]:
+        """
+        Returns the chunk id of each slot (None for a deleted chunk) and its length in terms.
+        """
+        return self._chunk_ids, self._slot_lengths()
+
+    def iter_postings(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """
+        Yields each term with the slots holding it and its frequency in each.
+        """
+        for term in self._term_ids:
+            yield (term,) + self._postings(term)
+
+    def save(self, file_path: str) -> None:
+        """
+        Writes the index as flat arrays: the postings of all terms back to back,
+        with the offset of each term's postings.
+        """
+        if self._dead_slots:
+            self._compact()
+        offsets = np.zeros(len(self._posting_slots) + 1, dtype=np.int64)
+        np.cumsum([len(slots) for slots in self._posting_slots], out=offsets[1:])
+        np.savez(
+            file_path,
+            terms=np.array(list(self._term_ids), dtype=str),
+            offsets=offsets,
+            slots=np.frombuffer(b"".join(slots.tobytes() for slots in self._posting_slots), dtype=np.uint32),
+            tfs=np.frombuffer(b"".join(tfs.tobytes() for tfs in self._posting_tfs), dtype=np.uint32),
+            chunk_ids=np.array(self._chunk_ids, dtype=str),
+            doc_lengths=np.frombuffer(self._doc_lengths, dtype=np.uint32),
+            params=np.array([self.k1, self.b]),
+        )
+
+    @classmethod
+    def load(cls, file_path: str) -> 'BM25Index':
+        with np.load(file_path) as data:
+            k1, b = data["params"]
+            index = cls(k1=float(k1), b=float(b))
+            offsets, slots, tfs = data["offsets"], data["slots"], data["tfs"]
+            for term_id, term in enumerate(data["terms"].tolist()):
+                start, end = offsets[term_id], offsets[term_id + 1]
+                index._term_ids[term] = term_id
+                index._posting_slots.append(array('I', slots[start:end].tobytes()))
+                index._posting_tfs.append(array('I', tfs[start:end].tobytes()))
+            index._chunk_ids = data["chunk_ids"].tolist()
+            index._doc_lengths = array('I', data["doc_lengths"].tobytes())
+        index._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(index._chunk_ids)}
+        index._total_length = sum(index._doc_lengths)
+        return index
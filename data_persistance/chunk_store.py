@@ -0,0 +1,242 @@
+# chunk_store.py
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+# To make this module runnable, you might need to install the following packages:
+# pip install langchain-community
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+# --- Chunk columns ---
+# The metadata fields VectorStoreManager gives every chunk, in the order they
+# appear in a chunk's metadata. String fields repeat across the chunks of a
+# file or section, so each is stored as one int32 code per chunk into a table
+# of its distinct values; integer fields are stored as int64 arrays. A value of
+# another type, and any other metadata key, is kept in a per-chunk dict, for
+# the chunks that have one only.
+STRING_FIELDS = ("section_name", "section_path", "page_title", "file_name", "source")
+INTEGER_FIELDS = ("section_index", "section_level", "parent_section_index", "chunk_index", "start_index", "end_index")
+# The code of a string field, or the value of an integer field, a chunk does not have.
+_ABSENT_CODE = -1
+_ABSENT_INTEGER = -(2 ** 63)
+# Deleted rows are compacted away once they make up this share of the store.
+_COMPACT_FRACTION = 0.5
+
+
+class _ValueTable:
+    """
+    The distinct values of one string column and their codes.
+    """
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ChunkStore(Docstore, AddableMixin, Mapping):
+    """
+    A LangChain docstore that keeps chunks in columns instead of one Document
+    and metadata dict per chunk.
+
+    Each chunk is a row: its text, a code per string field and a value per
+    integer field, all addressed by the row number. Chunk ids are mapped to
+    rows once, and a Document is only built when a chunk is looked up, so
+    the store holds a few bytes of metadata per chunk however many chunks
+    share a file, section or page title.
+
+    It is also a read-only Mapping of chunk id to Document, in insertion
+    order, like the dict LangChain's InMemoryDocstore keeps.
+    """
+
+    def __init__(self):
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: List[Optional[str]] = []
+        self._tables = {field: _ValueTable() for field in STRING_FIELDS}
+        self._codes = {field: array('i') for field in STRING_FIELDS}
+        self._integers = {field: array('q') for field in INTEGER_FIELDS}
+        self._extras: Dict[int, Dict] = {}
+        self._deleted = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[str]:
+        return (chunk_id for chunk_id in self._ids if chunk_id is not None)
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return chunk_id in self._rows
+
+    def __getitem__(self, chunk_id: str) -> Document:
+        return self._document(self._rows[chunk_id])
+
+    def _metadata(self, row: int) -> Dict:
+        metadata = {}
+        for field in STRING_FIELDS:
+            code = self._codes[field][row]
+            if code != _ABSENT_CODE:
+                metadata[field] = self._tables[field].values[code]
+        for field in INTEGER_FIELDS:
+            value = self._integers[field][row]
+            if value != _ABSENT_INTEGER:
+                metadata[field] = value
+        extras = self._extras.get(row)
+        if extras:
+            metadata.update(extras)
+        return metadata
+
+    def _document(self, row: int) -> Document:
+        return Document(id=self._ids[row], page_content=self._texts[row], metadata=self._metadata(row))
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self._document(row)
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        Appends chunks, in the order given.
+
+        Raises:
+            ValueError: If a chunk id is already in the store.
+        """
+        overlapping = set(texts).intersection(self._rows)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for chunk_id, document in texts.items():
+            self._append(chunk_id, document.page_content, document.metadata)
+
+    def _append(self, chunk_id: str, text: str, metadata: Mapping) -> None:
+        row = len(self._ids)
+        self._ids.append(chunk_id)
+        self._rows[chunk_id] = row
+        self._texts.append(text)
+        for field in STRING_FIELDS:
+            self._codes[field].append(_ABSENT_CODE)
+        for field in INTEGER_FIELDS:
+            self._integers[field].append(_ABSENT_INTEGER)
+        self._write_metadata(row, metadata)
+
+    def _write_metadata(self, row: int, metadata: Mapping) -> None:
+        extras = {}
+        for field in STRING_FIELDS:
+            value = metadata.get(field)
+            if type(value) is str:
+                self._codes[field][row] = self._tables[field].encode(value)
+            else:
+                self._codes[field][row] = _ABSENT_CODE
+                if field in metadata:
+                    extras[field] = value
+        for field in INTEGER_FIELDS:
+            value = metadata.get(field)
+            if type(value) is int and value != _ABSENT_INTEGER and abs(value) < 2 ** 63:
+                self._integers[field][row] = value
+            else:
+                self._integers[field][row] = _ABSENT_INTEGER
+                if field in metadata:
+                    extras[field] = value
+        for key, value in metadata.items():
+            if key not in self._codes and key not in self._integers:
+                extras[key] = value
+        if extras:
+            self._extras[row] = extras
+        else:
+            self._extras.pop(row, None)
+
+    def replace_metadata(self, chunk_id: str, metadata: Mapping) -> None:
+        """
+        Replaces the metadata of a stored chunk.
+
+        Raises:
+            KeyError: If the chunk id is not in the store.
+        """
+        self._write_metadata(self._rows[chunk_id], metadata)
+
+    def delete(self, ids: List) -> None:
+        """
+        Removes chunks by id. Their rows are cleared at once and reclaimed by a
+        compaction once enough of the store has been deleted.
+
+        Raises:
+            ValueError: If a chunk id is not in the store.
+        """
+        missing = set(ids).difference(self._rows)
+        if missing:
+            raise ValueError(f"Tried to delete ids that do not exist: {missing}")
+        for chunk_id in ids:
+            row = self._rows.pop(chunk_id, None)
+            if row is None:
+                continue
+            self._ids[row] = None
+            self._texts[row] = None
+            self._extras.pop(row, None)
+            self._deleted += 1
+        if self._deleted > _COMPACT_FRACTION * len(self._ids):
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Rewrites the columns without the deleted rows, dropping values no chunk uses any more.
+        """
+        compacted = ChunkStore()
+        for row, chunk_id in enumerate(self._ids):
+            if chunk_id is not None:
+                compacted._append(chunk_id, self._texts[row], self._metadata(row))
+        self.__dict__.update(compacted.__dict__)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, Document]]) -> 'ChunkStore':
+        """
+        Builds a store from (chunk id, Document) pairs, e.g. the dict of an InMemoryDocstore.
+        """
+        store = cls()
+        for chunk_id, document in documents:
+            if chunk_id in store._rows:
+                raise ValueError(f"Tried to add an id that already exists: {chunk_id}")
+            store._append(chunk_id, document.page_content, document.metadata)
+        return store
+
+    def __getstate__(self) -> Dict:
+        # Deleted rows are not written, and the id and value lookups are rebuilt on load.
+        if self._deleted:
+            self._compact()
+        return {
+            "ids": self._ids,
+            "texts": self._texts,
+            "values": {field: table.values for field, table in self._tables.items()},
+            "codes": self._codes,
+            "integers": self._integers,
+            "extras": self._extras,
+        }
+
+    def __setstate__(self, state: Dict) -> None:
+        self._ids = state["ids"]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._texts = state["texts"]
+        self._tables = {}
+        for field, values in state["values"].items():
+            table = self._tables[field] = _ValueTable()
+            table.values = values
+            table.codes = {value: code for code, value in enumerate(values)}
+        self._codes = state["codes"]
+        self._integers = state["integers"]
+        self._extras = state["extras"]
+        self._deleted = 0
+
+
+def document_mapping(docstore: Docstore) -> Mapping[str, Document]:
+    """
+    Returns the chunks of a docstore as a mapping of chunk id to Document: a
+    ChunkStore is one, and LangChain's InMemoryDocstore keeps one in _dict.
+    """
+    return docstore if isinstance(docstore, Mapping) else docstore._dict
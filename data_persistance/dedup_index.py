@@ -0,0 +1,209 @@
+# dedup_index.py
+
+import json
+import re
+import zlib
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+DEDUP_INDEX_FILE_NAME = "dedup.npz"
+
+# The estimated Jaccard similarity of two chunks' word shingles at or above
+# which they are collapsed into one stored chunk. 1.0 collapses only chunks
+# with the same words (up to case and punctuation).
+DEFAULT_DEDUP_THRESHOLD = 0.8
+
+# --- MinHash / LSH parameters ---
+# A signature is the minimum of 64 hash functions over a chunk's shingles of 3
+# consecutive words; two signatures agree on each value with probability equal
+# to the chunks' Jaccard similarity. The LSH index splits signatures into 16
+# bands of 4 values, and chunks sharing any band are candidates: a pair with
+# similarity 0.8 becomes a candidate with probability 1 - (1 - 0.8^4)^16 > 0.99,
+# one with similarity 0.3 with probability 0.12. Candidates are then checked
+# against the threshold by the fraction of signature values they agree on.
+_NUM_PERMUTATIONS = 64
+_BANDS = 16
+_ROWS_PER_BAND = _NUM_PERMUTATIONS // _BANDS
+_SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 31) - 1
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# h_i(x) = (a_i * x + b_i) mod p. The seed is fixed so signatures of a saved
+# index stay comparable with those of chunks added after it is loaded.
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _MERSENNE_PRIME, size=(_NUM_PERMUTATIONS, 1), dtype=np.uint64)
+_B = _rng.integers(0, _MERSENNE_PRIME, size=(_NUM_PERMUTATIONS, 1), dtype=np.uint64)
+# A shingle is hashed as a weighted sum of its words' hashes, and a band as a
+# weighted sum of its values plus a per-band offset (both wrapping at 64 bits);
+# a rare band collision only adds a candidate to check.
+_SHINGLE_WEIGHTS = _rng.integers(1, 1 << 63, size=_SHINGLE_SIZE, dtype=np.uint64) | np.uint64(1)
+_BAND_WEIGHTS = _rng.integers(1, 1 << 63, size=_ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+_BAND_OFFSETS = _rng.integers(0, 1 << 63, size=_BANDS, dtype=np.uint64)
+# Texts whose signatures are computed in one set of array operations.
+_SIGNATURE_BLOCK = 512
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """
+    Returns 32-bit hashes of a text's lowercased shingles of consecutive words.
+
+    A text shorter than a shingle is one shingle, and a text without words is
+    hashed whole, so every text has at least one.
+    """
+    # crc32 rather than hash(), which is salted per process.
+    tokens = _TOKEN_PATTERN.findall(text.lower()) or [text.strip()]
+    words = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64, count=len(tokens))
+    count = max(len(words) - _SHINGLE_SIZE + 1, 1)
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(min(_SHINGLE_SIZE, len(words))):
+        shingles += words[offset:offset + count] * _SHINGLE_WEIGHTS[offset]
+    return shingles & np.uint64(0xFFFFFFFF)
+
+
+def minhash_signatures(texts: Sequence[str]) -> np.ndarray:
+    """
+    Returns the MinHash signatures of texts, as one row of 64 uint32 values per text.
+    """
+    shingles = [_shingle_hashes(text) for text in texts]
+    signatures = np.empty((len(texts), _NUM_PERMUTATIONS), dtype=np.uint32)
+    for start in range(0, len(texts), _SIGNATURE_BLOCK):
+        block = shingles[start:start + _SIGNATURE_BLOCK]
+        offsets = np.cumsum([0] + [len(hashes) for hashes in block[:-1]])
+        # a_i < 2^31 and x < 2^32, so a_i * x + b_i cannot overflow 64 bits.
+        permuted = (_A * np.concatenate(block) + _B) % _MERSENNE_PRIME
+        signatures[start:start + len(block)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures
+
+
+def _band_keys(signatures: np.ndarray) -> List[List[int]]:
+    """
+    Returns the LSH key of each band of each signature.
+    """
+    bands = signatures.reshape(len(signatures), _BANDS, _ROWS_PER_BAND).astype(np.uint64)
+    return ((bands * _BAND_WEIGHTS).sum(axis=2, dtype=np.uint64) + _BAND_OFFSETS).tolist()
+
+
+class DedupIndex:
+    """
+    Finds the stored chunk a new chunk nearly duplicates, and records every
+    place a stored chunk occurs.
+
+    Signatures are kept per stored chunk and filed under each of their bands,
+    so a lookup only compares a chunk against the chunks that share a band
+    with it instead of against the whole store.
+
+    An occurrence is the metadata a chunk had at one place in the corpus. A
+    chunk that occurs once is described by its own docstore metadata and has
+    no entry here; a chunk that occurs in several places keeps all of their
+    metadata, the first being the one the docstore shows; a chunk whose
+    occurrences were all removed has an empty list until it is deleted, or
+    reused by a new chunk that duplicates it.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_DEDUP_THRESHOLD):
+        """
+        Raises:
+            ValueError: If threshold is not in (0, 1].
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError(f"The dedup threshold must be in (0, 1], got {threshold}.")
+        self.threshold = threshold
+        self._signatures: Dict[str, bytes] = {}
+        # band key -> chunk ids; rebuilt from the signatures on first use after a load.
+        self._buckets: Optional[Dict[int, List[str]]] = {}
+        self._occurrences: Dict[str, List[Dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_index(self) -> Dict[int, List[str]]:
+        if self._buckets is None:
+            self._buckets = {}
+            chunk_ids = list(self._signatures)
+            signatures = np.frombuffer(b"".join(self._signatures.values()), dtype=np.uint32)
+            for chunk_id, keys in zip(chunk_ids, _band_keys(signatures.reshape(len(chunk_ids), _NUM_PERMUTATIONS))):
+                for key in keys:
+                    self._buckets.setdefault(key, []).append(chunk_id)
+        return self._buckets
+
+    def assign(self, chunk_ids: Sequence[str], texts: Sequence[str]) -> List[str]:
+        """
+        Maps each new chunk to the chunk it will be stored as: the most similar
+        indexed (or earlier new) chunk at or above the threshold, or itself,
+        which is then indexed.
+        """
+        buckets = self._band_index()
+        signatures = minhash_signatures(texts)
+        assigned = []
+        for chunk_id, signature, keys in zip(chunk_ids, signatures, _band_keys(signatures)):
+            best, best_similarity = None, self.threshold
+            for candidate in {candidate for key in keys for candidate in buckets.get(key, ())}:
+                similarity = float(np.mean(np.frombuffer(self._signatures[candidate], dtype=np.uint32) == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+            if best is None:
+                self._signatures[chunk_id] = signature.tobytes()
+                for key in keys:
+                    buckets.setdefault(key, []).append(chunk_id)
+                best = chunk_id
+            assigned.append(best)
+        return assigned
+
+    def remove(self, chunk_ids: Sequence[str]) -> None:
+        """
+        Forgets deleted chunks.
+        """
+        buckets = self._band_index()
+        for chunk_id in chunk_ids:
+            signature = self._signatures.pop(chunk_id, None)
+            self._occurrences.pop(chunk_id, None)
+            if signature is None:
+                continue
+            for key in _band_keys(np.frombuffer(signature, dtype=np.uint32).reshape(1, _NUM_PERMUTATIONS))[0]:
+                bucket = buckets[key]
+                bucket.remove(chunk_id)
+                if not bucket:
+                    del buckets[key]
+
+    def get_occurrences(self, chunk_id: str) -> Optional[List[Dict]]:
+        """
+        Returns the occurrences of a chunk, or None if it occurs once and its
+        docstore metadata describes it.
+        """
+        return self._occurrences.get(chunk_id)
+
+    def set_occurrences(self, chunk_id: str, occurrences: List[Mapping]) -> None:
+        if len(occurrences) == 1:
+            self._occurrences.pop(chunk_id, None)
+        else:
+            self._occurrences[chunk_id] = [dict(occurrence) for occurrence in occurrences]
+
+    def orphans(self) -> List[str]:
+        """
+        Returns the chunks no file contains any more.
+        """
+        return [chunk_id for chunk_id, occurrences in self._occurrences.items() if not occurrences]
+
+    def save(self, file_path: str) -> None:
+        chunk_ids = list(self._signatures)
+        np.savez(
+            file_path,
+            chunk_ids=np.array(chunk_ids, dtype=str),
+            signatures=np.frombuffer(b"".join(self._signatures[chunk_id] for chunk_id in chunk_ids),
+                                     dtype=np.uint32).reshape(len(chunk_ids), _NUM_PERMUTATIONS),
+            occurrences=np.array(json.dumps(self._occurrences)),
+            threshold=np.array(self.threshold),
+        )
+
+    @classmethod
+    def load(cls, file_path: str) -> 'DedupIndex':
+        with np.load(file_path) as data:
+            index = cls(float(data["threshold"]))
+            index._signatures = {
+                chunk_id: signature.tobytes()
+                for chunk_id, signature in zip(data["chunk_ids"].tolist(), data["signatures"])
+            }
+            index._occurrences = json.loads(str(data["occurrences"]))
+        index._buckets = None
+        return index
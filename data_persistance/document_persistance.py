@@ -1,25 +1,107 @@
 # document_persistance.py
 
-import re
+from __future__ import annotations
+
 import os
 import sys
 import argparse
 import json
 import shutil
-from typing import Dict, List, Optional
-
-# To make this module runnable, you might need to install the following packages:
-# pip install langchain langchain-community faiss-cpu sentence-transformers
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import hashlib
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from document_processor.markdown_processor import MarkdownProcessor
+from document_processor.markdown_chunker import FileChunks, MarkdownChunker
+from data_persistance.bm25_index import BM25_INDEX_FILE_NAME, BM25Index
+from data_persistance.dedup_index import DEDUP_INDEX_FILE_NAME, DedupIndex
+from data_persistance.metadata_index import METADATA_INDEX_FILE_NAME, MetadataIndex
+from data_persistance.section_index import SECTION_INDEX_FILE_NAME, SectionIndex
+from instrumentation import metrics
+
+# LangChain and FAISS take around a second to import, so, as in search_processor,
+# they are only imported by the methods that use them and importing this module
+# (e.g. for a CLI's --help, or to read a manifest) stays cheap.
+# To make this module runnable, you might need to install the following packages:
+# pip install langchain langchain-community faiss-cpu sentence-transformers
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+    from data_persistance.ann_index import IndexConfig
+    from data_persistance.embedding_backends import EmbeddingBackend
+
+# --- Persistence layout ---
+# A saved store is a single directory holding the FAISS index and docstore
+# (written by LangChain as index.faiss / index.pkl) plus a manifest.json that
+# records the settings the chunks were produced with.
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_SCHEMA_VERSION = 2
+
+# --- Ingestion defaults ---
+# Chunks are embedded and added in batches of this size while files are still
+# being read, which bounds peak memory independently of the corpus size.
+DEFAULT_INGEST_BATCH_SIZE = 256
+DEFAULT_READ_WORKERS = 8
+
+# --- Chunk sizes ---
+# characters: chunk_size and chunk_overlap count characters.
+# tokens:     they count tokens of the embedding model's tokenizer, and chunks are
+#             packed with whole sentences and paragraphs up to the model's limit.
+CHUNK_UNITS = ("characters", "tokens")
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_CHUNK_OVERLAP = 20
+DEFAULT_TOKEN_CHUNK_OVERLAP = 32
+
+
+def _content_hash(content: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's text content.
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def shard_of(file_name: str, shard_count: int) -> int:
+    """
+    Returns the shard a file belongs to, from the SHA-256 of its name, so a file
+    stays in its shard however its content changes.
+    """
+    return int.from_bytes(hashlib.sha256(file_name.encode('utf-8')).digest()[:8], 'big') % shard_count
+
+
+def _dedup_summary(chunks: int, vectors: int) -> str:
+    """
+    Describes how many of the ingested chunks were collapsed into stored ones.
+    """
+    collapsed = chunks - vectors
+    return f" ({collapsed} collapsed as duplicates, dedup ratio {collapsed / chunks:.1%})"
+
+
+def _deduplicated_spans(documents: List[Document], duplicated: List[bool]) -> Dict[Tuple[str, int], Tuple]:
+    """
+    Returns the span of every section occurrence that has a duplicated chunk:
+    from its first chunk's start to its last chunk's end, duplicates included,
+    with the metadata of its first chunk.
+    """
+    spans: Dict[Tuple[str, int], list] = {}
+    for document, is_duplicate in zip(documents, duplicated):
+        metadata = document.metadata
+        ordinal = metadata.get('section_index')
+        if ordinal is None:
+            continue
+        span = spans.get((metadata['file_name'], ordinal))
+        if span is None:
+            spans[(metadata['file_name'], ordinal)] = [metadata['start_index'], metadata['end_index'],
+                                                       metadata, is_duplicate]
+        else:
+            span[1] = metadata['end_index']
+            span[3] = span[3] or is_duplicate
+    return {key: (start, end, metadata) for key, (start, end, metadata, has_duplicate) in spans.items()
+            if has_duplicate}
 
 
 class VectorStoreManager:
@@ -28,84 +110,690 @@ class VectorStoreManager:
     from markdown files.
     """
 
-    def __init__(self, chunk_size: int = 200, chunk_overlap: int = 20):
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                 embedding_model_name: Optional[str] = None,
+                 embedding_cache_dir: Optional[str] = None, parse_workers: int = 0,
+                 embeddings: Optional[EmbeddingBackend] = None, embedding_batch_size: int = 32,
+                 normalize_embeddings: bool = False, index_config: Optional[IndexConfig] = None,
+                 chunk_unit: str = "characters", dedup_threshold: Optional[float] = None):
         """
         Initializes the VectorStoreManager.
 
         Args:
-            chunk_size (int): The maximum size of text chunks.
-            chunk_overlap (int): The overlap between consecutive chunks.
-        """
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", " ", ""]
-        )
+            chunk_size (Optional[int]): The maximum size of text chunks, in chunk_unit.
+                Defaults to 200 characters, or to the embedding model's token limit.
+            chunk_overlap (Optional[int]): The overlap between consecutive chunks, in
+                chunk_unit. Defaults to 20 characters or 32 tokens.
+            embedding_model_name (Optional[str]): The sentence-transformers model used for
+                embeddings. Defaults to embedding_backends.DEFAULT_EMBEDDING_MODEL.
+            embedding_cache_dir (Optional[str]): If given, chunk embeddings are cached on
+                disk in this directory and reused across builds.
+            parse_workers (int): The number of processes used to clean and split files.
+                0 or 1 parses in this process.
+            embeddings (Optional[EmbeddingBackend]): The backend to embed with. Defaults to a
+                sentence-transformers backend for embedding_model_name, whose model is loaded
+                once per process and only when the first text is embedded.
+            embedding_batch_size (int): The encode batch size of the default backend.
+            normalize_embeddings (bool): Whether the default backend L2-normalizes its vectors.
+            index_config (Optional[IndexConfig]): The FAISS index type and its parameters.
+                Defaults to the exact flat index.
+            chunk_unit (str): "characters", or "tokens" to size chunks with the embedding
+                backend's tokenizer (see CHUNK_UNITS).
+            dedup_threshold (Optional[float]): If given, chunks whose word shingles have at
+                least this estimated Jaccard similarity to a stored chunk (e.g. 0.8, or 1.0
+                for exact copies) are not embedded again: the stored chunk records them as
+                further locations. None stores every chunk.
+
+        Raises:
+            ValueError: If chunk_unit is unknown, a token chunk_size exceeds the model's
+                limit, past which the model would silently truncate chunks, or
+                dedup_threshold is not in (0, 1].
+        """
+        if chunk_unit not in CHUNK_UNITS:
+            raise ValueError(f"Unknown chunk unit '{chunk_unit}'. Choose one of: {', '.join(CHUNK_UNITS)}.")
+        if embeddings is None:
+            from data_persistance.embedding_backends import DEFAULT_EMBEDDING_MODEL, SentenceTransformerBackend
+            embeddings = SentenceTransformerBackend(embedding_model_name or DEFAULT_EMBEDDING_MODEL,
+                                                    batch_size=embedding_batch_size, normalize=normalize_embeddings)
+        self.backend = embeddings
+        self.embedding_model_name = embeddings.model_name
+        self.embeddings: Embeddings = embeddings
+        self.embedding_cache_dir = embedding_cache_dir
+        if embedding_cache_dir:
+            from data_persistance.embedding_cache import CachedEmbeddings
+            self.embeddings = CachedEmbeddings(self.embeddings, embedding_cache_dir, embeddings.cache_identity)
+        self.chunk_unit = chunk_unit
+        if chunk_unit == "tokens":
+            token_limit = embeddings.token_limit
+            if chunk_size is not None and chunk_size > token_limit:
+                raise ValueError(
+                    f"chunk_size={chunk_size} tokens exceeds the {token_limit}-token limit of "
+                    f"{self.embedding_model_name}; longer chunks would be truncated."
+                )
+            self.chunk_size = chunk_size if chunk_size is not None else token_limit
+            self.chunk_overlap = chunk_overlap if chunk_overlap is not None else DEFAULT_TOKEN_CHUNK_OVERLAP
+            length_function = embeddings.count_tokens
+        else:
+            self.chunk_size = chunk_size if chunk_size is not None else DEFAULT_CHUNK_SIZE
+            self.chunk_overlap = chunk_overlap if chunk_overlap is not None else DEFAULT_CHUNK_OVERLAP
+            length_function = None
+        self.chunker = MarkdownChunker(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap,
+                                       length_function=length_function)
+        self.text_splitter = self.chunker.text_splitter
+        self.parse_workers = parse_workers
+        if index_config is None:
+            from data_persistance.ann_index import IndexConfig
+            index_config = IndexConfig()
+        self.index_config = index_config
+        self.index_config.validate()
         self.vector_store: Optional[FAISS] = None
+        # Per-file content hash, mtime, size and chunk ids, used for incremental updates.
+        self.file_manifest: Dict[str, Dict] = {}
+        # (shard number, shard count) when this store is one shard of a
+        # sharded_store.ShardedStore and holds only the files shard_of assigns it.
+        self.shard: Optional[Tuple[int, int]] = None
+        # Ordered chunk ids per (file_name, section_name), used to reconstruct sections.
+        self.section_index = SectionIndex()
+        # Lexical index over the same chunk ids, used by hybrid search.
+        self.bm25_index = BM25Index()
+        # FAISS positions per file, section and page title, used by filtered search.
+        self.metadata_index = MetadataIndex()
+        # Signatures and locations of stored chunks, used to collapse duplicates.
+        self.dedup_threshold = dedup_threshold
+        self.dedup_index = self._new_dedup_index()
+        # FAISS position per chunk id, built when a duplicate's position is first
+        # needed and kept up to date until the next deletion renumbers positions.
+        self._chunk_positions: Optional[Dict[str, int]] = None
+
+    def _new_dedup_index(self) -> Optional[DedupIndex]:
+        return DedupIndex(self.dedup_threshold) if self.dedup_threshold is not None else None
 
     def _clean_markdown_text(self, text: str) -> str:
         """
         Removes common markdown syntax from a string to prepare it for embedding.
         """
-        text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-        text = re.sub(r'!\[(.*?)\]\(.*?\)', r'\1', text)
-        text = re.sub(r'(\*\*|__|\*|_)(.*?)\1', r'\2', text)
-        text = re.sub(r'`(.*?)`', r'\1', text)
-        text = re.sub(r'^\s*[\*\-\+]\s+', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*>\s?', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*[-*_]{3,}\s*$', '', text, flags=re.MULTILINE)
-        return text.strip()
+        return self.chunker.clean_text(text)
+
+    def _documents_from_chunks(self, file_chunks: FileChunks,
+                               section_texts: Optional[Dict[Tuple[str, int], str]] = None) -> List[Document]:
+        """
+        Materializes the Documents of one file's chunk records.
+        """
+        from langchain_core.documents import Document
+
+        file_name, page_title = file_chunks.file_name, file_chunks.page_title
+        metrics.count("sections", len(file_chunks.section_texts))
+        metrics.count("chunks", len(file_chunks.records))
+        if section_texts is not None:
+            for section_index, text in file_chunks.section_texts.items():
+                section_texts[(file_name, section_index)] = text
+        return [
+            Document(page_content=record.text, metadata={
+                "section_name": record.section_name, "section_path": record.section_path,
+                "page_title": page_title, "file_name": file_name, "source": "Markdown File",
+                "section_index": record.section_index, "section_level": record.section_level,
+                "parent_section_index": record.parent_section_index,
+                "chunk_index": record.chunk_index, "start_index": record.start_index, "end_index": record.end_index,
+            })
+            for record in file_chunks.records
+        ]
 
-    def _parse_markdown_to_documents(self, markdown_data: Dict[str, str]) -> List[Document]:
+    def _parse_markdown_to_documents(self, markdown_data: Dict[str, str],
+                                     section_texts: Optional[Dict[Tuple[str, int], str]] = None) -> List[Document]:
         """
         Parses and cleans markdown content into a list of LangChain Documents.
+
+        Every chunk records its section's ordinal within the file (section_index),
+        its place in the header tree (section_path, section_level and the
+        parent_section_index of the enclosing section), its position within the
+        section (chunk_index) and its start_index/end_index offsets into the
+        cleaned section text. Files are chunked on a process pool when parse_workers > 1.
+
+        Args:
+            markdown_data (Dict[str, str]): File names mapped to markdown content.
+            section_texts (Optional[Dict]): If given, filled with the cleaned text of
+                every section, keyed by (file_name, section_index).
         """
         all_documents = []
-        for file_name, content in markdown_data.items():
-            if not content.strip():
-                continue
-            page_title_match = re.search(r'^#\s+(.*)', content, re.MULTILINE)
-            page_title = self._clean_markdown_text(page_title_match.group(1)) if page_title_match else file_name
-            sections = re.split(r'(^#+\s+.*)', content, flags=re.MULTILINE)
-            if sections[0].strip():
-                cleaned_intro = self._clean_markdown_text(sections[0].strip())
-                chunks = self.text_splitter.split_text(cleaned_intro)
-                for chunk in chunks:
-                    metadata = {"section_name": "Introduction", "page_title": page_title, "file_name": file_name, "source": "Markdown File"}
-                    all_documents.append(Document(page_content=chunk, metadata=metadata))
-            for i in range(1, len(sections), 2):
-                if i + 1 < len(sections):
-                    header = sections[i].strip()
-                    body = sections[i+1].strip()
-                    section_name = self._clean_markdown_text(header.lstrip('#').strip())
-                    cleaned_body = self._clean_markdown_text(body)
-                    if not cleaned_body:
-                        continue
-                    chunks = self.text_splitter.split_text(cleaned_body)
-                    for chunk in chunks:
-                        metadata = {"section_name": section_name, "page_title": page_title, "file_name": file_name, "source": "Markdown File"}
-                        all_documents.append(Document(page_content=chunk, metadata=metadata))
+        for file_chunks in self.chunker.chunk_files(markdown_data.items(), workers=self.parse_workers):
+            all_documents.extend(self._documents_from_chunks(file_chunks, section_texts))
         return all_documents
 
     def build_vector_store_from_dict(self, markdown_data: Dict[str, str]) -> FAISS:
         """
         Creates documents from a markdown dictionary and builds a FAISS vector store.
         """
-        documents = self._parse_markdown_to_documents(markdown_data)
+        section_texts: Dict[Tuple[str, int], str] = {}
+        documents = self._parse_markdown_to_documents(markdown_data, section_texts)
         if not documents:
             raise ValueError("No documents were created from the provided markdown data. Check the content.")
         print(f"Creating vector store with {len(documents)} document chunks.")
-        self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        self.vector_store = None
+        self.section_index = SectionIndex()
+        self.bm25_index = BM25Index()
+        self.metadata_index = MetadataIndex()
+        self.dedup_index = self._new_dedup_index()
+        self._chunk_positions = None
+        self.file_manifest = {
+            file_name: {"sha256": _content_hash(content), "mtime_ns": None, "size": None, "chunk_ids": []}
+            for file_name, content in markdown_data.items()
+        }
+        vectors = self._add_documents(documents, section_texts)
+        if self.dedup_index is not None:
+            print(f"Stored them as {vectors} vectors{_dedup_summary(len(documents), vectors)}.")
+        self._build_configured_index()
+        self._flush_embedding_cache()
         return self.vector_store
 
-    def process_directory_and_build_store(self, directory_path: str) -> FAISS:
+    def process_directory_and_build_store(self, directory_path: str, recursive: bool = True,
+                                          batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+                                          max_workers: int = DEFAULT_READ_WORKERS) -> FAISS:
         """
         A convenience method to process a directory of markdown files and build the vector store.
+
+        Files are streamed through update_store_from_directory, so peak memory depends
+        on batch_size rather than on the size of the corpus.
+        """
+        self.vector_store = None
+        self.file_manifest = {}
+        self.section_index = SectionIndex()
+        self.bm25_index = BM25Index()
+        self.metadata_index = MetadataIndex()
+        self.dedup_index = self._new_dedup_index()
+        self._chunk_positions = None
+        self.update_store_from_directory(directory_path, recursive=recursive,
+                                         batch_size=batch_size, max_workers=max_workers)
+        if not self.vector_store:
+            raise ValueError("No documents were created from the provided markdown data. Check the content.")
+        return self.vector_store
+
+    def update_store_from_directory(self, directory_path: str, recursive: bool = True,
+                                    batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+                                    max_workers: int = DEFAULT_READ_WORKERS) -> Dict[str, List[str]]:
+        """
+        Incrementally brings the vector store in line with a directory of markdown files.
+
+        Files are compared against the per-file manifest: an unchanged mtime and size
+        skips the file without reading it, and an unchanged content hash skips it
+        without re-embedding. Chunks of changed and removed files are deleted by id,
+        and only new or changed files are parsed and embedded. With deduplication,
+        a chunk is only deleted once no file contains it, and a new chunk that
+        duplicates a stored one (even one of the file's own old chunks) reuses it.
+
+        The remaining files are read on a thread pool and parsed as they arrive
+        (on a process pool when parse_workers > 1);
+        their chunks are embedded and added whenever batch_size chunks are pending,
+        so reading, parsing and embedding overlap.
+
+        Args:
+            directory_path (str): The directory containing the markdown files.
+            recursive (bool): Whether to include files in subdirectories.
+            batch_size (int): The number of chunks embedded and added at a time.
+            max_workers (int): The number of threads reading files.
+
+        Returns:
+            A report with the file names that were 'added', 'changed', 'removed'
+            and 'unchanged'.
         """
         markdown_processor = MarkdownProcessor()
-        markdown_data = markdown_processor.read_markdown_files_from_directory(directory_path)
-        return self.build_vector_store_from_dict(markdown_data)
+        markdown_files = markdown_processor.list_markdown_files(directory_path, recursive=recursive)
+        if self.shard is not None:
+            number, shard_count = self.shard
+            markdown_files = {file_name: full_path for file_name, full_path in markdown_files.items()
+                              if shard_of(file_name, shard_count) == number}
+        report: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "unchanged": []}
+
+        to_read = []
+        stats: Dict[str, os.stat_result] = {}
+        for file_name, full_path in markdown_files.items():
+            stat = os.stat(full_path)
+            entry = self.file_manifest.get(file_name)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                report["unchanged"].append(file_name)
+                continue
+            stats[file_name] = stat
+            to_read.append((file_name, full_path))
+
+        # Chunks of removed and changed files are deleted together once the new
+        # chunks are in, since a delete rebuilds approximate indexes.
+        report["removed"] = sorted(set(self.file_manifest) - set(markdown_files))
+        stale_ids = []
+        for file_name in report["removed"]:
+            stale_ids.extend(self._release_file(file_name))
+            del self.file_manifest[file_name]
+
+        def changed_files():
+            for file_name, content in markdown_processor.read_files_concurrently(to_read, max_workers=max_workers):
+                stat = stats[file_name]
+                entry = self.file_manifest.get(file_name)
+                content_hash = _content_hash(content)
+                if entry and entry["sha256"] == content_hash:
+                    # Touched but not modified: refresh the stat fields only.
+                    entry["mtime_ns"], entry["size"] = stat.st_mtime_ns, stat.st_size
+                    report["unchanged"].append(file_name)
+                    continue
+                report["changed" if entry else "added"].append(file_name)
+                if entry:
+                    stale_ids.extend(self._release_file(file_name))
+                self.file_manifest[file_name] = {
+                    "sha256": content_hash, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "chunk_ids": []
+                }
+                yield file_name, content
+
+        pending_documents: List[Document] = []
+        pending_texts: Dict[Tuple[str, int], str] = {}
+        added_chunks = added_vectors = 0
+        for file_chunks in self.chunker.chunk_files(changed_files(), workers=self.parse_workers):
+            pending_documents.extend(self._documents_from_chunks(file_chunks, pending_texts))
+            if len(pending_documents) >= batch_size:
+                added_chunks += len(pending_documents)
+                added_vectors += self._add_documents(pending_documents, pending_texts)
+                pending_documents, pending_texts = [], {}
+        if pending_documents:
+            added_chunks += len(pending_documents)
+            added_vectors += self._add_documents(pending_documents, pending_texts)
+        if self.dedup_index is not None:
+            # Chunks of changed and removed files that no new chunk reused.
+            stale_ids = self.dedup_index.orphans()
+        self._delete_ids(stale_ids)
+        self._build_configured_index()
+        self._flush_embedding_cache()
+
+        if added_chunks:
+            summary = _dedup_summary(added_chunks, added_vectors) if self.dedup_index is not None else ""
+            print(f"Added {added_chunks} document chunks to the vector store{summary}.")
+        for file_names in report.values():
+            file_names.sort()
+        return report
+
+    def _flush_embedding_cache(self) -> None:
+        # Batches only journal their new cache entries; the hash index is written once per build.
+        if self.embedding_cache_dir:
+            self.embeddings.flush()
+
+    def _add_documents(self, documents: List[Document],
+                       section_texts: Optional[Dict[Tuple[str, int], str]] = None) -> int:
+        """
+        Embeds and adds documents under fresh ids, recording the ids per file and
+        per section along with the cleaned section texts, and indexing their terms
+        and filterable metadata.
+
+        With deduplication, a document that duplicates a stored chunk (or an
+        earlier document of the batch) is not embedded; it is recorded as one
+        more occurrence of that chunk instead.
+
+        Returns:
+            The number of vectors added.
+        """
+        ids = [str(uuid.uuid4()) for _ in documents]
+        texts = [document.page_content for document in documents]
+        stored_ids = ids
+        if self.dedup_index is not None:
+            with metrics.stage("dedup"):
+                stored_ids = self.dedup_index.assign(ids, texts)
+        new = [i for i, (chunk_id, stored_id) in enumerate(zip(ids, stored_ids)) if chunk_id == stored_id]
+        if self.dedup_index is not None:
+            metrics.count("chunks_deduplicated", len(documents) - len(new))
+        new_ids = [ids[i] for i in new]
+        new_texts = [texts[i] for i in new]
+        new_metadatas = [documents[i].metadata for i in new]
+        if new:
+            # Embedding and insertion are done separately (rather than through
+            # from_documents / add_documents) so each can be timed on its own.
+            with metrics.stage("embed"):
+                vectors = self.embeddings.embed_documents(new_texts)
+            with metrics.stage("insert"):
+                if self.vector_store is None:
+                    from langchain_community.vectorstores import FAISS
+                    from data_persistance.chunk_store import ChunkStore
+                    self.vector_store = FAISS.from_embeddings(zip(new_texts, vectors), self.embeddings,
+                                                              metadatas=new_metadatas, ids=new_ids,
+                                                              docstore=ChunkStore())
+                else:
+                    self.vector_store.add_embeddings(zip(new_texts, vectors), metadatas=new_metadatas, ids=new_ids)
+            if self._chunk_positions is not None:
+                first = len(self.vector_store.index_to_docstore_id) - len(new_ids)
+                self._chunk_positions.update((chunk_id, first + i) for i, chunk_id in enumerate(new_ids))
+        metrics.count("vectors", len(new))
+        # New vectors are appended to the end of the index, in document order.
+        self.metadata_index.append(new_metadatas)
+        for chunk_id, stored_id, document in zip(ids, stored_ids, documents):
+            self.file_manifest[document.metadata['file_name']]["chunk_ids"].append(stored_id)
+            if chunk_id == stored_id:
+                self.section_index.add(chunk_id, document.metadata)
+                self.bm25_index.add(chunk_id, document.page_content)
+            else:
+                occurrences = self._occurrences_of(stored_id)
+                self._relabel_chunk(stored_id, occurrences, occurrences + [document.metadata])
+        if section_texts:
+            self.section_index.set_section_texts(section_texts)
+        if len(new) < len(documents):
+            self.section_index.set_section_spans(
+                _deduplicated_spans(documents, [chunk_id != stored_id for chunk_id, stored_id in zip(ids, stored_ids)])
+            )
+        return len(new)
+
+    def _occurrences_of(self, chunk_id: str) -> List[Dict]:
+        """
+        Returns the metadata of every place a stored chunk occurs, the shown one first.
+        """
+        occurrences = self.dedup_index.get_occurrences(chunk_id)
+        if occurrences is None:
+            return [self.vector_store.docstore.search(chunk_id).metadata]
+        return occurrences
+
+    def _chunk_position(self, chunk_id: str) -> int:
+        if self._chunk_positions is None:
+            self._chunk_positions = {
+                stored_id: position for position, stored_id in self.vector_store.index_to_docstore_id.items()
+            }
+        return self._chunk_positions[chunk_id]
+
+    def _relabel_chunk(self, chunk_id: str, old: List[Dict], new: List[Dict]) -> None:
+        """
+        Moves a stored chunk from one list of occurrences to another.
+
+        The section index holds the chunk under its first occurrence, which is
+        also the metadata the docstore shows, with a 'locations' list of every
+        (file_name, section_name) when there is more than one. The metadata
+        index files it under all of them, so a filter on any of its files or
+        sections finds it. A chunk left without occurrences is taken out of both
+        until it is deleted or reused.
+        """
+        old_first = old[0] if old else None
+        new_first = new[0] if new else None
+        if old_first != new_first:
+            if old_first is not None:
+                self.section_index.remove([chunk_id])
+            if new_first is not None:
+                self.section_index.add(chunk_id, new_first)
+        self.metadata_index.relabel(self._chunk_position(chunk_id), old, new)
+        if new:
+            metadata = dict(new_first)
+            if len(new) > 1:
+                metadata["locations"] = [[occurrence["file_name"], occurrence["section_name"]] for occurrence in new]
+            self.vector_store.docstore.replace_metadata(chunk_id, metadata)
+        self.dedup_index.set_occurrences(chunk_id, new)
+
+    def _release_file(self, file_name: str) -> List[str]:
+        """
+        Detaches a changed or removed file from its chunks.
+
+        Returns:
+            The chunk ids to delete. With deduplication none are returned: the
+            file's occurrences are dropped, and chunks no other file contains are
+            left for DedupIndex.orphans, since a new chunk may still reuse them.
+        """
+        chunk_ids = self.file_manifest[file_name]["chunk_ids"]
+        if self.dedup_index is None:
+            return chunk_ids
+        section_ordinals = set()
+        for chunk_id in dict.fromkeys(chunk_ids):
+            occurrences = self._occurrences_of(chunk_id)
+            remaining = [occurrence for occurrence in occurrences if occurrence["file_name"] != file_name]
+            section_ordinals.update((file_name, occurrence.get("section_index"))
+                                    for occurrence in occurrences if occurrence["file_name"] == file_name)
+            self._relabel_chunk(chunk_id, occurrences, remaining)
+        # Sections whose chunks were all duplicates have a text but no chunks of
+        # their own, so the section index would not drop it.
+        self.section_index.discard_texts(section_ordinals)
+        return []
+
+    def _delete_ids(self, ids: List[str]) -> None:
+        """
+        Removes chunks from the FAISS index and the docstore by id.
+        """
+        if ids and self.vector_store is not None:
+            removed = set(ids)
+            positions = [position for position, chunk_id in self.vector_store.index_to_docstore_id.items()
+                         if chunk_id in removed]
+            from data_persistance.ann_index import delete_from_store
+            with metrics.stage("delete"):
+                delete_from_store(self.vector_store, ids)
+                self.section_index.remove(ids)
+                self.bm25_index.remove(ids)
+                self.metadata_index.remove_positions(positions)
+                if self.dedup_index is not None:
+                    self.dedup_index.remove(ids)
+            self._chunk_positions = None
+            metrics.count("vectors_deleted", len(positions))
+
+    def _build_configured_index(self) -> None:
+        """
+        Chunks are always added to an exact flat index first, since approximate
+        indexes must be trained on the vectors they will hold. Once a store has
+        been filled, its flat index is replaced by one of the configured type;
+        later additions go straight into the trained index.
+        """
+        if self.vector_store is None or self.index_config.index_type == "flat":
+            return
+        from data_persistance.ann_index import convert_store_index, is_exact
+        if is_exact(self.vector_store.index):
+            with metrics.stage("index_build"):
+                self.index_config = convert_store_index(self.vector_store, self.index_config)
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """
+        Changes the query-time accuracy/speed knobs of an approximate index.
+
+        Args:
+            nprobe (Optional[int]): The number of IVF buckets scanned per query.
+            ef_search (Optional[int]): The HNSW search frontier size.
+        """
+        if nprobe is not None:
+            self.index_config = self.index_config._replace(nprobe=nprobe)
+        if ef_search is not None:
+            self.index_config = self.index_config._replace(ef_search=ef_search)
+        if self.vector_store is not None:
+            from data_persistance.ann_index import apply_search_params
+            apply_search_params(self.vector_store.index, self.index_config)
+
+    def _build_manifest(self) -> Dict:
+        """
+        Describes the settings the current store was built with.
+        """
+        return {
+            "schema_version": MANIFEST_SCHEMA_VERSION,
+            "embedding_model": self.embedding_model_name,
+            "embedding_normalized": self.backend.normalize,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunk_unit": self.chunk_unit,
+            "dedup_threshold": self.dedup_threshold,
+            "shard": list(self.shard) if self.shard is not None else None,
+            "document_count": len(self.vector_store.index_to_docstore_id),
+            "index": self.index_config.to_dict(),
+            "files": self.file_manifest,
+        }
+
+    def save_local(self, folder_path: str) -> None:
+        """
+        Persists the FAISS index, the docstore, the section, BM25, metadata and
+        dedup indexes and a manifest into a single directory.
+
+        The manifest is written last, so a directory without one is never treated
+        as a complete store by load_local.
+
+        Args:
+            folder_path (str): The directory to write the store into. Created if missing.
+
+        Raises:
+            ValueError: If the vector store has not been built yet.
+        """
+        if not self.vector_store:
+            raise ValueError("Vector store has not been built. Call a build method first.")
+        os.makedirs(folder_path, exist_ok=True)
+        with metrics.stage("save"):
+            self.vector_store.save_local(folder_path)
+            self.section_index.save(os.path.join(folder_path, SECTION_INDEX_FILE_NAME))
+            self.bm25_index.save(os.path.join(folder_path, BM25_INDEX_FILE_NAME))
+            self.metadata_index.save(os.path.join(folder_path, METADATA_INDEX_FILE_NAME))
+            if self.dedup_index is not None:
+                self.dedup_index.save(os.path.join(folder_path, DEDUP_INDEX_FILE_NAME))
+
+        manifest_path = os.path.join(folder_path, MANIFEST_FILE_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._build_manifest(), f, indent=2)
+        os.replace(temp_path, manifest_path)
+
+    def build_shards(self, directory_path: str, folder_path: str, shard_count: int,
+                     recursive: bool = True, max_processes: Optional[int] = None):
+        """
+        Builds a store split into shard_count shards, one process per shard, each
+        holding the files shard_of assigns it, and saves it into folder_path.
+
+        Every shard is built with this manager's chunking, embedding, index and
+        dedup settings, and with its own subdirectory of the embedding cache.
+
+        Args:
+            directory_path (str): The directory containing the markdown files.
+            folder_path (str): The directory to write the sharded store into.
+            shard_count (int): The number of shards.
+            recursive (bool): Whether to include files in subdirectories.
+            max_processes (Optional[int]): The number of shards built at a time.
+                Defaults to one process per shard, up to the number of CPUs.
+
+        Returns:
+            The sharded_store.ShardedStore, loaded from folder_path.
+
+        Raises:
+            ValueError: If shard_count is less than 1, or no chunks were created.
+        """
+        # Imported here: sharded_store builds its shards with this module.
+        from data_persistance.sharded_store import ShardedStore
+        return ShardedStore.build(self, directory_path, folder_path, shard_count,
+                                  recursive=recursive, max_processes=max_processes)
+
+    def export_serving_store(self, folder_path: str) -> None:
+        """
+        Writes the store in the read-only, memory-mapped serving layout, which
+        serving_store.ServingStore.open maps into any number of worker processes
+        that then share one copy of the vectors and chunks in the page cache.
+
+        Raises:
+            ValueError: If the vector store has not been built yet.
+        """
+        from data_persistance.serving_store import write_serving_store
+        write_serving_store(self, folder_path)
+
+    @staticmethod
+    def read_manifest(folder_path: str) -> Dict:
+        """
+        Reads the manifest of a persisted store.
+
+        Raises:
+            FileNotFoundError: If the folder or its manifest does not exist.
+        """
+        manifest_path = os.path.join(folder_path, MANIFEST_FILE_NAME)
+        if not os.path.isfile(manifest_path):
+            raise FileNotFoundError(f"Error: No saved vector store manifest found at '{manifest_path}'.")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def load_local(cls, folder_path: str, chunk_size: Optional[int] = None,
+                   chunk_overlap: Optional[int] = None,
+                   embedding_model_name: Optional[str] = None,
+                   embedding_cache_dir: Optional[str] = None,
+                   embeddings: Optional[EmbeddingBackend] = None) -> 'VectorStoreManager':
+        """
+        Loads a store written by save_local without re-embedding any chunks.
+
+        Settings that are not given are taken from the manifest. Settings that are
+        given must match the manifest, since mixing chunking parameters or embedding
+        models within one index silently degrades search quality.
+
+        Args:
+            folder_path (str): The directory written by save_local.
+            chunk_size (Optional[int]): Expected chunk size, if it should be checked.
+            chunk_overlap (Optional[int]): Expected chunk overlap, if it should be checked.
+            embedding_model_name (Optional[str]): Expected embedding model, if it should be checked.
+            embedding_cache_dir (Optional[str]): Embedding cache used for later incremental updates.
+            embeddings (Optional[EmbeddingBackend]): The backend to embed queries and updates with.
+                Its model must match the manifest. Defaults to the backend the manifest names.
+
+        Returns:
+            A VectorStoreManager with its vector_store loaded.
+
+        Raises:
+            FileNotFoundError: If the folder or its manifest does not exist.
+            ValueError: If the manifest does not match the requested settings.
+        """
+        manifest = cls.read_manifest(folder_path)
+        if "shards" in manifest:
+            raise ValueError(f"'{folder_path}' holds a sharded store. Open it with sharded_store.ShardedStore.load.")
+        if manifest.get("schema_version") != MANIFEST_SCHEMA_VERSION:
+            raise ValueError(
+                f"Saved vector store uses schema version {manifest.get('schema_version')}, "
+                f"expected {MANIFEST_SCHEMA_VERSION}. Rebuild the store."
+            )
+
+        if embeddings is not None and embedding_model_name is None:
+            embedding_model_name = embeddings.model_name
+        expected = {
+            "embedding_model": embedding_model_name,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+        }
+        for key, value in expected.items():
+            if value is not None and manifest.get(key) != value:
+                raise ValueError(
+                    f"Saved vector store was built with {key}={manifest.get(key)!r}, "
+                    f"but {value!r} was requested. Rebuild the store."
+                )
+
+        from langchain_community.vectorstores import FAISS
+        from data_persistance.ann_index import IndexConfig, apply_search_params
+        from data_persistance.chunk_store import ChunkStore
+        from data_persistance.embedding_backends import create_embedding_backend
+
+        if embeddings is None:
+            embeddings = create_embedding_backend(
+                manifest["embedding_model"], normalize=manifest.get("embedding_normalized", False)
+            )
+        manager = cls(
+            chunk_size=manifest["chunk_size"],
+            chunk_overlap=manifest["chunk_overlap"],
+            embedding_cache_dir=embedding_cache_dir,
+            embeddings=embeddings,
+            index_config=IndexConfig.from_dict(manifest.get("index")),
+            chunk_unit=manifest.get("chunk_unit", "characters"),
+            dedup_threshold=manifest.get("dedup_threshold"),
+        )
+        with metrics.stage("load"):
+            # The pickle was written by save_local, so it is trusted local data.
+            manager.vector_store = FAISS.load_local(
+                folder_path, manager.embeddings, allow_dangerous_deserialization=True
+            )
+            apply_search_params(manager.vector_store.index, manager.index_config)
+            if not isinstance(manager.vector_store.docstore, ChunkStore):
+                # Stores saved before the chunk store pickled LangChain's InMemoryDocstore.
+                manager.vector_store.docstore = ChunkStore.from_documents(
+                    manager.vector_store.docstore._dict.items()
+                )
+            manager.file_manifest = manifest.get("files", {})
+            if manifest.get("shard"):
+                manager.shard = tuple(manifest["shard"])
+            section_index_path = os.path.join(folder_path, SECTION_INDEX_FILE_NAME)
+            if os.path.isfile(section_index_path):
+                manager.section_index = SectionIndex.load(section_index_path)
+            else:
+                manager.section_index = SectionIndex.from_docstore(manager.vector_store.docstore)
+            bm25_index_path = os.path.join(folder_path, BM25_INDEX_FILE_NAME)
+            if os.path.isfile(bm25_index_path):
+                manager.bm25_index = BM25Index.load(bm25_index_path)
+            else:
+                manager.bm25_index = BM25Index.from_docstore(manager.vector_store.docstore)
+            metadata_index_path = os.path.join(folder_path, METADATA_INDEX_FILE_NAME)
+            if os.path.isfile(metadata_index_path):
+                manager.metadata_index = MetadataIndex.load(metadata_index_path)
+            else:
+                manager.metadata_index = MetadataIndex.from_store(manager.vector_store)
+            dedup_index_path = os.path.join(folder_path, DEDUP_INDEX_FILE_NAME)
+            if manager.dedup_index is not None and os.path.isfile(dedup_index_path):
+                manager.dedup_index = DedupIndex.load(dedup_index_path)
+        return manager
 
     def get_all_documents_in_store(self) -> List[Dict]:
         """
@@ -113,32 +801,53 @@ class VectorStoreManager:
         """
         if not self.vector_store:
             raise ValueError("Vector store has not been built. Call a build method first.")
-        docstore = self.vector_store.docstore._dict
+        from data_persistance.chunk_store import document_mapping
+        docstore = document_mapping(self.vector_store.docstore)
         human_readable_docs = []
         for doc_id, document in docstore.items():
             human_readable_docs.append({"content": document.page_content, "metadata": document.metadata})
         return human_readable_docs
 
-    def query_vector_store(self, query: str, k: int = 4) -> List[Document]:
+    def query_vector_store(self, query: str, k: int = 4,
+                           score_threshold: Optional[float] = None) -> List[Document]:
         """
         Performs a similarity search on the vector store.
 
         Args:
             query (str): The question or text to search for.
             k (int): The number of top results to return.
+            score_threshold (Optional[float]): Drops the results whose distance is past
+                it (see query_vector_store_with_scores).
 
         Returns:
             A list of LangChain Document objects that are most relevant to the query.
 
+        Raises:
+            ValueError: If the vector store has not been built yet.
+        """
+        return [doc for doc, _ in self.query_vector_store_with_scores(query, k=k, score_threshold=score_threshold)]
+
+    def query_vector_store_with_scores(self, query: str, k: int = 4,
+                                       score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """
+        Performs a similarity search on the vector store, keeping each result's distance.
+
+        Args:
+            query (str): The question or text to search for.
+            k (int): The largest number of results to return.
+            score_threshold (Optional[float]): The largest L2 distance kept (the smallest
+                score for an inner-product store), so a query nothing is close to
+                returns fewer than k results, or none.
+
+        Returns:
+            (Document, distance) pairs, nearest first.
+
         Raises:
             ValueError: If the vector store has not been built yet.
         """
         if not self.vector_store:
             raise ValueError("Vector store has not been built. Call 'build_vector_store' first.")
-
-        # The similarity_search method returns a list of documents and their scores
-        results = self.vector_store.similarity_search(query, k=k)
-        return results
+        return self.vector_store.similarity_search_with_score(query, k=k, score_threshold=score_threshold)
 
 # This block allows the script to be executed directly from the command line.
 if __name__ == '__main__':
@@ -0,0 +1,191 @@
+# embedding_backends.py
+
+import re
+import math
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+HASHING_MODEL_PREFIX = "hashing-"
+# The token limit of the hashing embedder's stand-in tokenizer: that of the default
+# model, whose 256-token sequences include two special tokens.
+DEFAULT_HASHING_TOKEN_LIMIT = 254
+
+
+class EmbeddingBackend(Embeddings):
+    """
+    The interface VectorStoreManager embeds through.
+
+    A backend is a LangChain Embeddings object that also names its model (this
+    name is recorded in the store manifest and in embedding cache keys), says
+    whether it L2-normalizes its vectors, and can embed many queries at once.
+    """
+
+    model_name: str = ""
+    normalize: bool = False
+
+    @property
+    def cache_identity(self) -> str:
+        """
+        Identifies the vectors this backend produces, for caches keyed by model.
+        """
+        return f"{self.model_name}:normalized" if self.normalize else self.model_name
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds many queries in one batched call.
+        """
+        return self.embed_documents(texts)
+
+    @property
+    def token_limit(self) -> int:
+        """
+        The most tokens of text the model embeds; it truncates longer texts.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not expose a tokenizer.")
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Counts the tokens of a text as the model's tokenizer splits it, without
+        the special tokens the model adds around every text.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not expose a tokenizer.")
+
+
+# --- Process-wide model registry ---
+# Loading a sentence-transformers model takes seconds, so every backend in the
+# process (each Streamlit click, each test, each manager) shares one instance.
+_MODEL_REGISTRY: Dict[Tuple[str, Optional[str]], Any] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _load_sentence_transformer(model_name: str, device: Optional[str]) -> Any:
+    # Imported here so that only processes which actually embed pay for torch.
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def get_sentence_transformer(model_name: str, device: Optional[str] = None) -> Any:
+    """
+    Returns the process-wide instance of a sentence-transformers model, loading it on first use.
+    """
+    key = (model_name, device)
+    with _REGISTRY_LOCK:
+        if key not in _MODEL_REGISTRY:
+            _MODEL_REGISTRY[key] = _load_sentence_transformer(model_name, device)
+        return _MODEL_REGISTRY[key]
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    Embeds with a sentence-transformers model from the process-wide registry.
+    The model is only loaded when the first text is embedded.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 32,
+                 normalize: bool = False, device: Optional[str] = None):
+        """
+        Initializes the backend.
+
+        Args:
+            model_name (str): The sentence-transformers model to use.
+            batch_size (int): The number of texts encoded per forward pass.
+            normalize (bool): Whether to L2-normalize the vectors.
+            device (Optional[str]): The torch device, or None to let the library choose.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.device = device
+
+    @property
+    def model(self) -> Any:
+        return get_sentence_transformer(self.model_name, self.device)
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+
+    @property
+    def token_limit(self) -> int:
+        # max_seq_length includes the special tokens (e.g. [CLS] and [SEP]).
+        return self.max_seq_length - self.model.tokenizer.num_special_tokens_to_add()
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.model.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=self.normalize,
+            convert_to_numpy=True, show_progress_bar=False
+        )
+        return vectors.tolist()
+
+
+class HashingEmbedder(EmbeddingBackend):
+    """
+    A deterministic embedder that needs no model download.
+
+    Word unigrams and bigrams are hashed (CRC32, with a hash-derived sign) into a
+    fixed number of dimensions and the vector is L2-normalized. Texts sharing
+    words get similar vectors, which is enough for tests, CI and offline
+    benchmarks that must not depend on network access or model weights.
+    """
+
+    _TOKEN_PATTERN = re.compile(r"\w+")
+    # Words and punctuation marks, roughly the pieces a WordPiece tokenizer starts from.
+    _STAND_IN_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+    def __init__(self, dimension: int = 384, token_limit: int = DEFAULT_HASHING_TOKEN_LIMIT):
+        """
+        Initializes the embedder.
+
+        Args:
+            dimension (int): The size of the produced vectors.
+            token_limit (int): The limit reported for token-budget chunking. The
+                embedder itself reads whole texts; its stand-in tokenizer counts
+                words and punctuation marks.
+        """
+        self.dimension = dimension
+        self.model_name = f"{HASHING_MODEL_PREFIX}{dimension}"
+        self.normalize = True
+        self._token_limit = token_limit
+
+    @property
+    def token_limit(self) -> int:
+        return self._token_limit
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._STAND_IN_TOKEN_PATTERN.findall(text))
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        tokens = self._TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = zlib.crc32(feature.encode('utf-8'))
+            vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm:
+            vector = [value / norm for value in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+
+def create_embedding_backend(model_name: str, batch_size: int = 32, normalize: bool = False) -> EmbeddingBackend:
+    """
+    Creates the backend for a model name as recorded in a store manifest.
+    """
+    if model_name.startswith(HASHING_MODEL_PREFIX):
+        return HashingEmbedder(dimension=int(model_name[len(HASHING_MODEL_PREFIX):]))
+    return SentenceTransformerBackend(model_name, batch_size=batch_size, normalize=normalize)
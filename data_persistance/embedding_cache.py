@@ -0,0 +1,230 @@
+# embedding_cache.py
+
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+VECTORS_FILE_NAME = "vectors.f32"
+INDEX_FILE_NAME = "index.json"
+JOURNAL_FILE_NAME = "index.journal"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses all runs of whitespace so formatting-only differences share a cache entry.
+    """
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    A content-addressed, on-disk cache in front of another embedder.
+
+    Vectors are stored in a memory-mapped float32 array, one row per cached text,
+    and a JSON hash index maps sha1(model name, normalized text) to a row. When the
+    cache holds max_entries vectors, the least recently used rows are reused.
+    Only document embeddings are cached; query embeddings pass straight through.
+
+    Each batch of new vectors appends its rows to a journal next to the index,
+    so the cost of a batch does not grow with the cache; flush() folds the
+    journal into the index and is called once a build is done.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_dir: str, model_name: str, max_entries: int = 100_000):
+        """
+        Initializes the cache, reopening an existing one in cache_dir if present.
+
+        Args:
+            embeddings (Embeddings): The embedder used on cache misses.
+            cache_dir (str): The directory holding the vectors file and hash index.
+            model_name (str): The embedding model name, part of every cache key.
+            max_entries (int): The maximum number of vectors kept before eviction.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.embeddings = embeddings
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._dimension: Optional[int] = None
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        # key -> row, ordered from least to most recently used
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free_slots: List[int] = []
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._open_existing()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def _open_existing(self) -> None:
+        index_path = os.path.join(self.cache_dir, INDEX_FILE_NAME)
+        if os.path.isfile(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self._dimension = index["dimension"]
+            self._capacity = index["capacity"]
+            self._slots = OrderedDict((key, slot) for key, slot in index["entries"])
+        self._replay_journal()
+        if self._dimension is None:
+            return
+        used = set(self._slots.values())
+        self._free_slots = [slot for slot in range(self._capacity - 1, -1, -1) if slot not in used]
+        self._vectors = np.memmap(
+            os.path.join(self.cache_dir, VECTORS_FILE_NAME), dtype=np.float32, mode='r+',
+            shape=(self._capacity, self._dimension)
+        )
+        # The cache may have been written with a larger limit than the current one.
+        while len(self._slots) > self.max_entries:
+            _, slot = self._slots.popitem(last=False)
+            self._free_slots.append(slot)
+
+    def _replay_journal(self) -> None:
+        """
+        Applies the rows written since the index was last flushed.
+        """
+        journal_path = os.path.join(self.cache_dir, JOURNAL_FILE_NAME)
+        if not os.path.isfile(journal_path):
+            return
+        slot_keys = {slot: key for key, slot in self._slots.items()}
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    # A batch cut short by a crash; its rows are not trusted.
+                    break
+                self._dimension = batch["dimension"]
+                self._capacity = batch["capacity"]
+                for key, slot in batch["entries"]:
+                    # The row was reused: the key it held was evicted.
+                    self._slots.pop(slot_keys.pop(slot, None), None)
+                    slot_keys.pop(self._slots.pop(key, None), None)
+                    self._slots[key] = slot
+                    slot_keys[slot] = key
+
+    def _grow(self, needed: int) -> None:
+        """
+        Enlarges the vectors file so at least `needed` rows exist, doubling each time.
+        """
+        new_capacity = max(self._capacity, 1)
+        while new_capacity < needed:
+            new_capacity *= 2
+        new_capacity = min(new_capacity, self.max_entries)
+        if new_capacity <= self._capacity:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        vectors_path = os.path.join(self.cache_dir, VECTORS_FILE_NAME)
+        with open(vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self._dimension * 4)
+        self._free_slots = list(range(new_capacity - 1, self._capacity - 1, -1)) + self._free_slots
+        self._capacity = new_capacity
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+', shape=(new_capacity, self._dimension))
+
+    def _allocate_slot(self) -> int:
+        if len(self._slots) >= self.max_entries:
+            # At max_entries: evict the least recently used vector.
+            _, slot = self._slots.popitem(last=False)
+            return slot
+        if not self._free_slots:
+            self._grow(self._capacity + 1)
+        return self._free_slots.pop()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Returns cached vectors where available and embeds the rest in one batch.
+        """
+        keys = [self._key(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        for position, key in enumerate(keys):
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._slots.move_to_end(key)
+                results[position] = self._vectors[slot].tolist()
+                self.hits += 1
+            else:
+                missing.setdefault(key, []).append(position)
+                self.misses += 1
+
+        if missing:
+            # Only the key is normalized; the embedder sees the text as given.
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            vectors = self.embeddings.embed_documents(miss_texts)
+            if self._dimension is None:
+                self._dimension = len(vectors[0])
+            assigned: List[Tuple[str, int]] = []
+            for (key, positions), vector in zip(missing.items(), vectors):
+                if len(vector) != self._dimension:
+                    raise ValueError(
+                        f"Embedding dimension {len(vector)} does not match the cache's dimension {self._dimension}."
+                    )
+                slot = self._allocate_slot()
+                self._vectors[slot] = vector
+                self._slots[key] = slot
+                assigned.append((key, slot))
+                for position in positions:
+                    results[position] = list(vector)
+            # A batch of more than max_entries misses evicts some of its own keys again.
+            self._append_journal([(key, slot) for key, slot in assigned if self._slots.get(key) == slot])
+        return results
+
+    def _append_journal(self, entries: List[Tuple[str, int]]) -> None:
+        # The vectors reach the file before the rows that point at them.
+        self._vectors.flush()
+        with open(os.path.join(self.cache_dir, JOURNAL_FILE_NAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"dimension": self._dimension, "capacity": self._capacity, "entries": entries}) + "\n")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        embed_queries = getattr(self.embeddings, 'embed_queries', None)
+        if embed_queries is not None:
+            return embed_queries(texts)
+        return self.embeddings.embed_documents(texts)
+
+    def flush(self) -> None:
+        """
+        Writes the vectors and the whole hash index to disk, replacing the journal.
+        """
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        index_path = os.path.join(self.cache_dir, INDEX_FILE_NAME)
+        temp_path = index_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dimension": self._dimension,
+                "capacity": self._capacity,
+                "entries": list(self._slots.items()),
+            }, f)
+        os.replace(temp_path, index_path)
+        journal_path = os.path.join(self.cache_dir, JOURNAL_FILE_NAME)
+        if os.path.isfile(journal_path):
+            os.remove(journal_path)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit and miss counters since this instance was created.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._slots),
+        }
@@ -0,0 +1,170 @@
+# metadata_index.py
+
+from array import array
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from document_processor.markdown_tree import SECTION_PATH_SEPARATOR
+
+METADATA_INDEX_FILE_NAME = "metadata.npz"
+
+# The chunk metadata fields a search can be restricted to. A section_path value
+# matches the chunks of that section and of every section nested under it.
+FILTER_FIELDS = ("file_name", "section_name", "page_title", "section_path")
+
+# field -> one value, or a list of accepted values
+MetadataFilter = Mapping[str, Union[str, Sequence[str]]]
+
+
+class MetadataIndex:
+    """
+    Maps each value of the filterable metadata fields to the FAISS positions of
+    the chunks carrying it.
+
+    Positions follow the vector store: chunks are appended in the order they are
+    added to the index, and a deletion renumbers the remaining ones in order,
+    exactly as the FAISS index does. Positions are kept in compact int64 arrays,
+    and a filter resolves to the positions the FAISS search is restricted to
+    (see ann_index.filtered_search), instead of filtering its results afterwards.
+    """
+
+    def __init__(self):
+        self.size = 0
+        # field -> value -> positions, appended in increasing order
+        self._positions: Dict[str, Dict[str, array]] = {field: {} for field in FILTER_FIELDS}
+
+    @staticmethod
+    def _field_values(metadata: Mapping) -> Iterator[Tuple[str, str]]:
+        """
+        Yields the (field, value) pairs a chunk with this metadata is filed under.
+        """
+        for field in FILTER_FIELDS:
+            value = metadata.get(field)
+            if value is None:
+                continue
+            if field == "section_path":
+                # A chunk is filed under its own path and each enclosing one,
+                # so a path filter selects a whole subtree in one lookup.
+                names = value.split(SECTION_PATH_SEPARATOR)
+                for depth in range(1, len(names) + 1):
+                    yield field, SECTION_PATH_SEPARATOR.join(names[:depth])
+            else:
+                yield field, value
+
+    def append(self, metadatas: Iterable[Mapping]) -> None:
+        """
+        Records the metadata of chunks appended to the vector store, in order.
+        """
+        for metadata in metadatas:
+            for field, value in self._field_values(metadata):
+                self._positions[field].setdefault(value, array('q')).append(self.size)
+            self.size += 1
+
+    def relabel(self, position: int, old_metadatas: Iterable[Mapping], new_metadatas: Iterable[Mapping]) -> None:
+        """
+        Refiles the chunk at a position from the values of one set of metadata
+        to those of another. A chunk stored once for several places in the
+        corpus is filed under the values of all of them.
+        """
+        old = {pair for metadata in old_metadatas for pair in self._field_values(metadata)}
+        new = {pair for metadata in new_metadatas for pair in self._field_values(metadata)}
+        for field, value in old - new:
+            positions = np.frombuffer(self._positions[field][value], dtype=np.int64)
+            remaining = positions[positions != position]
+            if len(remaining):
+                self._positions[field][value] = array('q', remaining.tobytes())
+            else:
+                del self._positions[field][value]
+        for field, value in new - old:
+            positions = self._array(field, value)
+            at = int(np.searchsorted(positions, position))
+            self._positions[field][value] = array('q', np.insert(positions, at, position).tobytes())
+
+    def remove_positions(self, positions: Iterable[int]) -> None:
+        """
+        Drops chunks by position and renumbers the rest, as a FAISS deletion does.
+        """
+        keep = np.ones(self.size, dtype=bool)
+        keep[np.fromiter(positions, dtype=np.int64)] = False
+        new_position = np.cumsum(keep, dtype=np.int64) - 1
+        for values in self._positions.values():
+            for value in list(values):
+                old = np.frombuffer(values[value], dtype=np.int64)
+                remaining = new_position[old[keep[old]]]
+                if len(remaining):
+                    values[value] = array('q', remaining.tobytes())
+                else:
+                    del values[value]
+        self.size = int(keep.sum())
+
+    def _array(self, field: str, value: str) -> np.ndarray:
+        positions = self._positions[field].get(value)
+        return np.frombuffer(positions, dtype=np.int64) if positions else np.empty(0, dtype=np.int64)
+
+    def matching_positions(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """
+        Returns the sorted positions of the chunks matching every field of the filter
+        (and any of the values given for a field).
+
+        Raises:
+            ValueError: If the filter names a field that cannot be filtered on.
+        """
+        matches: Optional[np.ndarray] = None
+        for field, values in metadata_filter.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Cannot filter on '{field}'. Filterable fields: {', '.join(FILTER_FIELDS)}.")
+            if isinstance(values, str):
+                values = [values]
+            field_matches = np.unique(np.concatenate(
+                [self._array(field, value) for value in values] or [np.empty(0, dtype=np.int64)]
+            ))
+            matches = field_matches if matches is None else np.intersect1d(matches, field_matches, assume_unique=True)
+        return matches if matches is not None else np.arange(self.size, dtype=np.int64)
+
+    @classmethod
+    def from_store(cls, vector_store) -> 'MetadataIndex':
+        """
+        Builds an index from a LangChain FAISS store, in index position order.
+        """
+        index = cls()
+        docstore = vector_store.docstore
+        index.append(
+            docstore.search(vector_store.index_to_docstore_id[position]).metadata
+            for position in range(vector_store.index.ntotal)
+        )
+        return index
+
+    def iter_positions(self) -> Iterator[Tuple[str, str, np.ndarray]]:
+        """
+        Yields each (field, value) with the sorted positions of the chunks carrying it.
+        """
+        for field, value_positions in self._positions.items():
+            for value in value_positions:
+                yield field, value, self._array(field, value)
+
+    def save(self, file_path: str) -> None:
+        fields, values, offsets, positions = [], [], [0], array('q')
+        for field, value, value_positions in self.iter_positions():
+            fields.append(field)
+            values.append(value)
+            positions.frombytes(value_positions.tobytes())
+            offsets.append(len(positions))
+        np.savez(
+            file_path,
+            fields=np.array(fields, dtype=str),
+            values=np.array(values, dtype=str),
+            offsets=np.array(offsets, dtype=np.int64),
+            positions=np.frombuffer(positions, dtype=np.int64),
+            size=np.array(self.size),
+        )
+
+    @classmethod
+    def load(cls, file_path: str) -> 'MetadataIndex':
+        index = cls()
+        with np.load(file_path) as data:
+            offsets, positions = data["offsets"], data["positions"]
+            for i, (field, value) in enumerate(zip(data["fields"].tolist(), data["values"].tolist())):
+                index._positions[field][value] = array('q', positions[offsets[i]:offsets[i + 1]].tobytes())
+            index.size = int(data["size"])
+        return index
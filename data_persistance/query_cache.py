@@ -0,0 +1,97 @@
+# query_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+
+def normalize_query(text: str) -> str:
+    """
+    Collapses all runs of whitespace so formatting-only differences share a cache entry.
+    """
+    return " ".join(text.split())
+
+
+def filter_key(metadata_filter: Optional[Mapping]) -> Tuple:
+    """
+    Returns a hashable, order-independent form of a metadata filter
+    (field -> value or list of values), so equal filters share a cache entry.
+    """
+    if not metadata_filter:
+        return ()
+    return tuple(sorted(
+        (field, (values,) if isinstance(values, str) else tuple(sorted(values)))
+        for field, values in metadata_filter.items()
+    ))
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe in-memory cache with least-recently-used eviction
+    and an optional time-to-live per entry.
+
+    A max_entries of 0 disables the cache: nothing is stored and every lookup misses.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries (int): The maximum number of entries kept before eviction.
+            ttl_seconds (Optional[float]): How long an entry stays valid, or None for no expiry.
+        """
+        if max_entries < 0:
+            raise ValueError("max_entries must not be negative.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry time, value), ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.max_entries:
+            return
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit and miss counts, the hit rate and the number of entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,367 @@
+# query_service.py
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple, Union
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.query_cache import filter_key
+from data_persistance.search_processor import SEARCH_MODES, create_search_processor
+from instrumentation import metrics
+
+# --- Service defaults ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_K = 4
+MAX_K = 100
+MAX_BODY_BYTES = 1 << 20
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent queries into batches for SearchProcessor.
+
+    A batch is closed when it holds max_batch_size queries or when max_wait_ms
+    has passed since its first query arrived. Each batch is answered with one
+    retrieve_and_reconstruct_sections_batch call (one embedding call and one
+    FAISS search per distinct k and filter) on a single worker thread, so the event loop
+    keeps accepting requests meanwhile, and queries arriving during a search
+    form the next batch.
+    """
+
+    def __init__(self, searcher, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        """
+        Initializes the batcher. Call start() from the event loop before submitting.
+
+        Args:
+            searcher (SearchProcessor): The processor that answers the batches.
+            max_batch_size (int): The most queries answered by one search.
+            max_wait_ms (float): How long the first query of a batch waits for company.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.searcher = searcher
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # One thread: searches run one batch at a time, which is what lets batches fill up.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, query: str, k: int, metadata_filter: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        Queues a query and waits for its reconstructed sections.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((query, k, metadata_filter, future))
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[str, int, Optional[Dict], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            # Queries sharing k and filter are answered by one search.
+            groups: Dict[Tuple, Tuple[Optional[Dict], List[Tuple[str, asyncio.Future]]]] = {}
+            for query, k, metadata_filter, future in batch:
+                group = groups.setdefault((k, filter_key(metadata_filter)), (metadata_filter, []))
+                group[1].append((query, future))
+            for (k, _), (metadata_filter, items) in groups.items():
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor, functools.partial(
+                            self.searcher.retrieve_and_reconstruct_sections_batch,
+                            [query for query, _ in items], k, filter=metadata_filter
+                        )
+                    )
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), sections in zip(items, results):
+                    if not future.done():
+                        future.set_result(sections)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the number of requests and batches and the batch sizes.
+        """
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+
+class QueryService:
+    """
+    Serves a SearchProcessor over HTTP/JSON on an asyncio event loop.
+
+    Endpoints:
+        POST /query   {"query": "...", "k": 4, "filter": {"file_name": ["setup"]}}
+                      ->  {"results": {section_id: {"content", "metadata"}}}
+                      The filter is optional; see SearchProcessor.search_batch.
+        GET  /stats   batching and cache statistics, and stage metrics as JSON
+        GET  /metrics stage timings and counters in the Prometheus text format
+                      (recorded only while instrumentation is enabled)
+        GET  /health  {"status": "ok"}
+
+    Connections are kept alive between requests (HTTP/1.1), so a client does not
+    pay for a new connection per query. Errors are answered with {"error": "..."}:
+    400 for a malformed request and 500 for a search that fails.
+    """
+
+    def __init__(self, searcher, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        """
+        Initializes the service.
+
+        Args:
+            searcher (SearchProcessor): The processor that answers queries.
+            host (str): The interface to listen on.
+            port (int): The port to listen on; 0 picks a free one.
+            max_batch_size (int): The most queries answered by one search.
+            max_wait_ms (float): How long a query waits for others to batch with.
+        """
+        self.searcher = searcher
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(searcher, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """
+        Starts listening. The bound port is stored in self.port.
+        """
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers: Dict[str, str] = {}
+                malformed_header = False
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, separator, value = line.decode('latin-1').partition(':')
+                    malformed_header = malformed_header or not separator or not name.strip()
+                    headers[name.strip().lower()] = value.strip()
+
+                if len(parts) != 3:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line."}, False)
+                    break
+                method, target, version = parts
+                length = _content_length(headers.get('content-length'))
+                if malformed_header or length is None:
+                    # Where the body ends is unknown, so the connection cannot be reused.
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed headers."}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large."}, False)
+                    break
+                body = await reader.readexactly(length)
+
+                try:
+                    status, payload = await self._route(method, target, body)
+                except Exception as e:
+                    # A failed search answers this request; the connection stays usable.
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Search failed: {e}"}
+                keep_alive = version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Union[Dict, str]]:
+        path = target.split('?', 1)[0]
+        if path == "/query":
+            if method != "POST":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST for /query."}
+            try:
+                request = json.loads(body)
+                query, k = request["query"], request.get("k", DEFAULT_K)
+                if not isinstance(query, str) or not query.strip():
+                    raise ValueError("'query' must be a non-empty string.")
+                if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= MAX_K:
+                    raise ValueError(f"'k' must be an integer between 1 and {MAX_K}.")
+                metadata_filter = request.get("filter") or None
+                if metadata_filter is not None and not _is_valid_filter(metadata_filter):
+                    raise ValueError("'filter' must map field names to a string or a list of strings.")
+            except (ValueError, KeyError, TypeError) as e:
+                return HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {e}"}
+            try:
+                results = await self.batcher.submit(query, k, metadata_filter)
+            except ValueError as e:
+                # Raised by the search for a filter on a field that cannot be filtered on.
+                return HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {e}"}
+            return HTTPStatus.OK, {"results": results}
+        if path == "/stats" and method == "GET":
+            return HTTPStatus.OK, {"batching": self.batcher.stats(), "caches": self.searcher.cache_stats(),
+                                   "metrics": metrics.REGISTRY.snapshot()}
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, metrics.REGISTRY.to_prometheus()
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {path}."}
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Union[Dict, str],
+                       keep_alive: bool) -> None:
+        # Text payloads are Prometheus expositions; everything else is JSON.
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), "application/json"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def _content_length(value: Optional[str]) -> Optional[int]:
+    """
+    Returns the body length a Content-Length header gives, 0 without one, or None if it is not a valid length.
+    """
+    if value is None:
+        return 0
+    if not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
+
+
+def _is_valid_filter(metadata_filter) -> bool:
+    if not isinstance(metadata_filter, dict):
+        return False
+    return all(
+        isinstance(values, str) or (isinstance(values, list) and all(isinstance(value, str) for value in values))
+        for values in metadata_filter.values()
+    )
+
+
+def main():
+    """
+    Loads a saved store once and serves queries until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Serve a pre-built FAISS vector store over HTTP/JSON.")
+    parser.add_argument('--index_path', type=str, required=True,
+                        help="Path to the saved FAISS index folder, or to a store exported for serving.")
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help="Interface to listen on.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument('--max_batch_size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Most queries answered by one embedding call and FAISS search.")
+    parser.add_argument('--max_wait_ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="How long a query waits for others to batch with.")
+    parser.add_argument('--search_mode', type=str, choices=SEARCH_MODES, default="vector",
+                        help="Dense vector search, BM25 lexical search, or both fused (hybrid).")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Record per-stage timings and counters, served on GET /metrics.")
+    parser.add_argument('--score_threshold', type=float, default=None,
+                        help="Drop chunks whose FAISS distance is past this value (the largest L2 distance "
+                             "kept), so an irrelevant query returns nothing instead of k chunks. "
+                             "Not available in lexical mode.")
+    parser.add_argument('--adaptive_k', action='store_true',
+                        help="Return fewer than k chunks when their scores fall off, cutting each ranking "
+                             "at its largest score gap.")
+    args = parser.parse_args()
+    if args.score_threshold is not None and args.search_mode == "lexical":
+        parser.error("--score_threshold applies to vector distances; it cannot be used with lexical search.")
+    if args.metrics:
+        metrics.enable()
+
+    # Imported only once the arguments are valid: this pulls in LangChain and FAISS.
+    from data_persistance.serving_store import open_store
+
+    try:
+        print(f"Loading vector store from: {args.index_path}")
+        store = open_store(args.index_path)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"\nAn error occurred: {e}")
+        sys.exit(1)
+    searcher = create_search_processor(store, search_mode=args.search_mode,
+                                       score_threshold=args.score_threshold, adaptive_k=args.adaptive_k)
+    service = QueryService(searcher, host=args.host, port=args.port,
+                           max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    print(f"Serving on http://{args.host}:{args.port} (POST /query, GET /stats, GET /health)")
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,47 @@
 # search_processor.py
 
+from __future__ import annotations
+
 import argparse
+import heapq
 import json
 import os
 import sys
-from typing import Dict, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby, islice
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from data_persistance.query_cache import LRUCache, filter_key, normalize_query
+from data_persistance.section_index import SectionIndex
+from instrumentation import metrics
 
+# LangChain, FAISS and numpy take around a second to import, so they are only
+# imported where they are used. A vector store handed to SearchProcessor means
+# they are already loaded; the CLI parses its arguments before loading them.
 # To make this module runnable, you might need to install the following packages:
 # pip install langchain langchain-community faiss-cpu sentence-transformers
-from langchain_community.vectorstores import FAISS
-from langchain.docstore.document import Document
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    import numpy as np
+    from langchain_core.documents import Document
+    from data_persistance.bm25_index import BM25Index, TermStatistics
+    from data_persistance.metadata_index import MetadataFilter, MetadataIndex
+
+# (chunk id, score) pairs, best first: FAISS distances, BM25 scores or fused
+# reciprocal-rank scores.
+ScoredRanking = List[Tuple[str, float]]
 
-# We need the VectorStoreManager's load_local method to get the store
-from data_persistance.document_persistance import VectorStoreManager
+# Metadata that differs between the chunks of one section.
+_CHUNK_POSITION_KEYS = ('chunk_index', 'start_index', 'end_index', 'locations')
+
+# --- Search modes ---
+# vector:  dense FAISS search only.
+# lexical: BM25 only, for exact identifiers, error codes and command names.
+# hybrid:  both, fused by reciprocal rank (each ranking contributes 1 / (RRF_K + rank)).
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+RRF_K = 60
+# Each ranking contributes this many times k candidates to the fusion.
+HYBRID_CANDIDATES_FACTOR = 4
 
 
 class SearchProcessor:
@@ -21,57 +50,368 @@ class SearchProcessor:
     This class is responsible for the 'retrieval' part of the pipeline.
     """
 
-    def __init__(self, vector_store: FAISS):
+    def __init__(self, vector_store: FAISS, section_index: Optional[SectionIndex] = None,
+                 query_cache_size: int = 1024, result_cache_size: int = 256,
+                 cache_ttl_seconds: Optional[float] = None,
+                 bm25_index: Optional[BM25Index] = None, search_mode: str = "vector",
+                 metadata_index: Optional[MetadataIndex] = None,
+                 score_threshold: Optional[float] = None, adaptive_k: bool = False):
         """
         Initializes the SearchProcessor with a loaded vector store.
 
         Args:
             vector_store (FAISS): An initialized FAISS vector store instance.
+            section_index (Optional[SectionIndex]): The section index maintained with the
+                store (VectorStoreManager.section_index). If omitted, one is built from
+                the docstore once, here.
+            query_cache_size (int): The number of query embeddings kept, keyed by
+                normalized query text and embedding model. 0 disables the cache.
+            result_cache_size (int): The number of reconstructed-section results kept,
+                keyed by normalized query, k, filter, the section index version and the
+                index's search parameters. 0 disables the cache.
+            cache_ttl_seconds (Optional[float]): How long cached entries stay valid, or None for no expiry.
+            bm25_index (Optional[BM25Index]): The lexical index maintained with the store
+                (VectorStoreManager.bm25_index). If omitted and a lexical or hybrid search
+                mode is used, one is built from the docstore once, here.
+            search_mode (str): One of "vector", "lexical" or "hybrid".
+            metadata_index (Optional[MetadataIndex]): The filterable metadata positions
+                maintained with the store (VectorStoreManager.metadata_index). If omitted,
+                one is built from the docstore on the first filtered search.
+            score_threshold (Optional[float]): The FAISS distance past which a chunk is
+                not relevant: the largest distance kept for an L2 index, the smallest
+                inner product for an inner-product index. A query with no chunk within
+                it returns none, and the sections of dropped chunks are never
+                reconstructed. In hybrid mode it cuts the dense ranking before fusion.
+                Lexical mode has no distances; BM25 only returns chunks sharing a
+                query term.
+            adaptive_k (bool): Whether to return fewer than k chunks when their scores
+                fall off: each ranking is cut at the largest gap between consecutive
+                scores among its k + 1 best chunks.
+
+        Raises:
+            TypeError: If vector_store is not a LangChain FAISS store.
+            ValueError: If the search mode is unknown, or a score threshold is given
+                for lexical search.
         """
+        from langchain_community.vectorstores import FAISS
         if not isinstance(vector_store, FAISS):
             raise TypeError("vector_store must be an instance of langchain_community.vectorstores.FAISS")
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{search_mode}'. Expected one of {', '.join(SEARCH_MODES)}.")
+        if score_threshold is not None and search_mode == "lexical":
+            raise ValueError("score_threshold applies to vector distances, which lexical search does not compute.")
+        self.search_mode = search_mode
+        self.score_threshold = score_threshold
+        self.adaptive_k = adaptive_k
+        import faiss
+        # Inner products rank the largest first, L2 distances the smallest.
+        self._descending = vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        if bm25_index is None and search_mode != "vector":
+            from data_persistance.bm25_index import BM25Index
+            from data_persistance.chunk_store import document_mapping
+            bm25_index = BM25Index.from_docstore(document_mapping(vector_store.docstore))
+        self.bm25_index = bm25_index
+        self.metadata_index = metadata_index
         self.vector_store = vector_store
+        if section_index is None:
+            from data_persistance.chunk_store import document_mapping
+            section_index = SectionIndex.from_docstore(document_mapping(vector_store.docstore))
+        self.section_index = section_index
+        self.query_embedding_cache = LRUCache(query_cache_size, cache_ttl_seconds)
+        self.result_cache = LRUCache(result_cache_size, cache_ttl_seconds)
+        self._cached_version = self._index_version()
+
+    def query_vector_store(self, query: str, k: int = 4,
+                           filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """
+        Performs a search in the processor's search mode to find relevant chunks,
+        optionally restricted to chunks whose metadata matches `filter`.
+        """
+        return self.search_batch([query], k=k, filter=filter)[0]
+
+    def query_vector_store_with_scores(self, query: str, k: int = 4,
+                                       filter: Optional[MetadataFilter] = None) -> List[Tuple[Document, float]]:
+        """
+        The form of query_vector_store that also returns each chunk's score (see search_batch_with_scores).
+        """
+        return self.search_batch_with_scores([query], k=k, filter=filter)[0]
+
+    def search_batch(self, queries: List[str], k: int = 4,
+                     filter: Optional[MetadataFilter] = None) -> List[List[Document]]:
+        """
+        Finds the relevant chunks for many queries at once.
+
+        All queries are embedded in one batched model call and searched with a
+        single matrix FAISS search, which is far cheaper per query than calling
+        query_vector_store in a loop. In hybrid mode each query's FAISS and BM25
+        rankings are fused by reciprocal rank.
+
+        A filter restricts the search itself rather than its results: FAISS only
+        visits the chunks it allows, so a filtered query still returns k chunks
+        when k of them match, at about the cost of an unfiltered one.
+
+        Args:
+            queries (List[str]): The questions or texts to search for.
+            k (int): The number of top results to return per query.
+            filter (Optional[MetadataFilter]): Required values of file_name, section_name,
+                page_title and/or section_path, e.g. {"file_name": ["setup", "faq"]}. A chunk must
+                match every field given, and any of the values listed for a field. A
+                section_path such as "Setup > Python" also matches its subsections.
+
+        Returns:
+            One list of Documents per query, in the same order as the queries.
+            With a score_threshold or adaptive_k, a list may hold fewer than k.
+
+        Raises:
+            ValueError: If the filter names a field that cannot be filtered on.
+        """
+        return [[doc for doc, _ in scored] for scored in self.search_batch_with_scores(queries, k=k, filter=filter)]
+
+    def search_batch_with_scores(self, queries: List[str], k: int = 4,
+                                 filter: Optional[MetadataFilter] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        The form of search_batch that also returns each chunk's score: its FAISS
+        distance in vector mode (lower is closer for an L2 index, higher for an
+        inner-product index), its BM25 score in lexical mode and its
+        reciprocal-rank fusion score in hybrid mode (higher is better for both).
+
+        Returns:
+            One list of (Document, score) pairs per query, best first.
+        """
+        if not queries:
+            return []
+        metrics.count("queries", len(queries))
+        with metrics.stage("query"):
+            return self._search_batch(queries, k, filter)
+
+    def _search_batch(self, queries: List[str], k: int,
+                      filter: Optional[MetadataFilter]) -> List[List[Tuple[Document, float]]]:
+        vectors = self._query_vectors(queries) if self.search_mode != "lexical" else None
+        dense, lexical = self._scored_rankings(queries, vectors, self._candidate_count(k), filter)
+        docstore = self.vector_store.docstore
+        return [[(docstore.search(chunk_id), score) for chunk_id, score in ranking]
+                for ranking in self._final_rankings(dense, lexical, k)]
 
-    def query_vector_store(self, query: str, k: int = 4) -> List[Document]:
+    def _candidate_count(self, k: int) -> int:
         """
-        Performs a similarity search on the vector store to find relevant chunks.
+        Returns how many chunks each ranking contributes to the final k.
         """
-        return self.vector_store.similarity_search(query, k=k)
+        if self.adaptive_k:
+            # One more than is returned, so the largest gap can fall after the last chunk.
+            k += 1
+        return k * HYBRID_CANDIDATES_FACTOR if self.search_mode == "hybrid" else k
 
-    def retrieve_and_reconstruct_sections(self, query: str, k: int = 4) -> Dict[str, Dict]:
+    def _final_rankings(self, dense: Optional[List[ScoredRanking]], lexical: Optional[List[ScoredRanking]],
+                        k: int) -> List[ScoredRanking]:
+        """
+        Cuts the dense rankings at the score threshold, fuses them with the lexical
+        ones and cuts each result at its largest score gap if adaptive_k is set.
+        """
+        if self.score_threshold is not None and dense is not None:
+            candidates = sum(len(ranking) for ranking in dense)
+            dense = [_within_threshold(ranking, self.score_threshold, self._descending) for ranking in dense]
+            metrics.count("chunks_below_threshold", candidates - sum(len(ranking) for ranking in dense))
+        if not self.adaptive_k:
+            return _fuse_rankings(dense, lexical, k)
+        return [_cut_at_largest_gap(ranking)[:k] for ranking in _fuse_rankings(dense, lexical, k + 1)]
+
+    def _scored_rankings(self, queries: List[str], vectors: Optional[np.ndarray], k: int,
+                         filter: Optional[MetadataFilter],
+                         lexical_statistics: Optional[List[TermStatistics]] = None
+                         ) -> Tuple[Optional[List[ScoredRanking]], Optional[List[ScoredRanking]]]:
+        """
+        Returns the k best (chunk id, score) pairs of each query from the FAISS
+        index (given the query vectors) and from BM25 (unless the search mode is
+        vector), or None for a ranking that is not computed.
+
+        Args:
+            lexical_statistics: Per query, the corpus statistics to score BM25 with,
+                if the store is one part of a larger corpus.
+        """
+        allowed_positions = self._allowed_positions(filter) if filter else None
+        dense = self._search_vectors(vectors, k, allowed_positions) if vectors is not None else None
+        lexical = None
+        if self.search_mode != "vector":
+            allowed_ids = None
+            if allowed_positions is not None:
+                index_to_docstore_id = self.vector_store.index_to_docstore_id
+                allowed_ids = [index_to_docstore_id[position] for position in allowed_positions.tolist()]
+            statistics = lexical_statistics or [None] * len(queries)
+            with metrics.stage("lexical_search"):
+                lexical = [self.bm25_index.search(query, k, allowed_ids, query_statistics)
+                           for query, query_statistics in zip(queries, statistics)]
+        return dense, lexical
+
+    def _allowed_positions(self, filter: MetadataFilter) -> np.ndarray:
+        """
+        Resolves a filter to the FAISS positions of the chunks it matches.
+        """
+        if self.metadata_index is None or self.metadata_index.size != self.vector_store.index.ntotal:
+            # Missing, or out of step with a store that was changed directly.
+            from data_persistance.metadata_index import MetadataIndex
+            self.metadata_index = MetadataIndex.from_store(self.vector_store)
+        return self.metadata_index.matching_positions(filter)
+
+    def _query_vectors(self, queries: List[str]) -> np.ndarray:
+        """
+        Embeds queries into the float32 matrix the FAISS index is searched with.
+        """
+        import faiss
+        import numpy as np
+
+        vectors = np.asarray(self._embed_queries(queries), dtype=np.float32)
+        if self.vector_store._normalize_L2:
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _search_vectors(self, vectors: np.ndarray, k: int,
+                        allowed_positions: Optional[np.ndarray] = None) -> List[ScoredRanking]:
+        """
+        Returns the (chunk id, distance) pairs of the k nearest chunks of each
+        query vector, nearest first, among the allowed positions if given.
+        """
+        with metrics.stage("vector_search"):
+            if allowed_positions is None:
+                distances, indices = self.vector_store.index.search(vectors, k)
+            else:
+                from data_persistance.ann_index import filtered_search
+                distances, indices = filtered_search(self.vector_store.index, vectors, k, allowed_positions)
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        return [
+            [(index_to_docstore_id[i], float(distance)) for distance, i in zip(row_distances, row) if i != -1]
+            for row_distances, row in zip(distances.tolist(), indices.tolist())
+        ]
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embeds queries, serving repeated ones from the query embedding cache.
+
+        The remaining queries are embedded in one call, preferring an embedder's
+        batched query method so query vectors do not go through document caches.
+        """
+        embeddings = self.vector_store.embeddings
+        model = (getattr(embeddings, 'cache_identity', None) or getattr(embeddings, 'model_name', None)
+                 or type(embeddings).__name__)
+        keys = [(model, normalize_query(query)) for query in queries]
+        vectors = [self.query_embedding_cache.get(key) for key in keys]
+
+        # Each distinct missing query is embedded once, in its normalized form.
+        missing: Dict[Tuple[str, str], None] = {key: None for key, vector in zip(keys, vectors) if vector is None}
+        if missing:
+            texts = [text for _, text in missing]
+            embed_queries = getattr(embeddings, 'embed_queries', None)
+            with metrics.stage("query_embed"):
+                new_vectors = embed_queries(texts) if embed_queries is not None else embeddings.embed_documents(texts)
+            embedded = dict(zip(missing, new_vectors))
+            for key, vector in embedded.items():
+                self.query_embedding_cache.put(key, vector)
+            vectors = [vector if vector is not None else embedded[key] for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def _result_key(self, query: str, k: int, filter: Optional[MetadataFilter] = None) -> Tuple:
+        """
+        Keys a reconstructed-section result. Results cached for an older version
+        of the section index, or under other index search parameters, are dropped
+        as soon as the store or its parameters have changed.
+        """
+        version = self._index_version()
+        if version != self._cached_version:
+            self.result_cache.clear()
+            self._cached_version = version
+        return normalize_query(query), k, filter_key(filter), self.search_mode, version
+
+    def _index_version(self) -> Tuple:
+        from data_persistance.ann_index import search_params
+        return self.section_index.version, search_params(self.vector_store.index)
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the hit-rate statistics of the query embedding and result caches.
+        """
+        return {"query_embeddings": self.query_embedding_cache.stats(), "results": self.result_cache.stats()}
+
+    def clear_caches(self) -> None:
+        """
+        Empties both caches.
+        """
+        self.query_embedding_cache.clear()
+        self.result_cache.clear()
+
+    def retrieve_and_reconstruct_sections(self, query: str, k: int = 4,
+                                          filter: Optional[MetadataFilter] = None) -> Dict[str, Dict]:
         """
         Retrieves relevant documents and reconstructs their full sections.
 
         Args:
             query (str): The question or text to search for.
             k (int): The number of top initial chunks to retrieve.
+            filter (Optional[MetadataFilter]): Restricts the search to chunks with these
+                file_name, section_name, page_title and/or section_path values (see search_batch).
 
         Returns:
             A dictionary where each key is a unique section identifier and the value
             is a dictionary containing the reconstructed content and metadata.
         """
-        relevant_chunks = self.query_vector_store(query, k=k)
+        key = self._result_key(query, k, filter)
+        sections = self.result_cache.get(key)
+        if sections is None:
+            chunks = self.query_vector_store(query, k=k, filter=filter)
+            with metrics.stage("reconstruct"):
+                sections = self._sections_for_chunks(chunks, {})
+            self.result_cache.put(key, sections)
+        return _copy_sections(sections)
+
+    def retrieve_and_reconstruct_sections_batch(self, queries: List[str], k: int = 4,
+                                                filter: Optional[MetadataFilter] = None) -> List[Dict[str, Dict]]:
+        """
+        The batched form of retrieve_and_reconstruct_sections.
+
+        Cached results are served directly; the other queries are searched with
+        search_batch, and a section hit by several queries is reconstructed only once.
+
+        Returns:
+            One dictionary of reconstructed sections per query, in query order.
+        """
+        keys = [self._result_key(query, k, filter) for query in queries]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, sections in enumerate(results) if sections is None]
+        if missing:
+            reconstructed: Dict[Tuple[str, str], Tuple[str, Dict]] = {}
+            chunk_lists = self.search_batch([queries[i] for i in missing], k=k, filter=filter)
+            with metrics.stage("reconstruct"):
+                for i, chunks in zip(missing, chunk_lists):
+                    results[i] = self._sections_for_chunks(chunks, reconstructed)
+                    self.result_cache.put(keys[i], results[i])
+        return [_copy_sections(sections) for sections in results]
+
+    def _sections_for_chunks(self, relevant_chunks: List[Document],
+                             reconstructed: Dict[Tuple[str, str], Tuple[str, Dict]]) -> Dict[str, Dict]:
+        """
+        Reconstructs the sections of the given chunks, reusing and filling the
+        `reconstructed` memo of (content, metadata) per section.
+        """
         if not relevant_chunks:
             return {}
 
-        unique_section_keys: Set[Tuple[str, str]] = set()
+        # A dict keeps the sections in the order of their best-ranked chunk,
+        # with the (file_name, section_name) locations of any of its chunks that
+        # were stored once for several places (see VectorStoreManager dedup_threshold).
+        unique_section_keys: Dict[Tuple[str, str], Dict[Tuple[str, str], None]] = {}
         for chunk in relevant_chunks:
             key = (chunk.metadata['file_name'], chunk.metadata['section_name'])
-            unique_section_keys.add(key)
+            locations = unique_section_keys.setdefault(key, {})
+            for location in chunk.metadata.get('locations', ()):
+                locations[tuple(location)] = None
 
         reconstructed_sections = {}
-        all_docs = self.vector_store.docstore._dict.values()
-
-        for file_name, section_name in unique_section_keys:
-            section_chunks = [
-                doc for doc in all_docs
-                if doc.metadata['file_name'] == file_name and doc.metadata['section_name'] == section_name
-            ]
-            section_chunks.sort(key=lambda x: x.metadata.get('chunk_index', 0))
-
-            full_content = " ".join([doc.page_content for doc in section_chunks])
-            representative_metadata = section_chunks[0].metadata
+        for key, locations in unique_section_keys.items():
+            if key not in reconstructed:
+                reconstructed[key] = self._reconstruct_section(*key)
+            full_content, representative_metadata = reconstructed[key]
+            if locations:
+                representative_metadata = dict(representative_metadata, locations=[list(location) for location in locations])
 
+            file_name, section_name = key
             section_id = f"{file_name} - {section_name}"
             reconstructed_sections[section_id] = {
                 "content": full_content,
@@ -80,21 +420,323 @@ class SearchProcessor:
 
         return reconstructed_sections
 
-if __name__ == '__main__':
+    def _reconstruct_section(self, file_name: str, section_name: str) -> Tuple[str, Dict]:
+        """
+        Rebuilds the full text of a section from its chunks' offsets.
+
+        Each occurrence of the heading in the file is sliced out of the stored
+        section text from its first chunk's start to its last chunk's end, so the
+        chunk_overlap is not repeated at the seams. An occurrence that lost chunks
+        to deduplication is sliced by its recorded span instead, since its own
+        chunks no longer reach its ends. Without a stored text the chunks are
+        stitched together by their offsets.
+
+        Returns:
+            The section content and the section-level metadata of its first chunk.
+
+        Raises:
+            KeyError: If the section is not in the store.
+        """
+        # (ordinal, content, metadata of its first chunk) per occurrence.
+        occurrences = []
+        spanned = set()
+        for ordinal, (start, end, metadata) in self.section_index.get_section_spans(file_name, section_name).items():
+            section_text = self.section_index.get_section_text(file_name, ordinal)
+            if section_text is not None:
+                occurrences.append((ordinal, section_text[start:end], metadata))
+                spanned.add(ordinal)
+
+        docstore = self.vector_store.docstore
+        chunk_ids = self.section_index.get_chunk_ids(file_name, section_name)
+        section_chunks = [docstore.search(chunk_id) for chunk_id in chunk_ids]
+        for ordinal, group in groupby(section_chunks, key=lambda doc: doc.metadata.get('section_index')):
+            if ordinal in spanned:
+                continue
+            chunks = list(group)
+            section_text = None
+            if ordinal is not None:
+                section_text = self.section_index.get_section_text(file_name, ordinal)
+            if section_text is not None:
+                content = section_text[chunks[0].metadata['start_index']:chunks[-1].metadata['end_index']]
+            else:
+                content = _stitch_chunks(chunks)
+            occurrences.append((ordinal, content, chunks[0].metadata))
+        if not occurrences:
+            raise KeyError(f"No section '{section_name}' of '{file_name}' in the store.")
+        occurrences.sort(key=lambda occurrence: -1 if occurrence[0] is None else occurrence[0])
+
+        representative_metadata = {
+            key: value for key, value in occurrences[0][2].items() if key not in _CHUNK_POSITION_KEYS
+        }
+        return "\n\n".join(content for _, content, _ in occurrences), representative_metadata
+
+
+class ShardedSearchProcessor(SearchProcessor):
+    """
+    Searches the shards of a sharded store (see sharded_store.ShardedStore)
+    as one store.
+
+    Each query is embedded once, then every shard is searched concurrently on
+    a thread pool (FAISS releases the GIL while it searches), and the shards'
+    rankings are merged by score. Exact FAISS search over the union of the
+    shards returns the best of each shard's own k best, and BM25 is scored with
+    the statistics of the whole corpus, so results match those of a single
+    store holding every chunk, up to the order of chunks with equal scores. A
+    section lives in the shard of its file, which reconstructs it.
+    """
+
+    def __init__(self, shards: Sequence, query_cache_size: int = 1024, result_cache_size: int = 256,
+                 cache_ttl_seconds: Optional[float] = None, search_mode: str = "vector",
+                 max_workers: Optional[int] = None, score_threshold: Optional[float] = None,
+                 adaptive_k: bool = False):
+        """
+        Initializes the processor over the shards of a store.
+
+        Args:
+            shards (Sequence): The shards, each with the vector_store, section_index,
+                bm25_index and metadata_index SearchProcessor takes (e.g. the
+                VectorStoreManagers of ShardedStore.shards). Shards without chunks
+                (vector_store None) are skipped.
+            query_cache_size, result_cache_size, cache_ttl_seconds, search_mode,
+            score_threshold, adaptive_k:
+                As for SearchProcessor; the caches are shared by all shards, and the
+                cut-offs apply to the merged rankings.
+            max_workers (Optional[int]): The number of threads searching shards.
+                Defaults to one per shard.
+
+        Raises:
+            ValueError: If no shard holds any chunks, or the search mode is unknown.
+        """
+        self.shards = [
+            SearchProcessor(shard.vector_store, shard.section_index, query_cache_size=0, result_cache_size=0,
+                            bm25_index=shard.bm25_index, search_mode=search_mode,
+                            metadata_index=shard.metadata_index)
+            for shard in shards if shard.vector_store is not None
+        ]
+        if not self.shards:
+            raise ValueError("None of the shards holds any chunks.")
+        first = self.shards[0]
+        super().__init__(first.vector_store, first.section_index, query_cache_size, result_cache_size,
+                         cache_ttl_seconds, bm25_index=first.bm25_index, search_mode=search_mode,
+                         metadata_index=first.metadata_index, score_threshold=score_threshold,
+                         adaptive_k=adaptive_k)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.shards))
+
+    def _search_batch(self, queries: List[str], k: int,
+                      filter: Optional[MetadataFilter]) -> List[List[Tuple[Document, float]]]:
+        vectors = self._query_vectors(queries) if self.search_mode != "lexical" else None
+        statistics = None
+        if self.search_mode != "vector":
+            from data_persistance.bm25_index import combine_statistics
+            statistics = [combine_statistics(shard.bm25_index.term_statistics(query) for shard in self.shards)
+                          for query in queries]
+        candidates = self._candidate_count(k)
+        with metrics.stage("shard_search"):
+            shard_rankings = list(self._executor.map(
+                lambda shard: shard._scored_rankings(queries, vectors, candidates, filter, statistics), self.shards
+            ))
+
+        owners: Dict[str, SearchProcessor] = {}
+        for shard, rankings in zip(self.shards, shard_rankings):
+            for query_rankings in rankings:
+                for ranking in query_rankings or ():
+                    owners.update((chunk_id, shard) for chunk_id, _ in ranking)
+        dense = lexical = None
+        if vectors is not None:
+            dense = [_merge_rankings([rankings[0][i] for rankings in shard_rankings], candidates, self._descending)
+                     for i in range(len(queries))]
+        if statistics is not None:
+            lexical = [_merge_rankings([rankings[1][i] for rankings in shard_rankings], candidates, True)
+                       for i in range(len(queries))]
+        return [[(owners[chunk_id].vector_store.docstore.search(chunk_id), score) for chunk_id, score in ranking]
+                for ranking in self._final_rankings(dense, lexical, k)]
+
+    def _reconstruct_section(self, file_name: str, section_name: str) -> Tuple[str, Dict]:
+        for shard in self.shards:
+            if shard.section_index.get_chunk_ids(file_name, section_name) \
+                    or shard.section_index.get_section_spans(file_name, section_name):
+                return shard._reconstruct_section(file_name, section_name)
+        raise KeyError(f"No shard holds the section '{section_name}' of '{file_name}'.")
+
+    def _index_version(self) -> Tuple:
+        from data_persistance.ann_index import search_params
+        # Versions only grow, so their sum changes whenever any shard changes.
+        return (sum(shard.section_index.version for shard in self.shards),
+                tuple(search_params(shard.vector_store.index) for shard in self.shards))
+
+
+def create_search_processor(store, **kwargs) -> SearchProcessor:
+    """
+    Builds the processor for an opened store (see serving_store.open_store): a
+    ShardedSearchProcessor over the shards of a sharded store, a SearchProcessor
+    over any other. Keyword arguments are passed to the processor.
+    """
+    if hasattr(store, "shards"):
+        return ShardedSearchProcessor(store.shards, **kwargs)
+    search_mode = kwargs.get("search_mode", "vector")
+    return SearchProcessor(store.vector_store, store.section_index,
+                           bm25_index=store.bm25_index if search_mode != "vector" else None,
+                           metadata_index=store.metadata_index, **kwargs)
+
+
+def _merge_rankings(rankings: List[ScoredRanking], k: int, descending: bool) -> ScoredRanking:
+    """
+    Merges rankings that are each sorted by score into the k best pairs overall.
+    """
+    return list(islice(heapq.merge(*rankings, key=lambda pair: pair[1], reverse=descending), k))
+
+
+def _within_threshold(ranking: ScoredRanking, threshold: float, descending: bool) -> ScoredRanking:
+    """
+    Returns the head of a ranking whose scores are within the threshold: at least
+    it if higher scores are better, at most it if lower ones are.
+    """
+    for position, (_, score) in enumerate(ranking):
+        if (score < threshold) if descending else (score > threshold):
+            return ranking[:position]
+    return ranking
+
+
+def _cut_at_largest_gap(ranking: ScoredRanking) -> ScoredRanking:
+    """
+    Returns the chunks of a ranking up to the largest gap between consecutive scores.
+    """
+    if len(ranking) < 2:
+        return ranking
+    gaps = [abs(ranking[i][1] - ranking[i + 1][1]) for i in range(len(ranking) - 1)]
+    return ranking[:gaps.index(max(gaps)) + 1]
+
+
+def _fuse_rankings(dense: Optional[List[ScoredRanking]], lexical: Optional[List[ScoredRanking]],
+                   k: int) -> List[ScoredRanking]:
+    """
+    Returns each query's k best (chunk id, score) pairs: from its one ranking, or
+    from both fused by reciprocal rank.
+    """
+    if lexical is None:
+        return [ranking[:k] for ranking in dense]
+    if dense is None:
+        return [ranking[:k] for ranking in lexical]
+    return [
+        _reciprocal_rank_fusion([[chunk_id for chunk_id, _ in dense_ranking],
+                                 [chunk_id for chunk_id, _ in lexical_ranking]], k)
+        for dense_ranking, lexical_ranking in zip(dense, lexical)
+    ]
+
+
+def _reciprocal_rank_fusion(rankings: List[List[str]], k: int) -> ScoredRanking:
+    """
+    Merges rankings of chunk ids, scoring each id by the sum of 1 / (RRF_K + rank)
+    over the rankings that contain it, and returns the k best with their scores.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+
+
+def parse_filter_args(pairs: Optional[List[str]]) -> Optional[Dict[str, List[str]]]:
+    """
+    Turns repeated "field=value" command-line arguments into a search filter.
+    Values given for the same field are alternatives.
+
+    Raises:
+        ValueError: If an argument is not of the form field=value.
+    """
+    if not pairs:
+        return None
+    metadata_filter: Dict[str, List[str]] = {}
+    for pair in pairs:
+        field, separator, value = pair.partition('=')
+        if not separator or not field:
+            raise ValueError(f"Invalid filter '{pair}'. Expected field=value, e.g. file_name=setup.")
+        metadata_filter.setdefault(field.strip(), []).append(value.strip())
+    return metadata_filter
+
+
+def _copy_sections(sections: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Copies a cached result so callers cannot modify the cached one.
+    """
+    return {
+        section_id: {"content": section["content"], "metadata": dict(section["metadata"])}
+        for section_id, section in sections.items()
+    }
+
+
+def _stitch_chunks(chunks: List[Document]) -> str:
+    """
+    Joins consecutive chunks of one section, skipping the text each chunk repeats
+    from the previous one according to their start_index/end_index offsets.
+    """
+    parts: List[str] = []
+    covered_until: Optional[int] = None
+    for doc in chunks:
+        start = doc.metadata.get('start_index')
+        if covered_until is not None and start is not None and start < covered_until:
+            parts.append(doc.page_content[covered_until - start:])
+        else:
+            if parts:
+                # The splitter trims the whitespace at each seam.
+                parts.append(" ")
+            parts.append(doc.page_content)
+        covered_until = doc.metadata.get('end_index')
+    return "".join(parts)
+
+
+def main():
+    """
+    Loads a saved store and answers queries interactively or from a file.
+    """
     parser = argparse.ArgumentParser(description="Query a pre-built FAISS vector store.")
-    parser.add_argument('--index_path', type=str, required=True, help="Path to the saved FAISS index folder.")
+    parser.add_argument('--index_path', type=str, required=True,
+                        help="Path to the saved FAISS index folder, or to a store exported for serving.")
     parser.add_argument('--k', type=int, help="Number of top results to retrieve.", default=8)
+    parser.add_argument('--queries_file', type=str, default=None,
+                        help="Optional file with one query per line. All queries are answered in one batch and printed as JSON.")
+    parser.add_argument('--search_mode', type=str, choices=SEARCH_MODES, default="vector",
+                        help="Dense vector search, BM25 lexical search, or both fused (hybrid).")
+    parser.add_argument('--filter', action='append', default=None, metavar='FIELD=VALUE',
+                        help="Only search chunks with this file_name, section_name, page_title or section_path "
+                             "(a path such as 'Setup > Python' includes its subsections). "
+                             "Repeat to allow several values or require several fields.")
+    parser.add_argument('--score_threshold', type=float, default=None,
+                        help="Drop chunks whose FAISS distance is past this value (the largest L2 distance "
+                             "kept), so an irrelevant query returns nothing instead of k chunks. "
+                             "Not available in lexical mode.")
+    parser.add_argument('--adaptive_k', action='store_true',
+                        help="Return fewer than k chunks when their scores fall off, cutting each ranking "
+                             "at its largest score gap.")
     args = parser.parse_args()
+    if args.score_threshold is not None and args.search_mode == "lexical":
+        parser.error("--score_threshold applies to vector distances; it cannot be used with lexical search.")
+    try:
+        metadata_filter = parse_filter_args(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Imported only once the arguments are valid: this pulls in LangChain and FAISS.
+    from data_persistance.serving_store import open_store
 
     try:
         # 1. Load the pre-built vector store
         print(f"Loading vector store from: {args.index_path}")
-        vector_store = VectorStoreManager.load_local(args.index_path)
+        store = open_store(args.index_path)
 
         # 2. Instantiate the search processor
-        searcher = SearchProcessor(vector_store)
+        searcher = create_search_processor(store, search_mode=args.search_mode,
+                                           score_threshold=args.score_threshold, adaptive_k=args.adaptive_k)
         print("--- Search Processor Ready ---")
 
+        if args.queries_file:
+            with open(args.queries_file, 'r', encoding='utf-8') as f:
+                queries = [line.strip() for line in f if line.strip()]
+            batch_results = searcher.retrieve_and_reconstruct_sections_batch(queries, k=args.k,
+                                                                             filter=metadata_filter)
+            print(json.dumps(dict(zip(queries, batch_results)), indent=2))
+            sys.exit()
+
         # 3. Start interactive query loop
         print("You can now ask questions about the documents. Type 'exit' to quit.")
         while True:
@@ -105,7 +747,8 @@ if __name__ == '__main__':
                 if not user_query:
                     continue
 
-                results = searcher.retrieve_and_reconstruct_sections(user_query, k=args.k)
+                results = searcher.retrieve_and_reconstruct_sections(user_query, k=args.k,
+                                                                     filter=metadata_filter)
 
                 print("\n--- Reconstructed Sections ---")
                 if not results:
@@ -118,6 +761,11 @@ if __name__ == '__main__':
                 print("\nExiting query loop.")
                 break
 
-    except (FileNotFoundError, TypeError) as e:
+    except (FileNotFoundError, TypeError, ValueError) as e:
         print(f"\nAn error occurred: {e}")
-        print(f"Please ensure '{args.index_path}' is a valid FAISS index folder created by document_persistance.py.")
+        print(f"Please ensure '{args.index_path}' is a valid index folder saved by VectorStoreManager.save_local "
+              f"or export_serving_store.")
+
+
+if __name__ == '__main__':
+    main()
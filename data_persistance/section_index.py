@@ -0,0 +1,182 @@
+# section_index.py
+
+import json
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+SECTION_INDEX_FILE_NAME = "sections.json"
+
+SectionKey = Tuple[str, str]
+# (file_name, section_index): identifies one section occurrence within a file.
+SectionOrdinal = Tuple[str, int]
+# (start_index, end_index, metadata): the part of a section occurrence's text
+# its chunks cover, and the metadata of its first chunk.
+SectionSpan = Tuple[int, int, Dict]
+
+
+class SectionIndex:
+    """
+    Maps each (file_name, section_name) pair to the ordered ids of its chunks,
+    and keeps the cleaned text of every section so it can be reconstructed by
+    offset instead of by joining chunks.
+
+    The index is maintained alongside the vector store as chunks are added and
+    deleted, so a section can be reconstructed by looking up exactly its own
+    chunks instead of scanning the whole docstore. Its version is bumped on every
+    change, which lets readers detect that cached results are stale.
+
+    A chunk collapsed into a stored copy from another section (see
+    VectorStoreManager dedup_threshold) is only listed under the section of
+    that copy, so a section that lost chunks that way also has a span per
+    occurrence, which reconstructs it from its text without them.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._sections: Dict[SectionKey, List[str]] = {}
+        self._section_of: Dict[str, Tuple[SectionKey, Optional[int]]] = {}
+        self._texts: Dict[SectionOrdinal, str] = {}
+        self._chunk_counts: Dict[SectionOrdinal, int] = {}
+        self._spans: Dict[SectionKey, Dict[int, SectionSpan]] = {}
+        self._span_sections: Dict[SectionOrdinal, SectionKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def add(self, chunk_id: str, metadata: Mapping) -> None:
+        """
+        Appends a chunk to the end of its section.
+        """
+        self.version += 1
+        key = (metadata['file_name'], metadata['section_name'])
+        ordinal = metadata.get('section_index')
+        self._sections.setdefault(key, []).append(chunk_id)
+        self._section_of[chunk_id] = (key, ordinal)
+        if ordinal is not None:
+            ordinal_key = (key[0], ordinal)
+            self._chunk_counts[ordinal_key] = self._chunk_counts.get(ordinal_key, 0) + 1
+
+    def set_section_texts(self, section_texts: Mapping[SectionOrdinal, str]) -> None:
+        """
+        Records the cleaned text of sections, keyed by (file_name, section_index).
+        """
+        self.version += 1
+        self._texts.update(section_texts)
+
+    def set_section_spans(self, section_spans: Mapping[SectionOrdinal, SectionSpan]) -> None:
+        """
+        Records the spans of section occurrences, keyed by (file_name, section_index).
+        The metadata of a span names its section.
+        """
+        self.version += 1
+        for (file_name, ordinal), (start, end, metadata) in section_spans.items():
+            key = (file_name, metadata['section_name'])
+            self._spans.setdefault(key, {})[ordinal] = (start, end, dict(metadata))
+            self._span_sections[(file_name, ordinal)] = key
+
+    def discard_texts(self, section_ordinals: Iterable[SectionOrdinal]) -> None:
+        """
+        Drops recorded section texts and spans, e.g. of a file that was changed or removed.
+        """
+        self.version += 1
+        for section_ordinal in section_ordinals:
+            self._texts.pop(section_ordinal, None)
+            self._discard_span(section_ordinal)
+
+    def _discard_span(self, section_ordinal: SectionOrdinal) -> None:
+        key = self._span_sections.pop(section_ordinal, None)
+        if key is not None:
+            spans = self._spans[key]
+            del spans[section_ordinal[1]]
+            if not spans:
+                del self._spans[key]
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        """
+        Removes chunks, dropping sections (and their text) that no longer have any.
+        """
+        self.version += 1
+        removed_by_section: Dict[SectionKey, set] = {}
+        for chunk_id in chunk_ids:
+            entry = self._section_of.pop(chunk_id, None)
+            if entry is None:
+                continue
+            key, ordinal = entry
+            removed_by_section.setdefault(key, set()).add(chunk_id)
+            if ordinal is not None:
+                ordinal_key = (key[0], ordinal)
+                self._chunk_counts[ordinal_key] -= 1
+                if not self._chunk_counts[ordinal_key]:
+                    del self._chunk_counts[ordinal_key]
+                    self._texts.pop(ordinal_key, None)
+                    self._discard_span(ordinal_key)
+        for key, removed in removed_by_section.items():
+            remaining = [chunk_id for chunk_id in self._sections[key] if chunk_id not in removed]
+            if remaining:
+                self._sections[key] = remaining
+            else:
+                del self._sections[key]
+
+    def get_chunk_ids(self, file_name: str, section_name: str) -> List[str]:
+        """
+        Returns the ordered chunk ids of a section, or an empty list if it is unknown.
+        """
+        return self._sections.get((file_name, section_name), [])
+
+    def get_section_text(self, file_name: str, section_ordinal: int) -> Optional[str]:
+        """
+        Returns the cleaned text of a section occurrence, or None if it was not recorded.
+        """
+        return self._texts.get((file_name, section_ordinal))
+
+    def get_section_spans(self, file_name: str, section_name: str) -> Dict[int, SectionSpan]:
+        """
+        Returns the recorded spans of a section's occurrences by ordinal, or an
+        empty dict if none of them lost chunks to deduplication.
+        """
+        return self._spans.get((file_name, section_name), {})
+
+    def iter_section_spans(self) -> Iterator[Tuple[SectionKey, Dict[int, SectionSpan]]]:
+        """
+        Yields every section that has recorded spans, with its spans by ordinal.
+        """
+        return iter(self._spans.items())
+
+    @classmethod
+    def from_docstore(cls, docstore_dict: Mapping) -> 'SectionIndex':
+        """
+        Builds an index from an existing docstore, in docstore insertion order.
+        Section texts are not part of the docstore, so none are recorded.
+        """
+        index = cls()
+        for chunk_id, document in docstore_dict.items():
+            index.add(chunk_id, document.metadata)
+        return index
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "sections": [
+                    [file_name, section_name, [[chunk_id, self._section_of[chunk_id][1]] for chunk_id in ids]]
+                    for (file_name, section_name), ids in self._sections.items()
+                ],
+                "texts": [[file_name, ordinal, text] for (file_name, ordinal), text in self._texts.items()],
+                "spans": [
+                    [file_name, ordinal, start, end, metadata]
+                    for (file_name, _), spans in self._spans.items()
+                    for ordinal, (start, end, metadata) in spans.items()
+                ],
+            }, f)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'SectionIndex':
+        index = cls()
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for file_name, section_name, chunks in data["sections"]:
+            for chunk_id, ordinal in chunks:
+                index.add(chunk_id, {"file_name": file_name, "section_name": section_name, "section_index": ordinal})
+        index.set_section_texts({(file_name, ordinal): text for file_name, ordinal, text in data["texts"]})
+        # Indexes saved before spans were recorded have none.
+        index.set_section_spans({(file_name, ordinal): (start, end, metadata)
+                                 for file_name, ordinal, start, end, metadata in data.get("spans", [])})
+        return index
@@ -0,0 +1,531 @@
+# serving_store.py
+
+import json
+import mmap
+import os
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+# To make this module runnable, you might need to install the following packages:
+# pip install langchain langchain-community faiss-cpu numpy
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from data_persistance.ann_index import IndexConfig, apply_search_params
+from data_persistance.bm25_index import BM25Index
+from data_persistance.embedding_backends import EmbeddingBackend, create_embedding_backend
+from data_persistance.metadata_index import MetadataIndex
+
+# --- Serving layout ---
+# A read-only export of a store in which nothing is unpickled and almost nothing
+# is copied into the process: every file below is memory-mapped, so worker
+# processes serving the same folder share one copy through the OS page cache.
+#   index.faiss              the FAISS index, its vectors mapped in place (IO_FLAG_MMAP_IFC)
+#   chunk_ids.npy            fixed-width chunk id of each index position
+#   chunk_id_order.npy       positions sorted by chunk id, for id lookups
+#   chunks.bin/.offsets.npy  one JSON [text, metadata] record per position
+#   sections.bin/.offsets.npy          sorted "file_name\x1fsection_name" keys ...
+#   section_chunks.npy/.offsets.npy    ... and the positions of each section's chunks
+#   section_texts.bin/.offsets.npy     sorted "file_name\x1f<ordinal>" keys ...
+#   section_text_values.bin/.offsets.npy  ... and the cleaned text of each section occurrence
+#   section_spans.bin/.offsets.npy     sorted "file_name\x1fsection_name" keys ...
+#   section_span_values.bin/.offsets.npy  ... and the JSON spans of sections that lost chunks to dedup
+#   metadata_keys.bin/.offsets.npy     sorted "field\x1fvalue" keys of the metadata index ...
+#   metadata_positions.npy/.offsets.npy   ... and the positions of the chunks carrying each
+#   bm25_terms.bin/.offsets.npy        sorted BM25 terms ...
+#   bm25_positions.npy, bm25_tfs.npy, bm25_postings.offsets.npy
+#                                      ... and the positions holding each term and its frequency in each
+#   bm25_lengths.npy                   the length in terms of the chunk at each position
+# The BM25 parameters and total length are recorded in the manifest.
+SERVING_MANIFEST_FILE_NAME = "serving.json"
+SERVING_FORMAT_VERSION = 3
+_INDEX_FILE_NAME = "index.faiss"
+_KEY_SEPARATOR = "\x1f"
+_READ_ONLY_MESSAGE = "A serving store is read-only. Update the store it was exported from and export it again."
+
+
+class PackedStrings(Sequence):
+    """
+    A read-only sequence of strings stored back to back in a memory-mapped file,
+    with an offsets array giving where each one starts. Only the items that are
+    read are decoded.
+    """
+
+    def __init__(self, blob: Union[mmap.mmap, bytes], offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[int(self._offsets[i]):int(self._offsets[i + 1])].decode('utf-8')
+
+    @staticmethod
+    def write(strings: Sequence[str], folder_path: str, name: str) -> None:
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        with open(os.path.join(folder_path, f"{name}.bin"), 'wb') as f:
+            f.write(b"".join(encoded))
+        np.save(os.path.join(folder_path, f"{name}.offsets.npy"), offsets)
+
+    @classmethod
+    def open(cls, folder_path: str, name: str) -> 'PackedStrings':
+        offsets = np.load(os.path.join(folder_path, f"{name}.offsets.npy"), mmap_mode='r')
+        with open(os.path.join(folder_path, f"{name}.bin"), 'rb') as f:
+            # mmap cannot map an empty file.
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+        return cls(blob, offsets)
+
+
+def _find(sorted_keys: PackedStrings, key: str) -> Optional[int]:
+    i = bisect_left(sorted_keys, key)
+    return i if i < len(sorted_keys) and sorted_keys[i] == key else None
+
+
+class MappedDocstore(Docstore):
+    """
+    A read-only docstore that decodes a chunk's Document from the packed chunk
+    records when it is looked up, instead of holding every Document in memory.
+    """
+
+    def __init__(self, chunk_ids: np.ndarray, chunk_id_order: np.ndarray, records: PackedStrings):
+        self._chunk_ids = chunk_ids
+        self._chunk_id_order = chunk_id_order
+        self._records = records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def position_of(self, chunk_id: str) -> Optional[int]:
+        encoded = chunk_id.encode('utf-8')
+        i = int(np.searchsorted(self._chunk_ids, encoded, sorter=self._chunk_id_order))
+        if i < len(self._chunk_id_order) and self._chunk_ids[self._chunk_id_order[i]] == encoded:
+            return int(self._chunk_id_order[i])
+        return None
+
+    def chunk_id_at(self, position: int) -> str:
+        return self._chunk_ids[position].decode('utf-8')
+
+    def document_at(self, position: int) -> Document:
+        text, metadata = json.loads(self._records[position])
+        return Document(id=self.chunk_id_at(position), page_content=text, metadata=metadata)
+
+    def search(self, search: str) -> Union[str, Document]:
+        position = self.position_of(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.document_at(position)
+
+    def delete(self, ids: List) -> None:
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+
+class ReadOnlyFAISS(FAISS):
+    """
+    The LangChain FAISS store of a serving store. Writes are refused before they
+    reach the index: its vectors are mapped read-only, and FAISS would fault
+    writing to them instead of raising an error.
+    """
+
+    def add_texts(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def add_embeddings(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def merge_from(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+
+class PositionIds(Mapping):
+    """
+    The index_to_docstore_id mapping of a serving store, read from the
+    memory-mapped chunk id array instead of a dict.
+    """
+
+    def __init__(self, chunk_ids: np.ndarray):
+        self._chunk_ids = chunk_ids
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < len(self._chunk_ids):
+            raise KeyError(position)
+        return self._chunk_ids[position].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._chunk_ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._chunk_ids)))
+
+
+class MappedSectionIndex:
+    """
+    The read side of SectionIndex (get_chunk_ids, get_section_text,
+    get_section_spans, version) over the memory-mapped section tables of a
+    serving store.
+    """
+
+    # A serving store never changes, so cached results never go stale.
+    version = 0
+
+    def __init__(self, folder_path: str, chunk_ids: np.ndarray):
+        self._chunk_ids = chunk_ids
+        self._section_keys = PackedStrings.open(folder_path, "sections")
+        self._section_chunks = np.load(os.path.join(folder_path, "section_chunks.npy"), mmap_mode='r')
+        self._section_chunk_offsets = np.load(os.path.join(folder_path, "section_chunks.offsets.npy"), mmap_mode='r')
+        self._text_keys = PackedStrings.open(folder_path, "section_texts")
+        self._texts = PackedStrings.open(folder_path, "section_text_values")
+        self._span_keys = PackedStrings.open(folder_path, "section_spans")
+        self._spans = PackedStrings.open(folder_path, "section_span_values")
+
+    def __len__(self) -> int:
+        return len(self._section_keys)
+
+    def get_chunk_ids(self, file_name: str, section_name: str) -> List[str]:
+        i = _find(self._section_keys, f"{file_name}{_KEY_SEPARATOR}{section_name}")
+        if i is None:
+            return []
+        positions = self._section_chunks[self._section_chunk_offsets[i]:self._section_chunk_offsets[i + 1]]
+        return [chunk_id.decode('utf-8') for chunk_id in self._chunk_ids[positions]]
+
+    def get_section_text(self, file_name: str, section_ordinal: int) -> Optional[str]:
+        i = _find(self._text_keys, _text_key(file_name, section_ordinal))
+        return self._texts[i] if i is not None else None
+
+    def get_section_spans(self, file_name: str, section_name: str) -> Dict[int, Tuple[int, int, Dict]]:
+        i = _find(self._span_keys, f"{file_name}{_KEY_SEPARATOR}{section_name}")
+        if i is None:
+            return {}
+        return {ordinal: (start, end, metadata) for ordinal, start, end, metadata in json.loads(self._spans[i])}
+
+
+class MappedMetadataIndex(MetadataIndex):
+    """
+    A MetadataIndex whose positions are read from the memory-mapped metadata
+    tables of a serving store instead of being loaded into the process.
+    """
+
+    def __init__(self, folder_path: str, size: int):
+        self.size = size
+        self._keys = PackedStrings.open(folder_path, "metadata_keys")
+        self._key_positions = np.load(os.path.join(folder_path, "metadata_positions.npy"), mmap_mode='r')
+        self._key_offsets = np.load(os.path.join(folder_path, "metadata_positions.offsets.npy"), mmap_mode='r')
+
+    def _array(self, field: str, value: str) -> np.ndarray:
+        i = _find(self._keys, f"{field}{_KEY_SEPARATOR}{value}")
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return self._key_positions[self._key_offsets[i]:self._key_offsets[i + 1]]
+
+    def iter_positions(self) -> Iterator[Tuple[str, str, np.ndarray]]:
+        for i, key in enumerate(self._keys):
+            field, value = key.split(_KEY_SEPARATOR, 1)
+            yield field, value, self._key_positions[self._key_offsets[i]:self._key_offsets[i + 1]]
+
+    def append(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def relabel(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def remove_positions(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+
+class MappedBM25Index(BM25Index):
+    """
+    A BM25Index scoring the memory-mapped postings of a serving store, whose
+    slots are the chunks' FAISS positions. Nothing is loaded into the process:
+    a query only touches the postings of its own terms.
+    """
+
+    def __init__(self, folder_path: str, docstore: MappedDocstore, parameters: Dict):
+        super().__init__(k1=parameters["k1"], b=parameters["b"])
+        self._docstore = docstore
+        self._document_count = parameters["document_count"]
+        self._total_length = parameters["total_length"]
+        self._terms = PackedStrings.open(folder_path, "bm25_terms")
+        self._term_positions = np.load(os.path.join(folder_path, "bm25_positions.npy"), mmap_mode='r')
+        self._term_tfs = np.load(os.path.join(folder_path, "bm25_tfs.npy"), mmap_mode='r')
+        self._term_offsets = np.load(os.path.join(folder_path, "bm25_postings.offsets.npy"), mmap_mode='r')
+        self._lengths = np.load(os.path.join(folder_path, "bm25_lengths.npy"), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self._document_count
+
+    def _postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = _find(self._terms, term)
+        if i is None:
+            return None
+        start, end = self._term_offsets[i], self._term_offsets[i + 1]
+        return self._term_positions[start:end], self._term_tfs[start:end]
+
+    def _slot_lengths(self) -> np.ndarray:
+        return self._lengths
+
+    def _slot(self, chunk_id: str) -> Optional[int]:
+        return self._docstore.position_of(chunk_id)
+
+    def _chunk_id(self, slot: int) -> str:
+        return self._docstore.chunk_id_at(slot)
+
+    def slots(self) -> Tuple[List[Optional[str]], np.ndarray]:
+        return [self._docstore.chunk_id_at(position) for position in range(len(self._lengths))], self._lengths
+
+    def iter_postings(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        for term in self._terms:
+            yield (term,) + self._postings(term)
+
+    def add(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def remove(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    def save(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+
+def _write_flat(arrays: List[np.ndarray], file_path: str, dtype) -> np.ndarray:
+    """
+    Writes arrays back to back into one .npy file.
+
+    Returns:
+        The offset each array starts at, followed by the total length.
+    """
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(values) for values in arrays], out=offsets[1:])
+    np.save(file_path, np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype))
+    return offsets
+
+
+def _write_metadata_index(metadata_index: MetadataIndex, folder_path: str) -> None:
+    positions = {f"{field}{_KEY_SEPARATOR}{value}": value_positions
+                 for field, value, value_positions in metadata_index.iter_positions()}
+    keys = sorted(positions)
+    PackedStrings.write(keys, folder_path, "metadata_keys")
+    offsets = _write_flat([positions[key] for key in keys], os.path.join(folder_path, "metadata_positions.npy"),
+                          np.int64)
+    np.save(os.path.join(folder_path, "metadata_positions.offsets.npy"), offsets)
+
+
+def _write_bm25_index(bm25_index: BM25Index, position_of: Mapping[str, int], count: int,
+                      folder_path: str) -> Dict:
+    """
+    Writes the postings of a BM25 index with its slots replaced by FAISS positions.
+
+    Returns:
+        The BM25 parameters and corpus statistics, recorded in the manifest.
+    """
+    chunk_ids, slot_lengths = bm25_index.slots()
+    slot_positions = np.array([position_of.get(chunk_id, -1) if chunk_id is not None else -1
+                               for chunk_id in chunk_ids], dtype=np.int64)
+    live = slot_positions >= 0
+    lengths = np.zeros(count, dtype=np.uint32)
+    lengths[slot_positions[live]] = slot_lengths[live]
+    np.save(os.path.join(folder_path, "bm25_lengths.npy"), lengths)
+
+    postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for term, slots, tfs in bm25_index.iter_postings():
+        positions = slot_positions[slots]
+        keep = positions >= 0
+        if keep.any():
+            order = np.argsort(positions[keep], kind='stable')
+            postings[term] = (positions[keep][order], tfs[keep][order])
+    terms = sorted(postings)
+    PackedStrings.write(terms, folder_path, "bm25_terms")
+    offsets = _write_flat([postings[term][0] for term in terms], os.path.join(folder_path, "bm25_positions.npy"),
+                          np.uint32)
+    _write_flat([postings[term][1] for term in terms], os.path.join(folder_path, "bm25_tfs.npy"), np.uint32)
+    np.save(os.path.join(folder_path, "bm25_postings.offsets.npy"), offsets)
+    return {"k1": bm25_index.k1, "b": bm25_index.b, "document_count": int(live.sum()),
+            "total_length": int(lengths.sum())}
+
+
+def _text_key(file_name: str, section_ordinal: int) -> str:
+    # Zero-padded so that the keys of one file sort by ordinal.
+    return f"{file_name}{_KEY_SEPARATOR}{section_ordinal:010d}"
+
+
+def write_serving_store(manager, folder_path: str) -> None:
+    """
+    Exports the store of a VectorStoreManager in the read-only serving layout.
+
+    Args:
+        manager (VectorStoreManager): A manager whose vector store has been built or loaded.
+        folder_path (str): The directory to write into. Created if missing.
+
+    Raises:
+        ValueError: If the vector store has not been built yet.
+    """
+    vector_store = manager.vector_store
+    if not vector_store:
+        raise ValueError("Vector store has not been built. Call a build method first.")
+    os.makedirs(folder_path, exist_ok=True)
+    count = vector_store.index.ntotal
+    faiss.write_index(vector_store.index, os.path.join(folder_path, _INDEX_FILE_NAME))
+
+    chunk_ids = [vector_store.index_to_docstore_id[position] for position in range(count)]
+    chunk_id_array = np.array([chunk_id.encode('utf-8') for chunk_id in chunk_ids], dtype=bytes)
+    np.save(os.path.join(folder_path, "chunk_ids.npy"), chunk_id_array)
+    np.save(os.path.join(folder_path, "chunk_id_order.npy"), np.argsort(chunk_id_array, kind='stable'))
+    documents = [vector_store.docstore.search(chunk_id) for chunk_id in chunk_ids]
+    PackedStrings.write([json.dumps([document.page_content, document.metadata]) for document in documents],
+                        folder_path, "chunks")
+
+    # Sections, with their chunks in section order as the section index keeps them.
+    position_of = {chunk_id: position for position, chunk_id in enumerate(chunk_ids)}
+    sections: Dict[str, List[int]] = {}
+    texts: Dict[str, str] = {}
+    for document in documents:
+        file_name, section_name = document.metadata['file_name'], document.metadata['section_name']
+        key = f"{file_name}{_KEY_SEPARATOR}{section_name}"
+        if key not in sections:
+            sections[key] = [position_of[chunk_id]
+                             for chunk_id in manager.section_index.get_chunk_ids(file_name, section_name)]
+        ordinal = document.metadata.get('section_index')
+        if ordinal is not None:
+            text_key = _text_key(file_name, ordinal)
+            if text_key not in texts:
+                text = manager.section_index.get_section_text(file_name, ordinal)
+                if text is not None:
+                    texts[text_key] = text
+    spans: Dict[str, str] = {}
+    for (file_name, section_name), section_spans in manager.section_index.iter_section_spans():
+        spans[f"{file_name}{_KEY_SEPARATOR}{section_name}"] = json.dumps(
+            [[ordinal, start, end, metadata] for ordinal, (start, end, metadata) in section_spans.items()]
+        )
+        # A section whose chunks were all duplicates has a text no chunk names.
+        for ordinal in section_spans:
+            text = manager.section_index.get_section_text(file_name, ordinal)
+            if text is not None:
+                texts[_text_key(file_name, ordinal)] = text
+    section_keys = sorted(sections)
+    PackedStrings.write(section_keys, folder_path, "sections")
+    section_offsets = np.zeros(len(section_keys) + 1, dtype=np.int64)
+    np.cumsum([len(sections[key]) for key in section_keys], out=section_offsets[1:])
+    np.save(os.path.join(folder_path, "section_chunks.npy"),
+            np.array([position for key in section_keys for position in sections[key]], dtype=np.int64))
+    np.save(os.path.join(folder_path, "section_chunks.offsets.npy"), section_offsets)
+    text_keys = sorted(texts)
+    PackedStrings.write(text_keys, folder_path, "section_texts")
+    PackedStrings.write([texts[key] for key in text_keys], folder_path, "section_text_values")
+    span_keys = sorted(spans)
+    PackedStrings.write(span_keys, folder_path, "section_spans")
+    PackedStrings.write([spans[key] for key in span_keys], folder_path, "section_span_values")
+
+    _write_metadata_index(manager.metadata_index, folder_path)
+    bm25 = _write_bm25_index(manager.bm25_index, position_of, count, folder_path)
+
+    manifest = {
+        "format_version": SERVING_FORMAT_VERSION,
+        "embedding_model": manager.embedding_model_name,
+        "embedding_normalized": manager.backend.normalize,
+        "chunk_size": manager.chunk_size,
+        "chunk_overlap": manager.chunk_overlap,
+        "chunk_unit": manager.chunk_unit,
+        "index": manager.index_config.to_dict(),
+        "document_count": count,
+        "normalize_L2": vector_store._normalize_L2,
+        "distance_strategy": vector_store.distance_strategy.value,
+        "bm25": bm25,
+    }
+    # Written last, so a folder without it is never opened as a complete store.
+    with open(os.path.join(folder_path, SERVING_MANIFEST_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+class ServingStore:
+    """
+    A store opened read-only from the serving layout written by write_serving_store.
+
+    Its vector_store is a LangChain FAISS store over the mapped index and
+    docstore, so it can be handed to SearchProcessor together with
+    section_index, metadata_index and bm25_index, like a VectorStoreManager's.
+    All of them read from memory-mapped files, which processes serving the
+    same folder share.
+    """
+
+    def __init__(self, vector_store: FAISS, section_index: MappedSectionIndex,
+                 metadata_index: MappedMetadataIndex, bm25_index: MappedBM25Index, manifest: Dict,
+                 folder_path: str):
+        self.vector_store = vector_store
+        self.section_index = section_index
+        self.metadata_index = metadata_index
+        self.bm25_index = bm25_index
+        self.manifest = manifest
+        self.folder_path = folder_path
+
+    @classmethod
+    def open(cls, folder_path: str, embeddings: Optional[EmbeddingBackend] = None) -> 'ServingStore':
+        """
+        Maps a serving store into this process.
+
+        Args:
+            folder_path (str): The directory written by write_serving_store.
+            embeddings (Optional[EmbeddingBackend]): The backend to embed queries with.
+                Its model must match the manifest. Defaults to the backend the manifest names.
+
+        Raises:
+            FileNotFoundError: If the folder or its manifest does not exist.
+            ValueError: If the store was written in another format version or
+                the embedding model does not match.
+        """
+        manifest_path = os.path.join(folder_path, SERVING_MANIFEST_FILE_NAME)
+        if not os.path.isfile(manifest_path):
+            raise FileNotFoundError(f"Error: No serving store manifest found at '{manifest_path}'.")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SERVING_FORMAT_VERSION:
+            raise ValueError(
+                f"Serving store uses format version {manifest.get('format_version')}, "
+                f"expected {SERVING_FORMAT_VERSION}. Export it again."
+            )
+        if embeddings is None:
+            embeddings = create_embedding_backend(manifest["embedding_model"],
+                                                  normalize=manifest.get("embedding_normalized", False))
+        elif embeddings.model_name != manifest["embedding_model"]:
+            raise ValueError(
+                f"Serving store was built with embedding_model={manifest['embedding_model']!r}, "
+                f"but {embeddings.model_name!r} was requested."
+            )
+
+        index = faiss.read_index(os.path.join(folder_path, _INDEX_FILE_NAME),
+                                 faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        apply_search_params(index, IndexConfig.from_dict(manifest.get("index")))
+        chunk_ids = np.load(os.path.join(folder_path, "chunk_ids.npy"), mmap_mode='r')
+        chunk_id_order = np.load(os.path.join(folder_path, "chunk_id_order.npy"), mmap_mode='r')
+        docstore = MappedDocstore(chunk_ids, chunk_id_order, PackedStrings.open(folder_path, "chunks"))
+        vector_store = ReadOnlyFAISS(embeddings, index, docstore, PositionIds(chunk_ids),
+                                     normalize_L2=manifest["normalize_L2"],
+                                     distance_strategy=DistanceStrategy(manifest["distance_strategy"]))
+        return cls(vector_store, MappedSectionIndex(folder_path, chunk_ids),
+                   MappedMetadataIndex(folder_path, manifest["document_count"]),
+                   MappedBM25Index(folder_path, docstore, manifest["bm25"]), manifest, folder_path)
+
+
+def open_store(folder_path: str):
+    """
+    Opens a store for querying: mapped read-only if the folder holds a serving
+    store, loaded with sharded_store.ShardedStore.load if it holds a sharded
+    store, and with VectorStoreManager.load_local otherwise.
+    search_processor.create_search_processor builds a SearchProcessor for any
+    of them.
+    """
+    if os.path.isfile(os.path.join(folder_path, SERVING_MANIFEST_FILE_NAME)):
+        return ServingStore.open(folder_path)
+    # Imported here: document_persistance imports this module to export stores.
+    from data_persistance.document_persistance import VectorStoreManager
+    if "shards" in VectorStoreManager.read_manifest(folder_path):
+        from data_persistance.sharded_store import ShardedStore
+        return ShardedStore.load(folder_path)
+    return VectorStoreManager.load_local(folder_path)
@@ -0,0 +1,213 @@
+# sharded_store.py
+
+import os
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from data_persistance.document_persistance import MANIFEST_FILE_NAME, VectorStoreManager
+from data_persistance.embedding_backends import EmbeddingBackend, create_embedding_backend
+
+# --- Persistence layout ---
+# A sharded store is a directory with one subdirectory per shard, each a store
+# written by VectorStoreManager.save_local, and a manifest.json recording the
+# layout: the number of shards, how files are assigned to them, and each
+# shard's subdirectory (null for a shard no chunks were assigned to).
+SHARD_FOLDER_FORMAT = "shard_{:03d}"
+SHARD_PARTITION = "sha256(file_name) mod shard_count"
+SHARDED_MANIFEST_SCHEMA_VERSION = 1
+
+
+def _shard_settings(template: VectorStoreManager) -> Dict:
+    """
+    Returns the VectorStoreManager arguments every shard is built with: the template's settings.
+    """
+    return {
+        "chunk_size": template.chunk_size,
+        "chunk_overlap": template.chunk_overlap,
+        "chunk_unit": template.chunk_unit,
+        "embeddings": template.backend,
+        "index_config": template.index_config,
+        "dedup_threshold": template.dedup_threshold,
+    }
+
+
+def _shard_cache_dir(embedding_cache_dir: Optional[str], number: int) -> Optional[str]:
+    # The embedding cache is not safe to write from several processes, so each
+    # shard has its own; a file never changes shards, so neither do its vectors.
+    return os.path.join(embedding_cache_dir, SHARD_FOLDER_FORMAT.format(number)) if embedding_cache_dir else None
+
+
+def _build_shard(settings: Dict, directory_path: str, recursive: bool, shard: Tuple[int, int],
+                 folder_path: str) -> bool:
+    """
+    Builds one shard and saves it into folder_path. Runs in a worker process.
+
+    Returns:
+        Whether the shard holds any chunks. A shard without any is not saved.
+    """
+    manager = VectorStoreManager(**settings)
+    manager.shard = shard
+    manager.update_store_from_directory(directory_path, recursive=recursive)
+    if manager.vector_store is None:
+        return False
+    manager.save_local(folder_path)
+    return True
+
+
+def _write_manifest(folder_path: str, backend: EmbeddingBackend, shard_folders: List[Optional[str]]) -> None:
+    manifest = {
+        "schema_version": SHARDED_MANIFEST_SCHEMA_VERSION,
+        "embedding_model": backend.model_name,
+        "embedding_normalized": backend.normalize,
+        "shard_count": len(shard_folders),
+        "partition": SHARD_PARTITION,
+        "shards": shard_folders,
+    }
+    manifest_path = os.path.join(folder_path, MANIFEST_FILE_NAME)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+class ShardedStore:
+    """
+    A store split into shards by file.
+
+    Each shard is a VectorStoreManager holding the files shard_of assigns it,
+    with its own FAISS index, docstore and section, BM25, metadata and dedup
+    indexes, so shards are built in parallel processes and no process has to
+    hold the whole corpus while building. search_processor.ShardedSearchProcessor
+    searches the shards together.
+    """
+
+    def __init__(self, shards: List[VectorStoreManager], embedding_cache_dir: Optional[str] = None):
+        self.shards = shards
+        self.embedding_cache_dir = embedding_cache_dir
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.shards)
+
+    @classmethod
+    def build(cls, template: VectorStoreManager, directory_path: str, folder_path: str, shard_count: int,
+              recursive: bool = True, max_processes: Optional[int] = None) -> 'ShardedStore':
+        """
+        Builds and saves every shard on a process pool, then loads the store.
+        See VectorStoreManager.build_shards.
+
+        Raises:
+            ValueError: If shard_count is less than 1, or no chunks were created.
+        """
+        if shard_count < 1:
+            raise ValueError(f"shard_count must be at least 1, got {shard_count}.")
+        os.makedirs(folder_path, exist_ok=True)
+        settings = _shard_settings(template)
+        processes = min(max_processes or os.cpu_count() or 1, shard_count)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(
+                    _build_shard,
+                    dict(settings, embedding_cache_dir=_shard_cache_dir(template.embedding_cache_dir, number)),
+                    directory_path, recursive, (number, shard_count),
+                    os.path.join(folder_path, SHARD_FOLDER_FORMAT.format(number)),
+                )
+                for number in range(shard_count)
+            ]
+            has_chunks = [future.result() for future in futures]
+        if not any(has_chunks):
+            raise ValueError("No documents were created from the provided markdown data. Check the content.")
+
+        shard_folders = []
+        for number, filled in enumerate(has_chunks):
+            shard_folder = SHARD_FOLDER_FORMAT.format(number)
+            if not filled:
+                # Left over from an earlier build of this folder.
+                shutil.rmtree(os.path.join(folder_path, shard_folder), ignore_errors=True)
+            shard_folders.append(shard_folder if filled else None)
+        _write_manifest(folder_path, template.backend, shard_folders)
+        return cls.load(folder_path, embeddings=template.backend, embedding_cache_dir=template.embedding_cache_dir)
+
+    @classmethod
+    def load(cls, folder_path: str, embeddings: Optional[EmbeddingBackend] = None,
+             embedding_cache_dir: Optional[str] = None) -> 'ShardedStore':
+        """
+        Loads every shard of a sharded store with one shared embedding backend.
+
+        Args:
+            folder_path (str): The directory written by build or save.
+            embeddings (Optional[EmbeddingBackend]): The backend to embed queries and
+                updates with. Defaults to the backend the manifest names.
+            embedding_cache_dir (Optional[str]): Embedding cache used for later
+                incremental updates, one subdirectory per shard.
+
+        Raises:
+            FileNotFoundError: If the folder or its manifest does not exist.
+            ValueError: If the folder does not hold a sharded store of this schema.
+        """
+        manifest = VectorStoreManager.read_manifest(folder_path)
+        if "shards" not in manifest:
+            raise ValueError(
+                f"'{folder_path}' does not hold a sharded store. Open it with VectorStoreManager.load_local."
+            )
+        if manifest.get("schema_version") != SHARDED_MANIFEST_SCHEMA_VERSION:
+            raise ValueError(
+                f"Saved sharded store uses schema version {manifest.get('schema_version')}, "
+                f"expected {SHARDED_MANIFEST_SCHEMA_VERSION}. Rebuild the store."
+            )
+        if embeddings is None:
+            embeddings = create_embedding_backend(
+                manifest["embedding_model"], normalize=manifest.get("embedding_normalized", False)
+            )
+
+        shard_count = manifest["shard_count"]
+        shards: List[Optional[VectorStoreManager]] = [
+            VectorStoreManager.load_local(os.path.join(folder_path, shard_folder), embeddings=embeddings,
+                                          embedding_cache_dir=_shard_cache_dir(embedding_cache_dir, number))
+            if shard_folder is not None else None
+            for number, shard_folder in enumerate(manifest["shards"])
+        ]
+        template = next(shard for shard in shards if shard is not None)
+        for number, shard in enumerate(shards):
+            if shard is None:
+                # A shard no chunks were assigned to yet, filled by later updates.
+                shard = shards[number] = VectorStoreManager(
+                    **_shard_settings(template), embedding_cache_dir=_shard_cache_dir(embedding_cache_dir, number)
+                )
+                shard.shard = (number, shard_count)
+        return cls(shards, embedding_cache_dir)
+
+    def update_from_directory(self, directory_path: str, recursive: bool = True) -> Dict[str, List[str]]:
+        """
+        Incrementally brings every shard in line with a directory of markdown files
+        (see VectorStoreManager.update_store_from_directory).
+
+        Returns:
+            A report with the file names that were 'added', 'changed', 'removed'
+            and 'unchanged', across all shards.
+        """
+        report: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "unchanged": []}
+        for shard in self.shards:
+            for status, file_names in shard.update_store_from_directory(directory_path, recursive=recursive).items():
+                report[status].extend(file_names)
+        for file_names in report.values():
+            file_names.sort()
+        return report
+
+    def save(self, folder_path: str) -> None:
+        """
+        Saves every shard into its subdirectory of folder_path, and the manifest last.
+        """
+        os.makedirs(folder_path, exist_ok=True)
+        shard_folders = []
+        for number, shard in enumerate(self.shards):
+            shard_folder = SHARD_FOLDER_FORMAT.format(number)
+            if shard.vector_store is None:
+                shutil.rmtree(os.path.join(folder_path, shard_folder), ignore_errors=True)
+                shard_folders.append(None)
+            else:
+                shard.save_local(os.path.join(folder_path, shard_folder))
+                shard_folders.append(shard_folder)
+        _write_manifest(folder_path, self.shards[0].backend, shard_folders)
@@ -0,0 +1,97 @@
+# test_ann_index.py
+
+import unittest
+from unittest import mock
+import os
+import sys
+
+import numpy as np
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from data_persistance import ann_index
+from data_persistance.ann_index import (
+    IndexConfig, build_index, convert_store_index, delete_from_store, filtered_search
+)
+from data_persistance.embedding_backends import HashingEmbedder
+
+
+class TestAnnIndex(unittest.TestCase):
+    """
+    Unit test suite for the approximate index helpers.
+    """
+
+    def setUp(self):
+        self.vectors = np.random.default_rng(0).random((400, 32), dtype=np.float32)
+
+    def test_exhaustive_settings_match_exact_search(self):
+        """
+        Tests that an IVF scanning every bucket and a wide HNSW search return the exact neighbours.
+        """
+        exact, _ = build_index(self.vectors, IndexConfig())
+        _, expected = exact.search(self.vectors[:20], 5)
+        for config in (IndexConfig("ivf", nlist=8, nprobe=8), IndexConfig("hnsw", ef_search=400)):
+            index, used = build_index(self.vectors, config)
+            _, found = index.search(self.vectors[:20], 5)
+            np.testing.assert_array_equal(found, expected, err_msg=used.index_type)
+
+    def test_training_sizes_are_capped_for_small_corpora(self):
+        """
+        Tests that nlist and pq_bits shrink to what the vectors can train.
+        """
+        _, used = build_index(self.vectors, IndexConfig("ivfpq", nlist=1024, pq_m=8, pq_bits=12))
+        self.assertEqual(used.nlist, 400 // 39)
+        self.assertEqual(used.pq_bits, 8)
+        with self.assertRaises(ValueError):
+            build_index(self.vectors, IndexConfig("ivfpq", pq_m=7))
+        with self.assertRaises(ValueError):
+            IndexConfig("annoy").validate()
+
+    def test_filtered_search_only_returns_allowed_positions(self):
+        """
+        Tests that a restricted search finds the exact neighbours among the allowed
+        positions, both through the ID selector and through the exact subset search.
+        """
+        allowed = np.arange(1, 400, 5, dtype=np.int64)
+        queries = self.vectors[:10]
+        exact_subset, _ = build_index(self.vectors[allowed], IndexConfig())
+        _, expected = exact_subset.search(queries, 4)
+        expected = allowed[expected]
+        for config in (IndexConfig(), IndexConfig("ivf", nlist=8, nprobe=8), IndexConfig("hnsw", ef_search=400)):
+            index, _ = build_index(self.vectors, config)
+            for exact_filter_max in (0, ann_index.EXACT_FILTER_MAX_CHUNKS):
+                with mock.patch.object(ann_index, "EXACT_FILTER_MAX_CHUNKS", exact_filter_max):
+                    _, found = filtered_search(index, queries, 4, allowed)
+                np.testing.assert_array_equal(found, expected, err_msg=config.index_type)
+
+        _, found = filtered_search(index, queries, 4, np.array([7], dtype=np.int64))
+        np.testing.assert_array_equal(found[:, 0], 7)
+        np.testing.assert_array_equal(found[:, 1:], -1)
+
+    def test_delete_from_approximate_store_keeps_positions_consistent(self):
+        """
+        Tests that deleting from HNSW and IVF stores keeps index positions and docstore ids aligned.
+        """
+        texts = [f"chunk number {i} about topic {i % 7}" for i in range(120)]
+        for config in (IndexConfig("hnsw"), IndexConfig("ivf", nprobe=64)):
+            store = FAISS.from_documents([Document(page_content=text) for text in texts], HashingEmbedder(),
+                                         ids=[str(i) for i in range(len(texts))])
+            convert_store_index(store, config)
+            delete_from_store(store, [str(i) for i in range(0, 120, 3)])
+
+            self.assertEqual(store.index.ntotal, 80)
+            self.assertEqual(len(store.docstore._dict), 80)
+            top = store.similarity_search(texts[4], k=1)[0]
+            self.assertEqual(top.page_content, texts[4])
+            self.assertNotEqual(store.similarity_search(texts[3], k=1)[0].page_content, texts[3])
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
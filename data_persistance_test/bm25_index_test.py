@@ -0,0 +1,68 @@
+# test_bm25_index.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.bm25_index import BM25Index, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    """
+    Unit test suite for the BM25Index class.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = BM25Index()
+        self.index.add("install", "Run pip install faiss-cpu to install the index library.")
+        self.index.add("error", "The request failed with ERR_CONN_42 after three retries.")
+        self.index.add("retry", "Retries are spaced out, and every retry is logged.")
+        self.index.add("empty", "")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_identifiers_are_kept_whole_and_split(self):
+        """
+        Tests that compound identifiers are indexed whole and by their parts.
+        """
+        self.assertEqual(tokenize("Run faiss-cpu, see ERR_CONN_42."),
+                         ["run", "faiss-cpu", "faiss", "cpu", "see", "err_conn_42", "err", "conn", "42"])
+
+    def test_search_ranks_exact_identifier_matches_first(self):
+        """
+        Tests BM25 ranking and that chunks without a shared term are not returned.
+        """
+        self.assertEqual([chunk_id for chunk_id, _ in self.index.search("err_conn_42", k=3)], ["error"])
+        ranked = [chunk_id for chunk_id, _ in self.index.search("retry retries", k=3)]
+        self.assertEqual(ranked, ["retry", "error"])
+        self.assertEqual(self.index.search("unrelated words", k=3), [])
+
+    def test_removed_chunks_are_not_returned_and_index_round_trips(self):
+        """
+        Tests that deletions (with compaction) and a save/load keep the same results.
+        """
+        self.index.remove(["retry"])
+        self.assertEqual([chunk_id for chunk_id, _ in self.index.search("retries", k=3)], ["error"])
+        self.index.remove(["empty"])
+        self.assertEqual(len(self.index), 2)
+
+        path = os.path.join(self.temp_dir, "bm25.npz")
+        self.index.save(path)
+        loaded = BM25Index.load(path)
+        for query in ("install faiss", "retries", "err_conn_42 request"):
+            self.assertEqual(loaded.search(query, k=3), self.index.search(query, k=3))
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,82 @@
+# test_chunk_store.py
+
+import unittest
+import os
+import sys
+import pickle
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+
+from data_persistance.chunk_store import ChunkStore
+
+
+class TestChunkStore(unittest.TestCase):
+    """
+    Unit test suite for the ChunkStore class.
+    """
+
+    def setUp(self):
+        self.metadatas = {
+            f"chunk-{i}": {
+                "section_name": f"Section {i // 4}", "page_title": "Guide", "file_name": "guide",
+                "source": "Markdown File", "section_index": i // 4, "chunk_index": i % 4,
+                "start_index": 50 * (i % 4), "end_index": 50 * (i % 4) + 60,
+            }
+            for i in range(12)
+        }
+        # Metadata outside the columns: a missing field, a value of another type and an extra key.
+        self.metadatas["chunk-odd"] = {"file_name": "notes", "chunk_index": None, "tags": ["a", "b"]}
+        self.store = ChunkStore()
+        self.store.add({
+            chunk_id: Document(page_content=f"text of {chunk_id}", metadata=metadata)
+            for chunk_id, metadata in self.metadatas.items()
+        })
+
+    def test_documents_are_rebuilt_with_their_metadata(self):
+        """
+        Tests that lookups return the stored text and metadata, in insertion order.
+        """
+        self.assertEqual(len(self.store), 13)
+        self.assertEqual(list(self.store), list(self.metadatas))
+        for chunk_id, metadata in self.metadatas.items():
+            document = self.store.search(chunk_id)
+            self.assertEqual(document.id, chunk_id)
+            self.assertEqual(document.page_content, f"text of {chunk_id}")
+            self.assertEqual(document.metadata, metadata)
+        self.assertEqual(self.store.search("missing"), "ID missing not found.")
+        self.assertEqual(self.store["chunk-3"].metadata["start_index"], 150)
+        with self.assertRaises(ValueError):
+            self.store.add({"chunk-0": Document(page_content="again")})
+
+    def test_deletes_compact_and_survive_pickling(self):
+        """
+        Tests that deleted chunks are gone before and after compaction and a pickle round trip.
+        """
+        with self.assertRaises(ValueError):
+            self.store.delete(["chunk-0", "missing"])
+        self.assertIn("chunk-0", self.store)
+
+        deleted = [f"chunk-{i}" for i in range(8)]
+        self.store.delete(deleted)
+        # More than half of the rows were deleted, so the columns were rewritten.
+        self.assertEqual(len(self.store._ids), 5)
+        self.assertEqual(self.store._tables["section_name"].values, ["Section 2"])
+
+        restored = pickle.loads(pickle.dumps(self.store))
+        for store in (self.store, restored):
+            self.assertEqual(list(store), [f"chunk-{i}" for i in range(8, 12)] + ["chunk-odd"])
+            self.assertNotIn("chunk-0", store)
+            self.assertEqual(store.search("chunk-odd").metadata, self.metadatas["chunk-odd"])
+            self.assertEqual(store.search("chunk-9").metadata, self.metadatas["chunk-9"])
+        restored.add({"chunk-new": Document(page_content="new", metadata={"page_title": "Guide"})})
+        self.assertEqual(restored.search("chunk-new").metadata, {"page_title": "Guide"})
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
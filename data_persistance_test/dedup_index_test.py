@@ -0,0 +1,72 @@
+# test_dedup_index.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.dedup_index import DedupIndex
+
+
+class TestDedupIndex(unittest.TestCase):
+    """
+    Unit test suite for the DedupIndex class.
+    """
+
+    def setUp(self):
+        self.text = ("Install the package with pip, then run the setup command once to create the "
+                     "configuration file in your home directory before starting the service.")
+        self.index = DedupIndex(threshold=0.8)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_exact_and_near_duplicates_map_to_the_first_chunk(self):
+        """
+        Tests that copies (up to case, punctuation and one changed word) are assigned to
+        the first chunk, while a different text and an unrelated one are kept.
+        """
+        texts = [
+            self.text,
+            self.text.upper().replace(",", ""),
+            self.text.replace("service", "daemon"),
+            "Uninstall the package with pip and delete the configuration file from your home directory.",
+            "The scheduler retries failed jobs three times with exponential backoff.",
+        ]
+        assigned = self.index.assign(["a", "b", "c", "d", "e"], texts)
+        self.assertEqual(assigned, ["a", "a", "a", "d", "e"])
+        self.assertEqual(len(self.index), 3)
+
+        self.index.remove(["a"])
+        self.assertEqual(self.index.assign(["f"], [self.text]), ["f"])
+
+    def test_occurrences_survive_a_save_and_load(self):
+        """
+        Tests that signatures and occurrences are restored, and orphans are reported.
+        """
+        self.index.assign(["a", "b"], [self.text, "Another paragraph entirely."])
+        self.index.set_occurrences("a", [{"file_name": "x"}, {"file_name": "y"}])
+        self.index.set_occurrences("b", [])
+        path = os.path.join(self.temp_dir, "dedup.npz")
+        self.index.save(path)
+
+        loaded = DedupIndex.load(path)
+        self.assertEqual(loaded.threshold, 0.8)
+        self.assertEqual(loaded.get_occurrences("a"), [{"file_name": "x"}, {"file_name": "y"}])
+        self.assertEqual(loaded.orphans(), ["b"])
+        self.assertEqual(loaded.assign(["c"], [self.text]), ["a"])
+
+        with self.assertRaises(ValueError):
+            DedupIndex(threshold=0)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
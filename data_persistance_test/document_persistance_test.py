@@ -14,7 +14,9 @@ if project_root not in sys.path:
 
 # Langchain is a peer dependency for this module
 from langchain_community.vectorstores import FAISS
-from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.document_persistance import MANIFEST_FILE_NAME, VectorStoreManager
+from data_persistance.ann_index import IndexConfig
+from data_persistance.embedding_backends import HashingEmbedder
 
 class TestVectorStoreManager(unittest.TestCase):
     """
@@ -49,8 +51,9 @@ class TestVectorStoreManager(unittest.TestCase):
         """
         This method is called before each individual test.
         It sets up a fresh VectorStoreManager instance and a temporary directory.
+        The hashing embedder keeps the tests offline and fast.
         """
-        self.manager = VectorStoreManager(chunk_size=100, chunk_overlap=10)
+        self.manager = VectorStoreManager(chunk_size=100, chunk_overlap=10, embeddings=HashingEmbedder())
         self.temp_dir = tempfile.mkdtemp()
 
     def tearDown(self):
@@ -92,10 +95,11 @@ class TestVectorStoreManager(unittest.TestCase):
         # The section should be split into at least two chunks
         self.assertGreater(len(long_section_chunks), 1, "Long section was not split into multiple chunks.")
 
-        # All chunks from the same section should have identical metadata
-        first_chunk_metadata = long_section_chunks[0].metadata
+        # All chunks from the same section should have identical section-level metadata
+        position_keys = ('chunk_index', 'start_index', 'end_index')
+        first_chunk_metadata = {k: v for k, v in long_section_chunks[0].metadata.items() if k not in position_keys}
         for chunk in long_section_chunks[1:]:
-            self.assertEqual(chunk.metadata, first_chunk_metadata)
+            self.assertEqual({k: v for k, v in chunk.metadata.items() if k not in position_keys}, first_chunk_metadata)
 
         # The combined content of the chunks should approximate the original content
         reconstructed_content = "".join(chunk.page_content for chunk in long_section_chunks)
@@ -103,6 +107,23 @@ class TestVectorStoreManager(unittest.TestCase):
         self.assertTrue(len(reconstructed_content) > len(self.long_section_content) - 20, "Reconstructed content is too small")
 
 
+    def test_chunks_record_order_and_offsets(self):
+        """
+        Tests that chunks carry their chunk_index, section ordinal and offsets into the section text.
+        """
+        section_texts = {}
+        documents = self.manager._parse_markdown_to_documents(self.mock_markdown_data, section_texts)
+        long_section_chunks = [d for d in documents if d.metadata['section_name'] == 'Section Two (Long)']
+
+        self.assertEqual([d.metadata['chunk_index'] for d in long_section_chunks], list(range(len(long_section_chunks))))
+        ordinal = long_section_chunks[0].metadata['section_index']
+        section_text = section_texts[('test_file1', ordinal)]
+        self.assertEqual(section_text, self.long_section_content)
+        for chunk in long_section_chunks:
+            self.assertEqual(section_text[chunk.metadata['start_index']:chunk.metadata['end_index']], chunk.page_content)
+        self.assertEqual(long_section_chunks[0].metadata['start_index'], 0)
+        self.assertEqual(long_section_chunks[-1].metadata['end_index'], len(section_text))
+
     def test_empty_and_whitespace_files_are_ignored(self):
         """
         Tests that empty files or files with only whitespace do not produce documents.
@@ -172,6 +193,231 @@ class TestVectorStoreManager(unittest.TestCase):
         )
         self.assertTrue(found_doc, "Document from integration test was not found.")
 
+    def test_save_and_load_local_round_trip(self):
+        """
+        Tests that a saved store loads back with the same chunks and settings.
+        """
+        self.manager.build_vector_store_from_dict(self.mock_markdown_data)
+        index_path = os.path.join(self.temp_dir, "index")
+        self.manager.save_local(index_path)
+
+        self.assertTrue(os.path.isfile(os.path.join(index_path, MANIFEST_FILE_NAME)))
+
+        loaded = VectorStoreManager.load_local(index_path)
+        self.assertEqual(loaded.chunk_size, 100)
+        self.assertEqual(loaded.chunk_overlap, 10)
+        self.assertEqual(
+            sorted(d['content'] for d in loaded.get_all_documents_in_store()),
+            sorted(d['content'] for d in self.manager.get_all_documents_in_store())
+        )
+        self.assertEqual(loaded.bm25_index.search("introduction section", k=3),
+                         self.manager.bm25_index.search("introduction section", k=3))
+
+    def test_approximate_index_is_persisted_and_updated(self):
+        """
+        Tests that an HNSW store keeps its index type and search settings through
+        save, load and an incremental update.
+        """
+        manager = VectorStoreManager(chunk_size=100, chunk_overlap=10, embeddings=HashingEmbedder(),
+                                     index_config=IndexConfig("hnsw", ef_search=32))
+        for filename in ("test_file1", "test_file2"):
+            with open(os.path.join(self.temp_dir, f"{filename}.md"), "w") as f:
+                f.write(self.mock_markdown_data[filename])
+        manager.process_directory_and_build_store(self.temp_dir)
+        index_path = os.path.join(self.temp_dir, "index")
+        manager.save_local(index_path)
+
+        loaded = VectorStoreManager.load_local(index_path)
+        self.assertEqual(loaded.index_config.index_type, "hnsw")
+        self.assertEqual(type(loaded.vector_store.index).__name__, "IndexHNSWFlat")
+        self.assertEqual(loaded.vector_store.index.hnsw.efSearch, 32)
+        loaded.set_search_params(ef_search=128)
+        self.assertEqual(loaded.vector_store.index.hnsw.efSearch, 128)
+
+        with open(os.path.join(self.temp_dir, "test_file2.md"), "w") as f:
+            f.write("## Changed Section\n\nThe second file was edited.")
+        loaded.update_store_from_directory(self.temp_dir)
+        docstore_ids = set(loaded.vector_store.docstore)
+        self.assertEqual(loaded.vector_store.index.ntotal, len(docstore_ids))
+        self.assertEqual(set(loaded.vector_store.index_to_docstore_id.values()), docstore_ids)
+        top = loaded.query_vector_store("The second file was edited.", k=1)[0]
+        self.assertEqual(top.metadata['section_name'], "Changed Section")
+        # Filter positions follow the compacting rebuild of the index.
+        positions = loaded.metadata_index.matching_positions({"file_name": "test_file2"}).tolist()
+        self.assertEqual(positions, [
+            position for position, chunk_id in sorted(loaded.vector_store.index_to_docstore_id.items())
+            if loaded.vector_store.docstore.search(chunk_id).metadata['file_name'] == "test_file2"
+        ])
+
+    def test_load_local_rejects_mismatched_manifest(self):
+        """
+        Tests that loading with settings that differ from the manifest raises a ValueError.
+        """
+        self.manager.build_vector_store_from_dict(self.mock_markdown_data)
+        index_path = os.path.join(self.temp_dir, "index")
+        self.manager.save_local(index_path)
+
+        with self.assertRaisesRegex(ValueError, "chunk_size"):
+            VectorStoreManager.load_local(index_path, chunk_size=200)
+
+    def test_load_local_raises_error_for_missing_store(self):
+        """
+        Tests that loading from a folder without a manifest raises a FileNotFoundError.
+        """
+        with self.assertRaises(FileNotFoundError):
+            VectorStoreManager.load_local(self.temp_dir)
+
+    def test_update_store_from_directory_only_reindexes_changed_files(self):
+        """
+        Tests that incremental ingestion adds, replaces and removes chunks per file.
+        """
+        for filename in ("test_file1", "test_file2"):
+            with open(os.path.join(self.temp_dir, f"{filename}.md"), "w") as f:
+                f.write(self.mock_markdown_data[filename])
+        self.manager.process_directory_and_build_store(self.temp_dir)
+        file1_ids = list(self.manager.file_manifest["test_file1"]["chunk_ids"])
+
+        with open(os.path.join(self.temp_dir, "test_file2.md"), "w") as f:
+            f.write("## Changed Section\n\nThe second file was edited.")
+        with open(os.path.join(self.temp_dir, "test_file5.md"), "w") as f:
+            f.write("## New File\n\nA file added after the first build.")
+        os.remove(os.path.join(self.temp_dir, "test_file1.md"))
+
+        report = self.manager.update_store_from_directory(self.temp_dir)
+        self.assertEqual(report["added"], ["test_file5"])
+        self.assertEqual(report["changed"], ["test_file2"])
+        self.assertEqual(report["removed"], ["test_file1"])
+
+        retrieved_docs = self.manager.get_all_documents_in_store()
+        self.assertEqual(
+            {d['metadata']['section_name'] for d in retrieved_docs},
+            {"Changed Section", "New File"}
+        )
+        for chunk_id in file1_ids:
+            self.assertNotIn(chunk_id, self.manager.vector_store.docstore)
+        self.assertEqual(self.manager.section_index.get_chunk_ids("test_file1", "Section One"), [])
+        self.assertEqual(
+            self.manager.section_index.get_chunk_ids("test_file2", "Changed Section"),
+            self.manager.file_manifest["test_file2"]["chunk_ids"]
+        )
+
+        # A second pass with nothing modified re-embeds nothing.
+        report = self.manager.update_store_from_directory(self.temp_dir)
+        self.assertEqual(sorted(report["unchanged"]), ["test_file2", "test_file5"])
+        self.assertEqual(report["added"] + report["changed"] + report["removed"], [])
+
+    def test_process_directory_streams_nested_files_in_batches(self):
+        """
+        Tests that nested files are ingested and that small batches give the same chunks.
+        """
+        os.makedirs(os.path.join(self.temp_dir, "nested"))
+        for filename, content in self.mock_markdown_data.items():
+            with open(os.path.join(self.temp_dir, "nested", f"{filename}.md"), "w") as f:
+                f.write(content)
+
+        self.manager.process_directory_and_build_store(self.temp_dir, batch_size=1, max_workers=2)
+        retrieved_docs = self.manager.get_all_documents_in_store()
+
+        expected = self.manager._parse_markdown_to_documents(
+            {f"nested/{name}": content for name, content in self.mock_markdown_data.items()}
+        )
+        self.assertEqual(
+            sorted((d['content'], d['metadata']['file_name']) for d in retrieved_docs),
+            sorted((d.page_content, d.metadata['file_name']) for d in expected)
+        )
+
+    def test_parallel_parsing_matches_serial_parsing(self):
+        """
+        Tests that the process-pool parse stage produces exactly the serial output.
+        """
+        markdown_data = dict(self.mock_markdown_data)
+        for i in range(6):
+            markdown_data[f"extra_{i}"] = f"# Extra {i}\n\n## Body\n\n{self.long_section_content * (i + 1)}"
+
+        serial_texts, parallel_texts = {}, {}
+        serial = self.manager._parse_markdown_to_documents(markdown_data, serial_texts)
+        parallel_manager = VectorStoreManager(chunk_size=100, chunk_overlap=10, parse_workers=2,
+                                              embeddings=HashingEmbedder())
+        parallel = parallel_manager._parse_markdown_to_documents(markdown_data, parallel_texts)
+
+        self.assertEqual(
+            [(d.page_content, d.metadata) for d in parallel],
+            [(d.page_content, d.metadata) for d in serial]
+        )
+        self.assertEqual(parallel_texts, serial_texts)
+
+    def test_token_chunks_pack_whole_sentences_within_the_model_limit(self):
+        """
+        Tests token-budget chunking: chunks fit the limit, end at sentence boundaries,
+        and the unit survives a save/load.
+        """
+        embeddings = HashingEmbedder(token_limit=40)
+        markdown_data = {"long": f"## Body\n\n{self.long_section_content * 4}"}
+        manager = VectorStoreManager(chunk_unit="tokens", chunk_overlap=0, embeddings=embeddings)
+        self.assertEqual(manager.chunk_size, 40)
+        documents = manager._parse_markdown_to_documents(markdown_data)
+        character_documents = self.manager._parse_markdown_to_documents(markdown_data)
+
+        self.assertLess(len(documents), len(character_documents))
+        for document in documents:
+            self.assertLessEqual(embeddings.count_tokens(document.page_content), 40)
+            self.assertTrue(document.page_content.endswith("."), document.page_content)
+
+        manager.build_vector_store_from_dict(markdown_data)
+        index_path = os.path.join(self.temp_dir, "index")
+        manager.save_local(index_path)
+        loaded = VectorStoreManager.load_local(index_path, embeddings=embeddings)
+        self.assertEqual((loaded.chunk_unit, loaded.chunk_size), ("tokens", 40))
+
+        with self.assertRaises(ValueError):
+            VectorStoreManager(chunk_unit="tokens", chunk_size=41, embeddings=embeddings)
+        with self.assertRaises(ValueError):
+            VectorStoreManager(chunk_unit="words", embeddings=embeddings)
+
+    def test_duplicate_chunks_are_stored_once_with_their_locations(self):
+        """
+        Tests that copies of a section across files share one vector that lists every
+        location, is found by a filter on any of them and outlives the file it came from.
+        """
+        shared = self.long_section_content
+        files = {
+            "guide": f"# Guide\n\n## Install\n\n{shared}\n\n## Usage\n\nThe guide explains usage.",
+            "howto": f"# Howto\n\n## Setup\n\n{shared.replace('absolutely', 'completely')}",
+        }
+        for file_name, content in files.items():
+            with open(os.path.join(self.temp_dir, f"{file_name}.md"), "w") as f:
+                f.write(content)
+        manager = VectorStoreManager(chunk_size=400, chunk_overlap=0, embeddings=HashingEmbedder(),
+                                     dedup_threshold=0.8)
+        manager.process_directory_and_build_store(self.temp_dir)
+
+        documents = manager.get_all_documents_in_store()
+        self.assertEqual(len(documents), 2)
+        shared_metadata = next(d["metadata"] for d in documents if d["metadata"]["section_name"] == "Install")
+        self.assertEqual(shared_metadata["locations"], [["guide", "Install"], ["howto", "Setup"]])
+        shared_position = manager.metadata_index.matching_positions({"section_name": "Install"})
+        self.assertEqual(manager.metadata_index.matching_positions({"file_name": "howto"}).tolist(),
+                         shared_position.tolist())
+
+        index_path = os.path.join(self.temp_dir, "index")
+        manager.save_local(index_path)
+        manager = VectorStoreManager.load_local(index_path, embeddings=HashingEmbedder())
+        self.assertEqual(manager.dedup_index.threshold, 0.8)
+
+        # Removing the file the chunk was first stored for hands it to the copy left.
+        shared_id = manager.file_manifest["howto"]["chunk_ids"][0]
+        os.remove(os.path.join(self.temp_dir, "guide.md"))
+        manager.update_store_from_directory(self.temp_dir)
+        documents = manager.get_all_documents_in_store()
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(documents[0]["metadata"]["file_name"], "howto")
+        self.assertNotIn("locations", documents[0]["metadata"])
+        self.assertEqual(manager.section_index.get_chunk_ids("howto", "Setup"), [shared_id])
+        self.assertEqual(manager.metadata_index.matching_positions({"file_name": "guide"}).tolist(), [])
+
+        with self.assertRaises(ValueError):
+            VectorStoreManager(embeddings=HashingEmbedder(), dedup_threshold=1.5)
+
 
 # This allows the test to be run from the command line
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+# test_embedding_backends.py
+
+import unittest
+import os
+import sys
+import math
+
+import numpy as np
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance import embedding_backends
+from data_persistance.embedding_backends import (
+    HashingEmbedder, SentenceTransformerBackend, create_embedding_backend, get_sentence_transformer
+)
+
+
+class FakeSentenceTransformer:
+    """
+    Stands in for a loaded model and records how it was asked to encode.
+    """
+
+    def __init__(self):
+        self.encode_calls = []
+
+    def encode(self, texts, batch_size, normalize_embeddings, **kwargs):
+        self.encode_calls.append((len(texts), batch_size, normalize_embeddings))
+        return np.ones((len(texts), 3), dtype='float32')
+
+
+class TestEmbeddingBackends(unittest.TestCase):
+    """
+    Unit test suite for the embedding backends and the model registry.
+    """
+
+    def setUp(self):
+        self.loads = []
+        self.original_loader = embedding_backends._load_sentence_transformer
+        self.original_registry = dict(embedding_backends._MODEL_REGISTRY)
+        embedding_backends._MODEL_REGISTRY.clear()
+
+        def fake_loader(model_name, device):
+            self.loads.append(model_name)
+            return FakeSentenceTransformer()
+        embedding_backends._load_sentence_transformer = fake_loader
+
+    def tearDown(self):
+        embedding_backends._load_sentence_transformer = self.original_loader
+        embedding_backends._MODEL_REGISTRY.clear()
+        embedding_backends._MODEL_REGISTRY.update(self.original_registry)
+
+    def test_hashing_embedder_is_deterministic_and_normalized(self):
+        """
+        Tests that equal texts get equal unit vectors and related texts are closer than unrelated ones.
+        """
+        embedder = HashingEmbedder(dimension=64)
+        first, again, related, unrelated = embedder.embed_documents(
+            ["install the package", "install the package", "install the python package", "reconstruct sections"]
+        )
+        self.assertEqual(first, again)
+        self.assertEqual(len(first), 64)
+        self.assertAlmostEqual(math.sqrt(sum(v * v for v in first)), 1.0)
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+        self.assertGreater(dot(first, related), dot(first, unrelated))
+        self.assertEqual(embedder.embed_query("install the package"), first)
+
+    def test_model_is_loaded_once_per_process(self):
+        """
+        Tests that backends sharing a model name share one loaded model, and that loading is lazy.
+        """
+        first = SentenceTransformerBackend("some-model", batch_size=8)
+        second = SentenceTransformerBackend("some-model", batch_size=16, normalize=True)
+        self.assertEqual(self.loads, [])
+
+        first.embed_documents(["a", "b"])
+        second.embed_queries(["c"])
+        self.assertEqual(self.loads, ["some-model"])
+        self.assertIs(first.model, get_sentence_transformer("some-model"))
+        self.assertEqual(first.model.encode_calls, [(2, 8, False), (1, 16, True)])
+
+    def test_backend_is_recreated_from_its_manifest_name(self):
+        """
+        Tests that a saved model name maps back to an equivalent backend.
+        """
+        hashing = create_embedding_backend(HashingEmbedder(dimension=32).model_name)
+        self.assertIsInstance(hashing, HashingEmbedder)
+        self.assertEqual(hashing.dimension, 32)
+
+        backend = create_embedding_backend("some-model", normalize=True)
+        self.assertIsInstance(backend, SentenceTransformerBackend)
+        self.assertEqual(backend.cache_identity, "some-model:normalized")
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,143 @@
+# test_embedding_cache.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from typing import List
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from langchain_core.embeddings import Embeddings
+from data_persistance.embedding_cache import INDEX_FILE_NAME, JOURNAL_FILE_NAME, CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """
+    A tiny deterministic embedder that records every text it is asked to embed.
+    """
+
+    def __init__(self):
+        self.calls: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+    """
+    Unit test suite for the CachedEmbeddings class.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = CountingEmbeddings()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_repeated_and_whitespace_variant_texts_hit_the_cache(self):
+        """
+        Tests that duplicates within and across calls are embedded only once.
+        """
+        cache = CachedEmbeddings(self.base, self.temp_dir, "test-model")
+        first = cache.embed_documents(["licence footer", "setup", "licence   footer"])
+        second = cache.embed_documents(["setup\n", "licence footer"])
+
+        self.assertEqual(self.base.calls, ["licence footer", "setup"])
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(second[1], first[0])
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_cache_is_reused_from_disk(self):
+        """
+        Tests that a new instance over the same directory serves earlier vectors.
+        """
+        expected = CachedEmbeddings(self.base, self.temp_dir, "test-model").embed_documents(["a", "bb", "ccc"])
+
+        reopened = CachedEmbeddings(CountingEmbeddings(), self.temp_dir, "test-model")
+        self.assertEqual(reopened.embed_documents(["a", "bb", "ccc"]), expected)
+        self.assertEqual(reopened.embeddings.calls, [])
+        self.assertEqual(reopened.stats()["hit_rate"], 1.0)
+
+    def test_model_name_is_part_of_the_key(self):
+        """
+        Tests that vectors from one model are not served for another.
+        """
+        CachedEmbeddings(self.base, self.temp_dir, "model-a").embed_documents(["same text"])
+        other = CachedEmbeddings(self.base, self.temp_dir, "model-b")
+        other.embed_documents(["same text"])
+        self.assertEqual(other.stats()["misses"], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """
+        Tests that the cache never holds more than max_entries vectors.
+        """
+        cache = CachedEmbeddings(self.base, self.temp_dir, "test-model", max_entries=2)
+        cache.embed_documents(["one", "two"])
+        cache.embed_documents(["one"])
+        cache.embed_documents(["three"])
+
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.embed_documents(["one", "two"])
+        self.assertEqual(self.base.calls, ["one", "two", "three", "two"])
+
+    def test_misses_embed_the_original_text(self):
+        """
+        Tests that whitespace is only normalized in the key, not in what is embedded.
+        """
+        cache = CachedEmbeddings(self.base, self.temp_dir, "test-model")
+        cache.embed_documents(["def f():\n    return 1"])
+        self.assertEqual(self.base.calls, ["def f():\n    return 1"])
+
+    def test_batches_are_journaled_until_flushed(self):
+        """
+        Tests that batches append to a journal instead of rewriting the index, and
+        that a reopened cache sees them, evictions included, before and after a flush.
+        """
+        cache = CachedEmbeddings(self.base, self.temp_dir, "test-model", max_entries=2)
+        cache.embed_documents(["one", "two"])
+        cache.embed_documents(["three"])
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, INDEX_FILE_NAME)))
+        with open(os.path.join(self.temp_dir, JOURNAL_FILE_NAME), 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+        for flush in (False, True):
+            if flush:
+                cache.flush()
+                self.assertFalse(os.path.exists(os.path.join(self.temp_dir, JOURNAL_FILE_NAME)))
+            reopened = CachedEmbeddings(CountingEmbeddings(), self.temp_dir, "test-model", max_entries=2)
+            self.assertEqual(reopened.stats()["entries"], 2)
+            self.assertEqual(reopened.embed_documents(["two", "three"]), cache.embed_documents(["two", "three"]))
+            self.assertEqual(reopened.embeddings.calls, [])
+
+    def test_batch_larger_than_max_entries_is_cached_and_journaled(self):
+        """
+        Tests that a batch with more misses than max_entries returns every vector
+        and journals only the entries that were not evicted again by the same batch.
+        """
+        texts = ["one", "two", "three", "four", "five"]
+        cache = CachedEmbeddings(self.base, self.temp_dir, "test-model", max_entries=2)
+        self.assertEqual(cache.embed_documents(texts), CountingEmbeddings().embed_documents(texts))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+        reopened = CachedEmbeddings(CountingEmbeddings(), self.temp_dir, "test-model", max_entries=2)
+        self.assertEqual(reopened.stats()["entries"], 2)
+        self.assertEqual(reopened.embed_documents(["four", "five"]),
+                         CountingEmbeddings().embed_documents(["four", "five"]))
+        self.assertEqual(reopened.embeddings.calls, [])
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
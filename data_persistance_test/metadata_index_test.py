@@ -0,0 +1,78 @@
+# test_metadata_index.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.metadata_index import MetadataIndex
+
+
+class TestMetadataIndex(unittest.TestCase):
+    """
+    Unit test suite for the MetadataIndex class.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = MetadataIndex()
+        self.index.append([
+            {"file_name": "setup", "section_name": "Install", "page_title": "Setup"},
+            {"file_name": "setup", "section_name": "Python", "page_title": "Setup"},
+            {"file_name": "faq", "section_name": "Install", "page_title": "FAQ"},
+            {"file_name": "faq", "section_name": "Python"},
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_filters_combine_fields_and_values(self):
+        """
+        Tests that fields are all required and the values of one field are alternatives.
+        """
+        self.assertEqual(self.index.matching_positions({"file_name": "faq"}).tolist(), [2, 3])
+        self.assertEqual(self.index.matching_positions({"section_name": ["Python", "Install"]}).tolist(), [0, 1, 2, 3])
+        self.assertEqual(self.index.matching_positions({"file_name": "setup", "section_name": "Python"}).tolist(), [1])
+        self.assertEqual(self.index.matching_positions({"page_title": "Missing"}).tolist(), [])
+        with self.assertRaises(ValueError):
+            self.index.matching_positions({"chunk_index": "0"})
+
+    def test_removal_renumbers_positions_and_index_round_trips(self):
+        """
+        Tests that removed positions close up like a FAISS deletion and that a save/load keeps them.
+        """
+        self.index.remove_positions([0, 2])
+        self.assertEqual(self.index.size, 2)
+        self.assertEqual(self.index.matching_positions({"file_name": "faq"}).tolist(), [1])
+        self.assertEqual(self.index.matching_positions({"section_name": "Install"}).tolist(), [])
+
+        path = os.path.join(self.temp_dir, "metadata.npz")
+        self.index.save(path)
+        loaded = MetadataIndex.load(path)
+        self.assertEqual(loaded.size, 2)
+        for field, value in (("file_name", "setup"), ("file_name", "faq"), ("section_name", "Python")):
+            self.assertEqual(loaded.matching_positions({field: value}).tolist(),
+                             self.index.matching_positions({field: value}).tolist())
+
+    def test_section_path_filter_includes_subsections(self):
+        """
+        Tests that a section path selects its own chunks and those of nested sections only.
+        """
+        index = MetadataIndex()
+        index.append({"section_path": path} for path in ("Setup", "Setup > Python", "Setup > Python > venv",
+                                                          "Usage > Python", "Setup Guide"))
+        self.assertEqual(index.matching_positions({"section_path": "Setup"}).tolist(), [0, 1, 2])
+        self.assertEqual(index.matching_positions({"section_path": "Setup > Python"}).tolist(), [1, 2])
+        self.assertEqual(index.matching_positions({"section_path": "Python"}).tolist(), [])
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
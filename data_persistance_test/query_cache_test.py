@@ -0,0 +1,59 @@
+# test_query_cache.py
+
+import unittest
+import os
+import sys
+import time
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.query_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Unit test suite for the LRUCache class.
+    """
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """
+        Tests that reading an entry protects it from eviction.
+        """
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "hit_rate": 2 / 3, "entries": 2})
+
+    def test_expired_entries_miss(self):
+        """
+        Tests that entries are dropped once their time-to-live has passed.
+        """
+        cache = LRUCache(max_entries=4, ttl_seconds=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_zero_size_disables_the_cache(self):
+        """
+        Tests that a cache of size 0 never stores anything.
+        """
+        cache = LRUCache(max_entries=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        with self.assertRaises(ValueError):
+            LRUCache(max_entries=-1)
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,151 @@
+# test_query_service.py
+
+import unittest
+import asyncio
+import json
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.query_service import QueryService
+from data_persistance.search_processor import SearchProcessor
+
+
+async def http_request(port: int, method: str, path: str, payload: Optional[Dict] = None,
+                       connection: Optional[Tuple] = None) -> Tuple[int, Dict]:
+    """
+    Sends one HTTP/1.1 request, on a new connection unless one is given.
+    """
+    reader, writer = connection or await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(':')
+        headers[name.strip().lower()] = value.strip()
+    response = json.loads(await reader.readexactly(int(headers['content-length'])))
+    if connection is None:
+        writer.close()
+    return status, response
+
+
+class TestQueryService(unittest.TestCase):
+    """
+    Unit test suite for the QueryService class.
+    """
+
+    def setUp(self):
+        manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder())
+        manager.build_vector_store_from_dict({
+            "guide": "# Guide\n\n## Setup\n\nInstall the package.\n\n## Usage\n\nRun the tool on a folder.",
+            "faq": "## Questions\n\nWhy are sections reconstructed?",
+        })
+        self.searcher = SearchProcessor(manager.vector_store, manager.section_index, result_cache_size=0)
+
+    def run_with_service(self, scenario, **service_options):
+        async def run():
+            service = QueryService(self.searcher, port=0, **service_options)
+            await service.start()
+            try:
+                return await scenario(service)
+            finally:
+                await service.close()
+        return asyncio.run(run())
+
+    def test_concurrent_queries_are_batched_and_answered(self):
+        """
+        Tests that concurrent clients get the same sections as direct calls, in fewer searches.
+        """
+        queries = ["Install the package.", "Run the tool", "Why are sections reconstructed?"] * 4
+
+        async def scenario(service):
+            responses = await asyncio.gather(*(
+                http_request(service.port, "POST", "/query", {"query": query, "k": 2}) for query in queries
+            ))
+            _, stats = await http_request(service.port, "GET", "/stats")
+            return responses, stats
+
+        responses, stats = self.run_with_service(scenario, max_batch_size=8, max_wait_ms=50)
+        for query, (status, response) in zip(queries, responses):
+            self.assertEqual(status, 200)
+            self.assertEqual(response["results"], self.searcher.retrieve_and_reconstruct_sections(query, k=2))
+        self.assertEqual(stats["batching"]["requests"], len(queries))
+        self.assertLess(stats["batching"]["batches"], len(queries))
+        self.assertLessEqual(stats["batching"]["largest_batch"], 8)
+
+    def test_keep_alive_connection_and_invalid_requests(self):
+        """
+        Tests that one connection serves several requests, that bad input (including
+        an invalid filter) gets a 4xx, and that a filter restricts the results.
+        """
+        async def scenario(service):
+            connection = await asyncio.open_connection("127.0.0.1", service.port)
+            results = [
+                await http_request(service.port, "GET", "/health", connection=connection),
+                await http_request(service.port, "POST", "/query", {"k": 2}, connection=connection),
+                await http_request(service.port, "POST", "/query", {"query": "setup", "k": 0}, connection=connection),
+                await http_request(service.port, "POST", "/query", {"query": "setup", "k": True},
+                                   connection=connection),
+                await http_request(service.port, "GET", "/query", connection=connection),
+                await http_request(service.port, "GET", "/missing", connection=connection),
+                await http_request(service.port, "POST", "/query", {"query": "setup", "filter": {"source": "x"}},
+                                   connection=connection),
+                await http_request(service.port, "POST", "/query", {"query": "setup", "filter": ["guide"]},
+                                   connection=connection),
+                await http_request(service.port, "POST", "/query",
+                                   {"query": "Why are sections reconstructed?", "k": 1,
+                                    "filter": {"file_name": "guide"}}, connection=connection),
+            ]
+            connection[1].close()
+            return results
+
+        responses = self.run_with_service(scenario)
+        self.assertEqual([status for status, _ in responses], [200, 400, 400, 400, 405, 404, 400, 400, 200])
+        self.assertTrue(all(section_id.startswith("guide - ") for section_id in responses[-1][1]["results"]))
+
+    def test_failed_searches_and_malformed_headers_get_json_errors(self):
+        """
+        Tests that a search that raises gets a 500 and leaves the connection usable,
+        and that an invalid Content-Length gets a 400 instead of a dropped connection.
+        """
+        def failing_search(queries, k, filter=None):
+            raise RuntimeError("index unavailable")
+        self.searcher.retrieve_and_reconstruct_sections_batch = failing_search
+
+        async def scenario(service):
+            connection = await asyncio.open_connection("127.0.0.1", service.port)
+            results = [
+                await http_request(service.port, "POST", "/query", {"query": "setup"}, connection=connection),
+                await http_request(service.port, "GET", "/health", connection=connection),
+            ]
+            connection[1].close()
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+            writer.write(b"POST /query HTTP/1.1\r\nHost: test\r\nContent-Length: ten\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return results, response
+
+        (failed, health), response = self.run_with_service(scenario)
+        self.assertEqual(failed, (500, {"error": "Search failed: index unavailable"}))
+        self.assertEqual(health, (200, {"status": "ok"}))
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertTrue(head.startswith(b"HTTP/1.1 400 "))
+        self.assertIn(b"Connection: close", head)
+        self.assertIn("error", json.loads(body))
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
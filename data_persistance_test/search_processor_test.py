@@ -0,0 +1,255 @@
+# test_search_processor.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.ann_index import IndexConfig
+from data_persistance.search_processor import SEARCH_MODES, SearchProcessor, parse_filter_args
+from data_persistance.serving_store import ServingStore
+
+
+class TestSearchProcessor(unittest.TestCase):
+    """
+    Unit test suite for the SearchProcessor class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.long_section_content = (
+            "Retrieval quality depends on how sections are chunked.\n\n"
+            "Each chunk overlaps the previous one so that sentences cut at a boundary "
+            "still appear whole in at least one chunk. Reconstruction must not repeat "
+            "that overlap when the full section is rebuilt for the answer."
+        )
+        cls.mock_markdown_data = {
+            "guide": (
+                "# Guide\n\n"
+                f"## Chunking\n\n{cls.long_section_content}\n\n"
+                "## Setup\n\nInstall the package."
+            ),
+            "faq": "## Questions\n\nWhy are sections reconstructed?",
+        }
+
+    def setUp(self):
+        self.manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder())
+        self.manager.build_vector_store_from_dict(self.mock_markdown_data)
+        self.searcher = SearchProcessor(self.manager.vector_store, self.manager.section_index)
+
+    def test_reconstructed_section_matches_source_exactly(self):
+        """
+        Tests that overlapping chunks are stitched back without duplicated text.
+        """
+        chunk_ids = self.manager.section_index.get_chunk_ids("guide", "Chunking")
+        self.assertGreater(len(chunk_ids), 2)
+
+        content, metadata = self.searcher._reconstruct_section("guide", "Chunking")
+        self.assertEqual(content, self.long_section_content)
+        self.assertEqual(metadata['section_name'], "Chunking")
+        self.assertNotIn('chunk_index', metadata)
+
+    def test_reconstruction_without_section_texts_stitches_by_offset(self):
+        """
+        Tests the fallback path for a section index rebuilt from the docstore.
+        """
+        searcher = SearchProcessor(self.manager.vector_store)
+        content, _ = searcher._reconstruct_section("guide", "Chunking")
+        self.assertEqual(content, " ".join(self.long_section_content.split()))
+
+    def test_retrieve_and_reconstruct_sections(self):
+        """
+        Tests that retrieved sections are keyed by file and section name.
+        """
+        results = self.searcher.retrieve_and_reconstruct_sections("Install the package.", k=1)
+        self.assertEqual(list(results), ["guide - Setup"])
+        self.assertEqual(results["guide - Setup"]["content"], "Install the package.")
+
+    def test_search_batch_matches_single_queries(self):
+        """
+        Tests that one batched search returns what per-query searches return.
+        """
+        queries = ["Install the package.", "Why are sections reconstructed?", "chunk overlap boundary"]
+        batch = self.searcher.search_batch(queries, k=3)
+        self.assertEqual(len(batch), 3)
+        for query, chunks in zip(queries, batch):
+            expected = self.searcher.query_vector_store(query, k=3)
+            self.assertEqual([c.page_content for c in chunks], [c.page_content for c in expected])
+
+        self.assertEqual(self.searcher.search_batch([], k=3), [])
+
+    def test_batched_reconstruction_matches_single_queries(self):
+        """
+        Tests that the batched section reconstruction matches the per-query one.
+        """
+        queries = ["Install the package.", "Install the package!", "overlap"]
+        batch = self.searcher.retrieve_and_reconstruct_sections_batch(queries, k=2)
+        for query, sections in zip(queries, batch):
+            self.assertEqual(sections, self.searcher.retrieve_and_reconstruct_sections(query, k=2))
+
+
+    def test_repeated_queries_are_served_from_the_caches(self):
+        """
+        Tests that a repeated query reuses its embedding and its reconstructed sections.
+        """
+        first = self.searcher.retrieve_and_reconstruct_sections("Install the package.", k=2)
+        first["guide - Setup"]["metadata"]["section_name"] = "modified by the caller"
+        again = self.searcher.retrieve_and_reconstruct_sections("  Install   the package.", k=2)
+        self.searcher.query_vector_store("Install the package.", k=1)
+
+        stats = self.searcher.cache_stats()
+        self.assertEqual(stats["results"]["hits"], 1)
+        self.assertEqual(stats["query_embeddings"]["hits"], 1)
+        self.assertEqual(stats["query_embeddings"]["entries"], 1)
+        self.assertEqual(again["guide - Setup"]["metadata"]["section_name"], "Setup")
+
+    def test_modifying_the_store_invalidates_cached_results(self):
+        """
+        Tests that results cached before chunks are deleted are not served afterwards.
+        """
+        query = "Why are sections reconstructed?"
+        self.assertIn("faq - Questions", self.searcher.retrieve_and_reconstruct_sections(query, k=1))
+
+        self.manager._delete_ids(self.manager.file_manifest["faq"]["chunk_ids"])
+        results = self.searcher.retrieve_and_reconstruct_sections(query, k=1)
+        self.assertNotIn("faq - Questions", results)
+        self.assertEqual(self.searcher.cache_stats()["results"]["hits"], 0)
+
+    def test_changing_search_params_invalidates_cached_results(self):
+        """
+        Tests that results cached under one efSearch are not served after it changes.
+        """
+        manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder(),
+                                     index_config=IndexConfig("hnsw"))
+        manager.build_vector_store_from_dict(self.mock_markdown_data)
+        searcher = SearchProcessor(manager.vector_store, manager.section_index)
+        query = "Install the package."
+        first = searcher.retrieve_and_reconstruct_sections(query, k=2)
+        searcher.retrieve_and_reconstruct_sections(query, k=2)
+        self.assertEqual(searcher.cache_stats()["results"]["hits"], 1)
+
+        manager.set_search_params(ef_search=128)
+        self.assertEqual(searcher.retrieve_and_reconstruct_sections(query, k=2), first)
+        self.assertEqual(searcher.cache_stats()["results"]["hits"], 1)
+        self.assertEqual(searcher.cache_stats()["results"]["entries"], 1)
+
+
+    def test_hybrid_search_finds_exact_identifiers(self):
+        """
+        Tests that lexical and hybrid modes find a chunk by an identifier it contains.
+        """
+        self.manager._add_documents([Document(page_content="Startup fails with ERR_CONN_42 when offline.", metadata={
+            "section_name": "Errors", "page_title": "Guide", "file_name": "guide", "source": "Markdown File",
+        })])
+        for mode in ("lexical", "hybrid"):
+            searcher = SearchProcessor(self.manager.vector_store, self.manager.section_index,
+                                       bm25_index=self.manager.bm25_index, search_mode=mode)
+            chunks = searcher.query_vector_store("what does err_conn_42 mean", k=2)
+            self.assertEqual(chunks[0].metadata["section_name"], "Errors", mode)
+
+        with self.assertRaises(ValueError):
+            SearchProcessor(self.manager.vector_store, search_mode="keyword")
+
+    def test_filtered_search_is_restricted_inside_the_index(self):
+        """
+        Tests that a filter returns k matching chunks even when better unfiltered
+        matches exist, in every search mode and for an approximate index.
+        """
+        query = "Why are sections reconstructed?"
+        self.assertEqual(self.searcher.query_vector_store(query, k=1)[0].metadata['file_name'], "faq")
+        guide_chunks = len(self.manager.file_manifest["guide"]["chunk_ids"])
+
+        hnsw_manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder(),
+                                          index_config=IndexConfig("hnsw"))
+        hnsw_manager.build_vector_store_from_dict(self.mock_markdown_data)
+        for manager in (self.manager, hnsw_manager):
+            for mode in SEARCH_MODES:
+                searcher = SearchProcessor(manager.vector_store, manager.section_index,
+                                           bm25_index=manager.bm25_index, search_mode=mode,
+                                           metadata_index=manager.metadata_index)
+                chunks = searcher.query_vector_store("sections chunk overlap", k=guide_chunks + 1,
+                                                     filter={"file_name": "guide"})
+                self.assertTrue(chunks, mode)
+                self.assertTrue(all(chunk.metadata['file_name'] == "guide" for chunk in chunks), mode)
+            chunks = searcher.query_vector_store(query, k=3, filter={"file_name": "guide", "section_name": "Setup"})
+            self.assertEqual([chunk.page_content for chunk in chunks], ["Install the package."])
+
+        sections = self.searcher.retrieve_and_reconstruct_sections(query, k=1, filter={"section_name": ["Setup"]})
+        self.assertEqual(list(sections), ["guide - Setup"])
+        self.assertIn("faq - Questions", self.searcher.retrieve_and_reconstruct_sections(query, k=1))
+        self.assertEqual(self.searcher.query_vector_store(query, filter={"file_name": "missing"}), [])
+        with self.assertRaises(ValueError):
+            self.searcher.query_vector_store(query, filter={"source": "Markdown File"})
+        self.assertEqual(parse_filter_args(["file_name=guide", "file_name=faq"]), {"file_name": ["guide", "faq"]})
+
+    def test_sections_that_lost_chunks_to_dedup_are_reconstructed_whole(self):
+        """
+        Tests that a section whose first or last chunk, or every chunk, was collapsed
+        into another file's copy is rebuilt in full, also from a serving store.
+        """
+        licence = ("This software is provided under the terms of the licence included with "
+                   "every copy of the distribution.")
+        install = f"{licence}\n\nRun the installer from the downloads page.\n\nThen log in again."
+        upgrade = f"Back up the data directory before you upgrade anything.\n\n{licence}"
+        markdown_data = {
+            "a": f"## Licence\n\n{licence}",
+            "b": f"## Install\n\n{install}\n\n## Upgrade\n\n{upgrade}\n\n## Terms\n\n{licence}",
+        }
+        manager = VectorStoreManager(chunk_size=120, chunk_overlap=0, embeddings=HashingEmbedder(),
+                                     dedup_threshold=0.8)
+        manager.build_vector_store_from_dict(markdown_data)
+        self.assertEqual(manager.section_index.get_chunk_ids("b", "Terms"), [])
+
+        serving_path = os.path.join(tempfile.mkdtemp(), "serving")
+        self.addCleanup(shutil.rmtree, os.path.dirname(serving_path))
+        manager.export_serving_store(serving_path)
+        serving = ServingStore.open(serving_path, embeddings=HashingEmbedder())
+        for store in (manager, serving):
+            searcher = SearchProcessor(store.vector_store, store.section_index)
+            for section_name, expected in (("Install", install), ("Upgrade", upgrade), ("Terms", licence)):
+                content, metadata = searcher._reconstruct_section("b", section_name)
+                self.assertEqual(content, expected)
+                self.assertEqual((metadata['file_name'], metadata['section_name']), ("b", section_name))
+            self.assertEqual(searcher._reconstruct_section("a", "Licence")[0], licence)
+
+    def test_score_threshold_and_adaptive_k_drop_irrelevant_chunks(self):
+        """
+        Tests that scored results match the store's own, and that a score threshold
+        or adaptive k returns fewer than k chunks and reconstructs only their sections.
+        """
+        query = "Why are sections reconstructed?"
+        scored = self.searcher.query_vector_store_with_scores(query, k=4)
+        expected = self.manager.query_vector_store_with_scores(query, k=4)
+        self.assertEqual([doc.id for doc, _ in scored], [doc.id for doc, _ in expected])
+        for (_, distance), (_, expected_distance) in zip(scored, expected):
+            self.assertAlmostEqual(distance, expected_distance, places=5)
+        self.assertEqual([distance for _, distance in scored], sorted(distance for _, distance in scored))
+
+        threshold = (scored[0][1] + scored[1][1]) / 2
+        for searcher in (SearchProcessor(self.manager.vector_store, self.manager.section_index,
+                                         score_threshold=threshold),
+                         SearchProcessor(self.manager.vector_store, self.manager.section_index, adaptive_k=True)):
+            self.assertEqual([doc.id for doc in searcher.query_vector_store(query, k=4)], [scored[0][0].id])
+            self.assertEqual(list(searcher.retrieve_and_reconstruct_sections(query, k=4)), ["faq - Questions"])
+        self.assertEqual(len(self.manager.query_vector_store(query, k=4, score_threshold=threshold)), 1)
+
+        strict = SearchProcessor(self.manager.vector_store, self.manager.section_index, score_threshold=1.0)
+        self.assertEqual(strict.search_batch(["zebra quantum", query], k=4)[0], [])
+        self.assertEqual(strict.retrieve_and_reconstruct_sections("zebra quantum", k=4), {})
+        with self.assertRaises(ValueError):
+            SearchProcessor(self.manager.vector_store, search_mode="lexical", score_threshold=1.0)
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
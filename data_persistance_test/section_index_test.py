@@ -0,0 +1,53 @@
+# test_section_index.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.section_index import SectionIndex
+
+
+class TestSectionIndex(unittest.TestCase):
+    """
+    Unit test suite for the SectionIndex class.
+    """
+
+    def setUp(self):
+        self.index = SectionIndex()
+        for chunk_id, section in [("a1", "Setup"), ("b1", "Usage"), ("a2", "Setup"), ("a3", "Setup")]:
+            self.index.add(chunk_id, {"file_name": "guide", "section_name": section})
+
+    def test_chunk_ids_are_kept_in_insertion_order(self):
+        self.assertEqual(self.index.get_chunk_ids("guide", "Setup"), ["a1", "a2", "a3"])
+        self.assertEqual(self.index.get_chunk_ids("guide", "Missing"), [])
+
+    def test_remove_drops_chunks_and_empty_sections(self):
+        self.index.remove(["a2", "b1", "unknown"])
+        self.assertEqual(self.index.get_chunk_ids("guide", "Setup"), ["a1", "a3"])
+        self.assertEqual(self.index.get_chunk_ids("guide", "Usage"), [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_save_and_load_round_trip(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "sections.json")
+            self.index.save(path)
+            loaded = SectionIndex.load(path)
+            self.assertEqual(loaded.get_chunk_ids("guide", "Setup"), ["a1", "a2", "a3"])
+            loaded.remove(["a1"])
+            self.assertEqual(loaded.get_chunk_ids("guide", "Setup"), ["a2", "a3"])
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
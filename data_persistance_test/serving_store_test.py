@@ -0,0 +1,107 @@
+# test_serving_store.py
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.ann_index import IndexConfig
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.search_processor import SEARCH_MODES, SearchProcessor
+from data_persistance.serving_store import ServingStore, open_store
+
+
+class TestServingStore(unittest.TestCase):
+    """
+    Unit test suite for the memory-mapped serving store.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mock_markdown_data = {
+            "guide": (
+                "# Guide\n\n"
+                "## Chunking\n\nEach chunk overlaps the previous one so that sentences cut at a boundary "
+                "still appear whole in at least one chunk.\n\n"
+                "## Setup\n\nInstall the package."
+            ),
+            "faq": "## Questions\n\nWhy are sections reconstructed?\n\n## Setup\n\nNothing to set up.",
+        }
+        self.queries = ["Why are sections reconstructed?", "install the package", "chunk boundary sentences"]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_serving_store_answers_like_the_store_it_was_exported_from(self):
+        """
+        Tests that every search mode gives the same chunks and sections, with and
+        without a filter, for an exact and an approximate index.
+        """
+        for index_type in ("flat", "hnsw"):
+            manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder(),
+                                         index_config=IndexConfig(index_type))
+            manager.build_vector_store_from_dict(self.mock_markdown_data)
+            serving_path = os.path.join(self.temp_dir, index_type)
+            manager.export_serving_store(serving_path)
+            store = ServingStore.open(serving_path, embeddings=HashingEmbedder())
+            self.assertEqual(store.vector_store.index.ntotal, manager.vector_store.index.ntotal)
+
+            for mode in SEARCH_MODES:
+                expected = SearchProcessor(manager.vector_store, manager.section_index,
+                                           bm25_index=manager.bm25_index, search_mode=mode,
+                                           metadata_index=manager.metadata_index)
+                served = SearchProcessor(store.vector_store, store.section_index,
+                                         bm25_index=store.bm25_index, search_mode=mode,
+                                         metadata_index=store.metadata_index)
+                for query in self.queries:
+                    for metadata_filter in (None, {"section_name": "Setup"}):
+                        self.assertEqual(
+                            served.query_vector_store(query, k=3, filter=metadata_filter),
+                            expected.query_vector_store(query, k=3, filter=metadata_filter),
+                            (index_type, mode, query),
+                        )
+                    self.assertEqual(served.retrieve_and_reconstruct_sections(query, k=3),
+                                     expected.retrieve_and_reconstruct_sections(query, k=3))
+
+    def test_serving_store_is_read_only_and_validated_on_open(self):
+        """
+        Tests that changes are refused, that the lexical and metadata indexes are
+        read from mapped arrays, and that open_store tells the two layouts apart.
+        """
+        manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder())
+        manager.build_vector_store_from_dict(self.mock_markdown_data)
+        serving_path = os.path.join(self.temp_dir, "serving")
+        manager.export_serving_store(serving_path)
+        store = ServingStore.open(serving_path, embeddings=HashingEmbedder())
+
+        chunk_id = manager.file_manifest["faq"]["chunk_ids"][0]
+        self.assertEqual(store.vector_store.docstore.search(chunk_id).page_content,
+                         manager.vector_store.docstore.search(chunk_id).page_content)
+        self.assertEqual(store.vector_store.docstore.search("missing"), "ID missing not found.")
+        with self.assertRaises(TypeError):
+            store.vector_store.delete([chunk_id])
+        with self.assertRaises(TypeError):
+            store.bm25_index.add("new", "Install the package.")
+        with self.assertRaises(TypeError):
+            store.metadata_index.remove_positions([0])
+        self.assertEqual(store.bm25_index.term_statistics("install the package"),
+                         manager.bm25_index.term_statistics("install the package"))
+        self.assertFalse([name for name in os.listdir(serving_path) if name.endswith(".npz")])
+
+        self.assertIsInstance(open_store(serving_path), ServingStore)
+        with self.assertRaises(FileNotFoundError):
+            ServingStore.open(os.path.join(self.temp_dir, "missing"))
+        with self.assertRaises(ValueError):
+            VectorStoreManager(embeddings=HashingEmbedder()).export_serving_store(self.temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
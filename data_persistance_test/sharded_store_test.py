@@ -0,0 +1,109 @@
+# test_sharded_store.py
+
+import unittest
+import os
+import sys
+import json
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.document_persistance import MANIFEST_FILE_NAME, VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.search_processor import SEARCH_MODES, SearchProcessor, ShardedSearchProcessor
+from data_persistance.sharded_store import ShardedStore
+
+
+class TestShardedStore(unittest.TestCase):
+    """
+    Unit test suite for stores split into shards by file.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "docs")
+        os.makedirs(self.input_dir)
+        # Every file shares words with every query, so no two chunks score the same
+        # and the order of the results does not depend on how ties are broken.
+        markdown_files = {
+            "guide": "# Guide\n\n## Chunking\n\nThe store splits each section into chunks that overlap, so a "
+                     "sentence cut at a chunk boundary still appears whole in one of the chunks of the store.",
+            "faq": "## Questions\n\nWhy does the store reconstruct sections from their chunks? Each query "
+                   "returns chunks, and the store joins the chunks of a section.",
+            "setup": "## Setup\n\nInstall the package with pip, then build the store from a directory of "
+                     "markdown files; the files become chunks.",
+            "search": "## Search modes\n\nHybrid search of the store fuses the dense and BM25 rankings of the "
+                      "chunks of a query by reciprocal rank.",
+            "serving": "## Serving\n\nThe query service of the store batches concurrent queries into one "
+                       "search of its chunks.",
+            "errors": "## Errors\n\nError E1234 means the manifest of the store has an out of date schema "
+                      "version for its chunks, so rebuild the store.",
+        }
+        for name, content in markdown_files.items():
+            with open(os.path.join(self.input_dir, f"{name}.md"), 'w', encoding='utf-8') as f:
+                f.write(content)
+        self.queries = ["Why does the store reconstruct sections from chunks?",
+                        "install the package and build the store",
+                        "error E1234 in the store manifest", "reciprocal rank fusion of the chunks"]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_sharded_store_answers_like_a_single_store(self):
+        """
+        Tests that every search mode gives a sharded store the same chunks and
+        sections as one store of the same files, with and without a filter.
+        """
+        single = VectorStoreManager(chunk_size=400, chunk_overlap=40, embeddings=HashingEmbedder())
+        single.process_directory_and_build_store(self.input_dir)
+        template = VectorStoreManager(chunk_size=400, chunk_overlap=40, embeddings=HashingEmbedder())
+        sharded = template.build_shards(self.input_dir, os.path.join(self.temp_dir, "sharded"), 3)
+        self.assertEqual(sum(shard.vector_store.index.ntotal for shard in sharded.shards if shard.vector_store),
+                         single.vector_store.index.ntotal)
+
+        for mode in SEARCH_MODES:
+            expected = SearchProcessor(single.vector_store, single.section_index, bm25_index=single.bm25_index,
+                                       search_mode=mode, metadata_index=single.metadata_index)
+            actual = ShardedSearchProcessor(sharded.shards, search_mode=mode)
+            for metadata_filter in (None, {"file_name": ["faq", "setup", "errors"]}):
+                with self.subTest(mode=mode, filter=metadata_filter):
+                    # Chunk ids are generated per store, so chunks are compared by content and place.
+                    self.assertEqual(
+                        [[(doc.page_content, doc.metadata) for doc in docs]
+                         for docs in actual.search_batch(self.queries, k=3, filter=metadata_filter)],
+                        [[(doc.page_content, doc.metadata) for doc in docs]
+                         for docs in expected.search_batch(self.queries, k=3, filter=metadata_filter)],
+                    )
+                    for query in self.queries:
+                        self.assertEqual(actual.retrieve_and_reconstruct_sections(query, k=3, filter=metadata_filter),
+                                         expected.retrieve_and_reconstruct_sections(query, k=3,
+                                                                                    filter=metadata_filter))
+
+    def test_manifest_records_the_shard_layout(self):
+        """
+        Tests that the manifest lists every shard, that the store reloads from it,
+        and that a sharded folder is not mistaken for a single store.
+        """
+        folder_path = os.path.join(self.temp_dir, "sharded")
+        template = VectorStoreManager(chunk_size=400, chunk_overlap=40, embeddings=HashingEmbedder())
+        template.build_shards(self.input_dir, folder_path, 2, max_processes=1)
+        with open(os.path.join(folder_path, MANIFEST_FILE_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["shard_count"], 2)
+        self.assertEqual(len(manifest["shards"]), 2)
+
+        loaded = ShardedStore.load(folder_path, embeddings=HashingEmbedder())
+        self.assertEqual([shard.shard for shard in loaded.shards], [(0, 2), (1, 2)])
+        self.assertEqual(sorted(file_name for shard in loaded.shards for file_name in shard.file_manifest),
+                         sorted(os.path.splitext(name)[0] for name in os.listdir(self.input_dir)))
+        with self.assertRaises(ValueError):
+            VectorStoreManager.load_local(folder_path)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
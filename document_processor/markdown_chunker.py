@@ -0,0 +1,199 @@
+# markdown_chunker.py
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from document_processor.markdown_cleaner import clean_markdown_text
+from document_processor.markdown_tree import INTRODUCTION_SECTION, SECTION_PATH_SEPARATOR, iter_sections
+from instrumentation import metrics
+
+# --- Split points ---
+# Character chunks fall back from paragraphs to lines, words and characters.
+# Token chunks also break between sentences, and keep each separator at the
+# end of the piece before it, so that whole sentences and paragraphs are packed
+# into a chunk until the next one would not fit.
+CHARACTER_SEPARATORS = ["\n\n", "\n", " ", ""]
+TOKEN_SEPARATORS = ["\n\n", "\n", ". ", "! ", "? ", "; ", " ", ""]
+
+
+class ChunkRecord(NamedTuple):
+    """
+    One chunk of a section. File-level fields live on FileChunks, so a record
+    is a small tuple that is cheap to pickle between processes.
+    """
+    section_name: str
+    section_index: int
+    # The cleaned header names from the outermost enclosing section, e.g. "Setup > Python".
+    section_path: str
+    # The header level, 0 for the text before the first header.
+    section_level: int
+    # The section_index of the enclosing section, or -1 at the top level.
+    parent_section_index: int
+    chunk_index: int
+    start_index: int
+    end_index: int
+    text: str
+
+
+class FileChunks(NamedTuple):
+    """
+    The chunks of one markdown file together with the cleaned text of its sections.
+    """
+    file_name: str
+    page_title: str
+    records: List[ChunkRecord]
+    # section_index -> cleaned section text
+    section_texts: Dict[int, str]
+
+
+class MarkdownChunker:
+    """
+    Splits markdown files into cleaned section chunks.
+
+    The chunker holds no per-file state, so the same instance (or a copy in a
+    worker process) can chunk any number of files.
+    """
+
+    def __init__(self, chunk_size: int = 200, chunk_overlap: int = 20,
+                 length_function: Optional[Callable[[str], int]] = None):
+        """
+        Initializes the MarkdownChunker.
+
+        Args:
+            chunk_size (int): The maximum size of text chunks.
+            chunk_overlap (int): The overlap between consecutive chunks.
+            length_function (Optional[Callable[[str], int]]): Measures a text, e.g. an
+                embedding backend's count_tokens, in which case sizes are in tokens and
+                chunks end at sentence boundaries where they can. Defaults to characters.
+                It is sent to worker processes, so it must be picklable.
+        """
+        # Imported here: LangChain takes most of a second to import, and modules that
+        # import this one (document_persistance) are also used without chunking.
+        # To make this module runnable, you might need to install the following package:
+        # pip install langchain-text-splitters
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+        if length_function is None:
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                separators=CHARACTER_SEPARATORS
+            )
+        else:
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                length_function=length_function,
+                separators=TOKEN_SEPARATORS,
+                keep_separator="end"
+            )
+
+    def clean_text(self, text: str) -> str:
+        """
+        Removes common markdown syntax from a string to prepare it for embedding.
+        """
+        return clean_markdown_text(text)
+
+    def _split_section(self, cleaned_text: str, section_name: str, section_index: int, section_path: str,
+                       section_level: int, parent_section_index: int) -> List[ChunkRecord]:
+        """
+        Splits one cleaned section into chunks that record their order and their
+        character offsets into the cleaned section text.
+        """
+        records = []
+        search_from = 0
+        for chunk_index, chunk in enumerate(self.text_splitter.split_text(cleaned_text)):
+            start_index = cleaned_text.find(chunk, search_from)
+            if start_index == -1:
+                start_index = cleaned_text.find(chunk)
+            search_from = start_index + 1
+            records.append(ChunkRecord(section_name, section_index, section_path, section_level,
+                                       parent_section_index, chunk_index, start_index, start_index + len(chunk), chunk))
+        return records
+
+    def chunk_file(self, file_name: str, content: str) -> FileChunks:
+        """
+        Parses one markdown file into section chunks, in one pass over its header tree.
+
+        Text before the first header becomes the "Introduction" section. Every
+        section records its ordinal within the file as section_index, its
+        header level, the ordinal of its enclosing section and its section
+        path: the names of the enclosing headers and its own, joined by " > ".
+        The page title is the file's first level-1 header (or the file name);
+        as every section is nested under it, it is left out of the paths.
+        """
+        records: List[ChunkRecord] = []
+        section_texts: Dict[int, str] = {}
+        if not content.strip():
+            return FileChunks(file_name, file_name, records, section_texts)
+
+        page_title: Optional[str] = None
+        # The path each section's subsections extend: the page title section's is empty.
+        scopes: Dict[Optional[int], Tuple[str, ...]] = {None: ()}
+        for section in iter_sections(content.splitlines()):
+            with metrics.stage("clean"):
+                section_name = self.clean_text(section.name.strip()) if section.level else INTRODUCTION_SECTION
+                cleaned_body = self.clean_text(section.body.strip())
+            path = scopes[section.parent] + (section_name,)
+            if section.level == 1 and page_title is None:
+                page_title = section_name
+                scopes[section.ordinal] = ()
+            else:
+                scopes[section.ordinal] = path
+            if not cleaned_body:
+                continue
+            parent = section.parent if section.parent is not None else -1
+            with metrics.stage("split"):
+                records.extend(self._split_section(cleaned_body, section_name, section.ordinal,
+                                                   SECTION_PATH_SEPARATOR.join(path), section.level, parent))
+            section_texts[section.ordinal] = cleaned_body
+        return FileChunks(file_name, page_title if page_title is not None else file_name, records, section_texts)
+
+    def chunk_files(self, files: Iterable[Tuple[str, str]], workers: int = 0) -> Iterator[FileChunks]:
+        """
+        Chunks (file_name, content) pairs, in order.
+
+        With workers > 1 the files are spread across a process pool. At most
+        2 * workers files are in flight, and results come back as compact
+        FileChunks rather than Document objects, so the output is identical to
+        the serial path while the regex cleaning and splitting use every core.
+        Clean and split timings are only recorded by the serial path, since
+        worker processes have their own metrics registry.
+
+        Args:
+            files: (file_name, content) pairs. Consumed lazily.
+            workers (int): The number of worker processes; 0 or 1 chunks serially.
+        """
+        if workers <= 1:
+            for file_name, content in files:
+                yield self.chunk_file(file_name, content)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.chunk_size, self.chunk_overlap, self.length_function)) as executor:
+            pending = deque()
+            for file_name, content in files:
+                pending.append(executor.submit(_chunk_file_in_worker, file_name, content))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+# --- Process pool plumbing ---
+# Each worker builds its own chunker once instead of receiving it with every file.
+_worker_chunker: Optional[MarkdownChunker] = None
+
+
+def _init_worker(chunk_size: int, chunk_overlap: int, length_function: Optional[Callable[[str], int]]) -> None:
+    global _worker_chunker
+    _worker_chunker = MarkdownChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                      length_function=length_function)
+
+
+def _chunk_file_in_worker(file_name: str, content: str) -> FileChunks:
+    return _worker_chunker.chunk_file(file_name, content)
@@ -0,0 +1,77 @@
+# markdown_cleaner.py
+
+import re
+from typing import Match
+
+# --- Patterns ---
+# Every construct is one alternative of a single compiled pattern, so a text is
+# cleaned by one re.sub scan instead of one full copy per construct.
+#
+# Each alternative starts with a literal character ('\n' for line-level
+# constructs, which are matched together with the newline before them), which
+# lets the regex engine skip quickly over plain text. The leading indentation is
+# consumed possessively so a long indent is never re-scanned per alternative.
+# The callback dispatches on the name of the last group of each alternative.
+# As in markdown_tree.iter_sections, a fence closes on a line of the same
+# character at least as long as the one that opened it.
+_BLOCK_ALTERNATIVES = r"""
+\n[ \t]*+(?:
+  (?P<fence>(?P<fence_mark>(?P<fence_char>[`~])(?P=fence_char){2,})[^\n]*(?P<fence_body>(?s:\n.*?)??)
+     \n[ \t]*(?P=fence_mark)(?P=fence_char)*[ \t]*(?=\n|\Z))
+ |(?P<open_fence>(?:`{3,}|~{3,})[^\n]*(?P<open_body>(?s:\n.*))?\Z)
+ |(?P<table_sep>(?:\|[ \t]*)?:?-{3,}:?[ \t]*(?:\|[ \t]*(?::?-{3,}:?[ \t]*)?)+(?=\n|\Z))
+ |(?P<table_row>\|(?P<cells>[^\n]*)\|[ \t]*(?=\n|\Z))
+ |(?P<rule>(?P<rule_char>[-*_])(?:[ \t]*(?P=rule_char)){2,}[ \t]*(?=\n|\Z))
+ |(?P<prefix>(?:>[ \t]?)+(?:[*+-][ \t]+)?|[*+-][ \t]+)
+)
+"""
+_INLINE_ALTERNATIVES = r"""
+ `(?P<ticks>`*)(?P<code_text>[^\n]+?)`(?P=ticks)
+|!\[(?P<image_text>[^\]\n]*)\]\([^)\n]*\)
+|\[(?P<link_text>[^\]\n]*)\]\([^)\n]*\)
+|\*(?P<star_mark>\*?)(?=\S)(?P<star_text>[^\n]+?)(?<=\S)\*(?P=star_mark)
+|_(?<!\w_)(?P<under_mark>_?)(?=\S)(?P<under_text>[^\n]+?)(?<=\S)_(?P=under_mark)(?!\w)
+"""
+
+_MARKDOWN_PATTERN = re.compile(_BLOCK_ALTERNATIVES + "|" + _INLINE_ALTERNATIVES, re.VERBOSE)
+# Used inside link texts, emphasis and table cells, where only inline syntax applies.
+_INLINE_PATTERN = re.compile(_INLINE_ALTERNATIVES, re.VERBOSE)
+
+# Alternatives whose text may itself contain inline markdown.
+_NESTED_INLINE_GROUPS = frozenset(('image_text', 'link_text', 'star_text', 'under_text'))
+
+
+def _replace(match: Match) -> str:
+    kind = match.lastgroup
+    if kind == 'code_text':
+        return match.group(kind)
+    if kind in _NESTED_INLINE_GROUPS:
+        return _INLINE_PATTERN.sub(_replace, match.group(kind))
+    # Line-level matches consumed the newline before them and must put it back.
+    if kind == 'fence':
+        # Code is kept verbatim; only the fence lines are dropped.
+        return "\n" + match.group('fence_body')[1:]
+    if kind == 'open_fence':
+        # An unclosed fence runs to the end of the text.
+        return "\n" + (match.group('open_body') or "\n")[1:]
+    if kind == 'table_row':
+        cells = match.group('cells').split('|')
+        return "\n" + " | ".join(_INLINE_PATTERN.sub(_replace, cell.strip()) for cell in cells)
+    if kind == 'table_sep':
+        return ""
+    # rule and prefix: the marker is removed, the line stays.
+    return "\n"
+
+
+def clean_markdown_text(text: str) -> str:
+    """
+    Converts markdown to plain text for embedding in a single regex scan.
+
+    Links and images keep their text, emphasis and inline code keep their
+    content, list markers, blockquote markers and horizontal rules are removed.
+    Fenced code blocks keep their content untouched (no emphasis or list
+    stripping inside code), and table rows become their cells separated by
+    " | " with the header separator row dropped.
+    """
+    # The leading newline lets constructs on the first line match like any other line.
+    return _MARKDOWN_PATTERN.sub(_replace, "\n" + text).strip()
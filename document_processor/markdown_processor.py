@@ -1,7 +1,11 @@
 # markdown_processor.py
 
 import os
-from typing import Dict, Union
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Tuple, Union
+
+from instrumentation import metrics
 
 class MarkdownProcessor:
     """
@@ -28,7 +32,50 @@ class MarkdownProcessor:
             FileNotFoundError: If the specified directory_path does not exist.
             NotADirectoryError: If the specified path points to a file, not a directory.
         """
-        # --- 1. Validate the input path ---
+        # --- 1. Find the markdown files (validates the input path) ---
+        markdown_files = self.list_markdown_files(directory_path)
+
+        # --- 2. Read the files ---
+        markdown_content: Dict[str, str] = {}
+
+        for base_filename, full_path in markdown_files.items():
+            try:
+                # Store the content in the dictionary
+                markdown_content[base_filename] = self.read_markdown_file(full_path)
+            except Exception as e:
+                print(f"Could not read file {os.path.basename(full_path)} due to error: {e}")
+
+        # --- 3. Return the result ---
+        return markdown_content
+
+    def list_markdown_files(self, directory_path: str, recursive: bool = False) -> Dict[str, str]:
+        """
+        Lists the Markdown (.md) files in a directory without reading them.
+
+        Args:
+            directory_path: The path to the directory containing the markdown files.
+            recursive: Whether to include files in subdirectories.
+
+        Returns:
+            A dictionary mapping each file's relative path (without the .md
+            extension, '/'-separated) to the full path of the file.
+
+        Raises:
+            FileNotFoundError: If the specified directory_path does not exist.
+            NotADirectoryError: If the specified path points to a file, not a directory.
+        """
+        return dict(self.iter_markdown_paths(directory_path, recursive=recursive))
+
+    def iter_markdown_paths(self, directory_path: str, recursive: bool = True) -> Iterator[Tuple[str, str]]:
+        """
+        Walks a directory tree lazily, yielding (relative_path, full_path) for every
+        markdown file. The relative path has no .md extension, so files at the top
+        level keep the same keys as read_markdown_files_from_directory.
+
+        Raises:
+            FileNotFoundError: If the specified directory_path does not exist.
+            NotADirectoryError: If the specified path points to a file, not a directory.
+        """
         # Check if the path exists. If not, raise an error.
         if not os.path.exists(directory_path):
             raise FileNotFoundError(f"Error: The directory '{directory_path}' was not found.")
@@ -37,31 +84,69 @@ class MarkdownProcessor:
         if not os.path.isdir(directory_path):
             raise NotADirectoryError(f"Error: The path '{directory_path}' is a file, not a directory.")
 
-        # --- 2. Read the files ---
-        markdown_content: Dict[str, str] = {}
+        return self._walk_markdown_paths(directory_path, "", recursive)
 
-        # Iterate over all entries in the directory
-        for filename in os.listdir(directory_path):
-            # Construct the full path for the current file
-            full_path = os.path.join(directory_path, filename)
+    def _walk_markdown_paths(self, directory_path: str, prefix: str, recursive: bool) -> Iterator[Tuple[str, str]]:
+        # Sorted entries make the walk order (and so chunk order) reproducible.
+        with os.scandir(directory_path) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.md'):
+                # Get the filename without the '.md' extension for the dictionary key
+                yield prefix + os.path.splitext(entry.name)[0], entry.path
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                yield from self._walk_markdown_paths(entry.path, f"{prefix}{entry.name}/", recursive)
 
-            # Process only if it's a file and has a '.md' extension
-            if os.path.isfile(full_path) and filename.lower().endswith('.md'):
-                try:
-                    # Open and read the file content
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+    def read_files_concurrently(self, paths: Iterable[Tuple[str, str]], max_workers: int = 8) -> Iterator[Tuple[str, str]]:
+        """
+        Reads files on a thread pool and yields (key, content) in the order of paths.
 
-                    # Get the filename without the '.md' extension for the dictionary key
-                    base_filename = os.path.splitext(filename)[0]
+        At most 2 * max_workers reads are in flight, so memory depends on the
+        number of workers and not on how many paths there are. Files that cannot
+        be read are reported and skipped.
+
+        Args:
+            paths: (key, full_path) pairs, e.g. from iter_markdown_paths.
+            max_workers: The number of reader threads.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for key, full_path in paths:
+                pending.append((key, full_path, executor.submit(self.read_markdown_file, full_path)))
+                if len(pending) >= 2 * max_workers:
+                    yield from self._read_result(*pending.popleft())
+            while pending:
+                yield from self._read_result(*pending.popleft())
+
+    @staticmethod
+    def _read_result(key: str, full_path: str, future: Future) -> Iterator[Tuple[str, str]]:
+        try:
+            content = future.result()
+        except Exception as e:
+            print(f"Could not read file {full_path} due to error: {e}")
+            return
+        yield key, content
+
+    def stream_markdown_files(self, directory_path: str, max_workers: int = 8) -> Iterator[Tuple[str, str]]:
+        """
+        Recursively reads every markdown file under directory_path on a thread pool,
+        yielding (relative_path, content) pairs in walk order.
 
-                    # Store the content in the dictionary
-                    markdown_content[base_filename] = content
-                except Exception as e:
-                    print(f"Could not read file {filename} due to error: {e}")
+        Raises:
+            FileNotFoundError: If the specified directory_path does not exist.
+            NotADirectoryError: If the specified path points to a file, not a directory.
+        """
+        return self.read_files_concurrently(self.iter_markdown_paths(directory_path), max_workers=max_workers)
 
-        # --- 3. Return the result ---
-        return markdown_content
+    def read_markdown_file(self, file_path: str) -> str:
+        """
+        Reads a single markdown file as UTF-8 text.
+        """
+        with metrics.stage("read"):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        metrics.count("files")
+        return content
 
 # Example of how to use the class
 if __name__ == '__main__':
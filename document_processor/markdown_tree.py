@@ -0,0 +1,83 @@
+# markdown_tree.py
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# --- Line patterns ---
+# An ATX header: up to three spaces, one to six '#', whitespace and the header
+# text. An optional closing run of '#' is not part of the text.
+_HEADER_PATTERN = re.compile(r' {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+# A code fence: up to three spaces and three or more backticks or tildes. A
+# backtick fence's info string cannot contain a backtick (that is inline code).
+_FENCE_PATTERN = re.compile(r' {0,3}(`{3,}(?=[^`]*$)|~{3,})')
+
+# The name and ordinal of the text before a file's first header.
+INTRODUCTION_SECTION = "Introduction"
+# Joins the header names of a section path, e.g. "Setup > Python".
+SECTION_PATH_SEPARATOR = " > "
+
+
+class MarkdownSection(NamedTuple):
+    """
+    One header and the markdown up to the next header, as a node of the file's
+    header tree.
+    """
+    # The section's ordinal within the file: 0 for the text before the first
+    # header, then 1, 2, ... for the headers in order.
+    ordinal: int
+    # The header level (1-6), or 0 for the text before the first header.
+    level: int
+    # The raw header text.
+    name: str
+    # The ordinal of the nearest enclosing header, or None at the top level.
+    parent: Optional[int]
+    body: str
+
+
+def iter_sections(lines: Iterable[str]) -> Iterator[MarkdownSection]:
+    """
+    Splits markdown into its header sections in a single pass over its lines.
+
+    A header is a child of the nearest preceding header of a lower level, so
+    "## A" followed by "### B" makes B a subsection of A. Lines inside fenced
+    code blocks are never headers, and a fence closes only on a fence line of
+    the same character that is at least as long as the one that opened it.
+    Each section is yielded as soon as the next header ends it, so a file can be
+    streamed line by line. The text before the first header is yielded as
+    ordinal 0 (an empty body if there is none).
+
+    Args:
+        lines: The lines of one file, with or without their line endings, e.g.
+            an open file or content.splitlines().
+    """
+    ordinal, level, name, parent = 0, 0, INTRODUCTION_SECTION, None
+    body: List[str] = []
+    # (level, ordinal) of the open headers, outermost first.
+    ancestors: List[Tuple[int, int]] = []
+    fence: Optional[str] = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        fence_match = _FENCE_PATTERN.match(line)
+        if fence is not None:
+            if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence) \
+                    and not line[fence_match.end():].strip():
+                fence = None
+            body.append(line)
+            continue
+        if fence_match:
+            fence = fence_match.group(1)
+            body.append(line)
+            continue
+        header_match = _HEADER_PATTERN.match(line) if line.lstrip(' ').startswith('#') else None
+        if header_match is None:
+            body.append(line)
+            continue
+        yield MarkdownSection(ordinal, level, name, parent, "\n".join(body))
+        header_level = len(header_match.group(1))
+        while ancestors and ancestors[-1][0] >= header_level:
+            ancestors.pop()
+        ordinal, level, name = ordinal + 1, header_level, header_match.group(2)
+        parent = ancestors[-1][1] if ancestors else None
+        ancestors.append((level, ordinal))
+        body = []
+    yield MarkdownSection(ordinal, level, name, parent, "\n".join(body))
@@ -0,0 +1,68 @@
+# test_markdown_cleaner.py
+
+import unittest
+import os
+import sys
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from document_processor.markdown_cleaner import clean_markdown_text
+
+
+class TestCleanMarkdownText(unittest.TestCase):
+    """
+    Unit test suite for the single-pass markdown cleaner.
+    """
+
+    def test_links_and_images_keep_their_text(self):
+        self.assertEqual(
+            clean_markdown_text("See [the docs](http://x) and ![a diagram](img.png)."),
+            "See the docs and a diagram."
+        )
+
+    def test_emphasis_and_inline_code(self):
+        self.assertEqual(
+            clean_markdown_text("**bold**, *it*, __strong__, _em_ and `code`"),
+            "bold, it, strong, em and code"
+        )
+        # Nested syntax inside emphasis is cleaned too.
+        self.assertEqual(clean_markdown_text("A **[link](u)** here"), "A link here")
+
+    def test_identifiers_are_not_treated_as_emphasis(self):
+        self.assertEqual(
+            clean_markdown_text("Call `__init__` on snake_case_name, then 2 * 3 * 4."),
+            "Call __init__ on snake_case_name, then 2 * 3 * 4."
+        )
+
+    def test_list_markers_blockquotes_and_rules(self):
+        self.assertEqual(
+            clean_markdown_text("* one\n- two\n+ three\n\n> quoted\n> * quoted item\n\n---\nend"),
+            "one\ntwo\nthree\n\nquoted\nquoted item\n\n\nend"
+        )
+
+    def test_code_fences_are_kept_verbatim(self):
+        text = "Before\n\n```python\n# not a header\nx = a_b * c_d\n* not a list\n```\nAfter"
+        self.assertEqual(
+            clean_markdown_text(text),
+            "Before\n\n# not a header\nx = a_b * c_d\n* not a list\nAfter"
+        )
+        self.assertEqual(clean_markdown_text("```\nunclosed *code*"), "unclosed *code*")
+
+    def test_fences_close_on_a_line_at_least_as_long(self):
+        self.assertEqual(clean_markdown_text("~~~\ncode\n~~~~\n*after*"), "code\nafter")
+        # A shorter fence line, or one of the other character, is code.
+        self.assertEqual(clean_markdown_text("~~~~\n~~~\n```\n*code*\n~~~~~\n*after*"),
+                         "~~~\n```\n*code*\nafter")
+
+    def test_tables_become_cell_rows(self):
+        text = "| Name | **Value** |\n|------|:-----:|\n| `a` | [b](c) |"
+        self.assertEqual(clean_markdown_text(text), "Name | Value\na | b")
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
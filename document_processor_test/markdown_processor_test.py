@@ -5,6 +5,7 @@ import os
 import sys
 import tempfile
 import shutil
+import time
 
 # --- Fix for ModuleNotFoundError ---
 # This code adds the project's root directory to the Python path.
@@ -104,6 +105,56 @@ class TestMarkdownProcessor(unittest.TestCase):
         with self.assertRaises(NotADirectoryError):
             self.processor.read_markdown_files_from_directory(file_path)
 
+    def test_stream_markdown_files_walks_subdirectories(self):
+        """
+        Tests that streaming reads nested files and keys them by relative path.
+        """
+        nested_dir = os.path.join(self.temp_dir, "subdir", "deeper")
+        os.makedirs(nested_dir)
+        with open(os.path.join(nested_dir, "nested.md"), "w") as f:
+            f.write("# Nested")
+
+        result = dict(self.processor.stream_markdown_files(self.temp_dir, max_workers=2))
+
+        expected = {
+            "test1": self.md_content1,
+            "test2": self.md_content2,
+            "subdir/deeper/nested": "# Nested",
+        }
+        self.assertEqual(result, expected)
+
+        # The non-recursive listing keeps to the top-level directory.
+        self.assertEqual(sorted(self.processor.list_markdown_files(self.temp_dir)), ["test1", "test2"])
+
+    def test_read_files_concurrently_keeps_the_order_of_the_paths(self):
+        """
+        Tests that files come back in the order given even when earlier reads finish
+        last, and that a file that cannot be read is skipped.
+        """
+        class SlowFirstReadProcessor(MarkdownProcessor):
+            def read_markdown_file(self, file_path):
+                if file_path.endswith("file00.md"):
+                    time.sleep(0.2)
+                return super().read_markdown_file(file_path)
+
+        paths = []
+        for number in range(10):
+            full_path = os.path.join(self.temp_dir, f"file{number:02d}.md")
+            with open(full_path, "w") as f:
+                f.write(f"# File {number}")
+            paths.append((f"file{number:02d}", full_path))
+        paths.insert(5, ("missing", os.path.join(self.temp_dir, "missing.md")))
+
+        result = list(SlowFirstReadProcessor().read_files_concurrently(paths, max_workers=4))
+        self.assertEqual(result, [(f"file{number:02d}", f"# File {number}") for number in range(10)])
+
+    def test_stream_markdown_files_validates_the_path(self):
+        """
+        Tests that streaming raises the same errors as reading for invalid paths.
+        """
+        with self.assertRaises(FileNotFoundError):
+            self.processor.stream_markdown_files("non_existent_path_12345")
+
 
 # This allows the test to be run from the command line
 if __name__ == '__main__':
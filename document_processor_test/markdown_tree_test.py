@@ -0,0 +1,73 @@
+# test_markdown_tree.py
+
+import unittest
+import os
+import sys
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from document_processor.markdown_chunker import MarkdownChunker
+from document_processor.markdown_tree import iter_sections
+
+
+class TestMarkdownTree(unittest.TestCase):
+    """
+    Unit test suite for the header tree tokenizer and the chunks built from it.
+    """
+
+    def setUp(self):
+        self.content = (
+            "Intro text.\n"
+            "# Guide\n"
+            "Welcome.\n"
+            "## Setup ##\n"
+            "### Python\n"
+            "Install Python.\n"
+            "````bash\n"
+            "# not a header\n"
+            "```\n"
+            "## still code\n"
+            "````\n"
+            "#### venv\n"
+            "Create a venv.\n"
+            "## Usage\n"
+            "### Python\n"
+            "Run the script.\n"
+        )
+
+    def test_sections_nest_by_level_and_skip_code_fences(self):
+        """
+        Tests header levels, parents and that '#' lines inside a fence stay in the body.
+        """
+        sections = list(iter_sections(self.content.splitlines()))
+        self.assertEqual([(s.ordinal, s.level, s.name, s.parent) for s in sections], [
+            (0, 0, "Introduction", None), (1, 1, "Guide", None), (2, 2, "Setup", 1), (3, 3, "Python", 2),
+            (4, 4, "venv", 3), (5, 2, "Usage", 1), (6, 3, "Python", 5),
+        ])
+        self.assertIn("# not a header\n```\n## still code\n````", sections[3].body)
+        # An unclosed fence runs to the end of the file.
+        unclosed = list(iter_sections(["## A", "```", "# inside"]))
+        self.assertEqual([s.name for s in unclosed], ["Introduction", "A"])
+
+    def test_chunks_carry_section_paths_under_the_page_title(self):
+        """
+        Tests the hierarchical metadata of chunks; the page title is not part of the paths.
+        """
+        file_chunks = MarkdownChunker(chunk_size=500, chunk_overlap=0).chunk_file("guide", self.content)
+        self.assertEqual(file_chunks.page_title, "Guide")
+        self.assertEqual(
+            [(r.section_path, r.section_level, r.section_index, r.parent_section_index) for r in file_chunks.records],
+            [("Introduction", 0, 0, -1), ("Guide", 1, 1, -1), ("Setup > Python", 3, 3, 2),
+             ("Setup > Python > venv", 4, 4, 3), ("Usage > Python", 3, 6, 5)],
+        )
+        # Setup and Usage have no text of their own, so they have no chunks.
+        self.assertEqual(sorted(file_chunks.section_texts), [0, 1, 3, 4, 6])
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
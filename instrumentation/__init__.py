@@ -0,0 +1 @@
+# This file makes the instrumentation directory a Python package
@@ -0,0 +1,226 @@
+# metrics.py
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+# --- Metric names ---
+# Stage durations are recorded in one histogram family, labelled by stage:
+#   ingest: read, clean, split, embed, insert, index_build, delete, save, load
+#   query:  query, query_embed, vector_search, lexical_search, reconstruct
+STAGE_HISTOGRAM = "rag_stage_duration_seconds"
+METRIC_PREFIX = "rag_"
+
+# Upper bounds (seconds) of the latency buckets, from 100 µs to 30 s.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Help text of the counters the pipeline records; other names get a generic one.
+COUNTER_HELP = {
+    "files": "Markdown files read.",
+    "sections": "Sections parsed.",
+    "chunks": "Chunks produced by splitting.",
+    "vectors": "Vectors added to the FAISS index.",
+    "vectors_deleted": "Vectors deleted from the FAISS index.",
+    "queries": "Queries searched.",
+}
+
+
+class Histogram:
+    """
+    Counts observations into cumulative-style latency buckets, as Prometheus does.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf bucket; not cumulative until exported.
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> List[int]:
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by interpolating linearly inside the bucket it falls in.
+        Values in the +Inf bucket are reported as the largest finite bound.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Holds the counters and stage histograms of one process. All updates take a
+    lock, so stages timed on reader threads and the main thread can be mixed.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters: Dict[str, float] = {}
+        self.stages: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.stages.clear()
+
+    def snapshot(self) -> Dict:
+        """
+        Returns the counters and, per stage, the observation count, total and mean
+        time and estimated p50/p95/p99 latencies.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "stages": {
+                    stage: {
+                        "count": histogram.count,
+                        "total_seconds": histogram.sum,
+                        "mean_seconds": histogram.sum / histogram.count if histogram.count else 0.0,
+                        "p50_seconds": histogram.quantile(0.5),
+                        "p95_seconds": histogram.quantile(0.95),
+                        "p99_seconds": histogram.quantile(0.99),
+                    }
+                    for stage, histogram in sorted(self.stages.items())
+                },
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{METRIC_PREFIX}{name}_total"
+                lines.append(f"# HELP {metric} {COUNTER_HELP.get(name, f'Count of {name}.')}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {_format_value(value)}")
+            if self.stages:
+                lines.append(f"# HELP {STAGE_HISTOGRAM} Time spent in each pipeline stage.")
+                lines.append(f"# TYPE {STAGE_HISTOGRAM} histogram")
+            for stage, histogram in sorted(self.stages.items()):
+                bounds = [_format_value(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.cumulative_counts()):
+                    lines.append(f'{STAGE_HISTOGRAM}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{STAGE_HISTOGRAM}_sum{{stage="{stage}"}} {_format_value(histogram.sum)}')
+                lines.append(f'{STAGE_HISTOGRAM}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# --- Process-wide switch ---
+# Instrumentation is off by default. While it is off, stage() hands out one
+# shared no-op context manager and count() returns at once, so the calls left
+# in the pipeline cost a function call and a flag check each.
+REGISTRY = MetricsRegistry()
+_enabled = False
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> '_StageTimer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        REGISTRY.observe(self.stage, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name: str):
+    """
+    Times a block as one observation of the named stage:
+
+        with metrics.stage("embed"):
+            vectors = embeddings.embed_documents(texts)
+    """
+    return _StageTimer(name) if _enabled else _NULL_TIMER
+
+
+def count(name: str, amount: float = 1) -> None:
+    """
+    Adds to the named counter.
+    """
+    if _enabled:
+        REGISTRY.increment(name, amount)
+
+
+def write_metrics(file_path: str) -> None:
+    """
+    Writes the current metrics to a file, in the Prometheus text format if the
+    file name ends in .prom and as JSON otherwise.
+    """
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(REGISTRY.to_prometheus() if file_path.endswith('.prom') else REGISTRY.to_json())
@@ -0,0 +1,91 @@
+# test_metrics.py
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+import shutil
+
+# --- Fix for ModuleNotFoundError ---
+# This ensures the test script can find the project's modules.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.embedding_backends import HashingEmbedder
+from data_persistance.search_processor import SearchProcessor
+from instrumentation import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit test suite for the instrumentation layer.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        metrics.REGISTRY.reset()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.REGISTRY.reset()
+        shutil.rmtree(self.temp_dir)
+
+    def test_nothing_is_recorded_while_disabled(self):
+        """
+        Tests that disabled instrumentation hands out a shared no-op timer and records nothing.
+        """
+        self.assertIs(metrics.stage("embed"), metrics.stage("search"))
+        with metrics.stage("embed"):
+            metrics.count("chunks", 3)
+        self.assertEqual(metrics.REGISTRY.snapshot(), {"counters": {}, "stages": {}})
+
+    def test_histogram_buckets_and_quantiles(self):
+        """
+        Tests bucket placement (upper bounds are inclusive) and quantile interpolation.
+        """
+        histogram = metrics.Histogram(buckets=(1.0, 2.0, 4.0))
+        for value in (0.5, 1.0, 1.5, 3.0, 10.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative_counts(), [2, 3, 4, 5])
+        self.assertAlmostEqual(histogram.quantile(0.2), 0.5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.5)
+        self.assertEqual(histogram.quantile(1.0), 4.0)
+
+    def test_pipeline_stages_and_counts_are_exported(self):
+        """
+        Tests that an ingest and a query record every stage and count, in both export formats.
+        """
+        metrics.enable()
+        for name, content in {"guide": "# Guide\n\n## Setup\n\nInstall the package.\n\n## Usage\n\nRun it.",
+                              "faq": "## Questions\n\nWhy are sections reconstructed?"}.items():
+            with open(os.path.join(self.temp_dir, f"{name}.md"), "w") as f:
+                f.write(content)
+        manager = VectorStoreManager(chunk_size=60, chunk_overlap=20, embeddings=HashingEmbedder())
+        manager.process_directory_and_build_store(self.temp_dir)
+        searcher = SearchProcessor(manager.vector_store, manager.section_index)
+        searcher.retrieve_and_reconstruct_sections("How do I install it?", k=2)
+
+        snapshot = json.loads(metrics.REGISTRY.to_json())
+        self.assertEqual(snapshot["counters"], {"files": 2, "sections": 3, "chunks": 3, "vectors": 3, "queries": 1})
+        for stage in ("read", "clean", "split", "embed", "insert",
+                      "query", "query_embed", "vector_search", "reconstruct"):
+            self.assertGreaterEqual(snapshot["stages"][stage]["count"], 1, stage)
+        self.assertEqual(snapshot["stages"]["read"]["count"], 2)
+
+        exposition = metrics.REGISTRY.to_prometheus()
+        self.assertIn("# TYPE rag_chunks_total counter\nrag_chunks_total 3\n", exposition)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="embed",le="+Inf"} 1\n', exposition)
+        self.assertIn('rag_stage_duration_seconds_count{stage="query"} 1\n', exposition)
+
+        metrics_path = os.path.join(self.temp_dir, "metrics.prom")
+        metrics.write_metrics(metrics_path)
+        with open(metrics_path) as f:
+            self.assertEqual(f.read(), exposition)
+
+
+# This allows the test to be run from the command line
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
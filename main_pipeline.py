@@ -11,8 +11,8 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from data_persistance.document_persistance import VectorStoreManager
-from data_persistance.search_processor import SearchProcessor
+from data_persistance.search_processor import SEARCH_MODES, create_search_processor, parse_filter_args
+from instrumentation import metrics
 
 def run_pipeline():
     """
@@ -34,29 +34,218 @@ def run_pipeline():
         help="Number of top results to retrieve for each query.",
         default=2
     )
+    parser.add_argument(
+        '--index_path',
+        type=str,
+        help="Optional folder for the persisted vector store. It is loaded if present, otherwise built and saved there.",
+        default=None
+    )
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help="Rebuild the vector store from the input files even if a saved one exists at --index_path."
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help="Incrementally re-ingest new, changed and removed files into the saved store at --index_path."
+    )
+    parser.add_argument(
+        '--embedding_cache_dir',
+        type=str,
+        help="Optional folder for the on-disk chunk embedding cache, reused across rebuilds.",
+        default=None
+    )
+    parser.add_argument(
+        '--parse_workers',
+        type=int,
+        help="Number of processes used to clean and split markdown files (0 parses in-process).",
+        default=0
+    )
+    parser.add_argument(
+        '--chunk_unit',
+        type=str,
+        choices=("characters", "tokens"),
+        help="Size new chunks in characters, or in tokens of the embedding model's tokenizer "
+             "(whole sentences and paragraphs packed up to the model's limit).",
+        default="characters"
+    )
+    parser.add_argument(
+        '--chunk_size',
+        type=int,
+        help="Maximum chunk size in --chunk_unit. Defaults to 200 characters or the model's token limit.",
+        default=None
+    )
+    parser.add_argument(
+        '--chunk_overlap',
+        type=int,
+        help="Overlap between consecutive chunks in --chunk_unit. Defaults to 20 characters or 32 tokens.",
+        default=None
+    )
+    parser.add_argument(
+        '--dedup_threshold',
+        type=float,
+        help="Collapse chunks of a new store whose words overlap a stored chunk's by at least this "
+             "estimated Jaccard similarity (e.g. 0.8; 1.0 for exact copies) into one vector that lists "
+             "every location. Off by default.",
+        default=None
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        help="Split a new store into this many shards by file, built in parallel processes and "
+             "searched concurrently. Requires --index_path.",
+        default=1
+    )
+    parser.add_argument(
+        '--index_type',
+        type=str,
+        help="FAISS index built for a new store: flat (exact), ivf, hnsw or ivfpq.",
+        default="flat"
+    )
+    parser.add_argument(
+        '--nprobe',
+        type=int,
+        help="IVF buckets scanned per query (ivf and ivfpq stores).",
+        default=None
+    )
+    parser.add_argument(
+        '--ef_search',
+        type=int,
+        help="HNSW search frontier size (hnsw stores).",
+        default=None
+    )
+    parser.add_argument(
+        '--search_mode',
+        type=str,
+        choices=SEARCH_MODES,
+        help="Dense vector search, BM25 lexical search, or both fused (hybrid).",
+        default="vector"
+    )
+    parser.add_argument(
+        '--score_threshold',
+        type=float,
+        help="Drop chunks whose FAISS distance is past this value (the largest L2 distance kept), "
+             "so an irrelevant query returns nothing instead of k chunks. Not available in lexical mode.",
+        default=None
+    )
+    parser.add_argument(
+        '--adaptive_k',
+        action='store_true',
+        help="Return fewer than k chunks when their scores fall off, cutting each ranking at its "
+             "largest score gap."
+    )
+    parser.add_argument(
+        '--filter',
+        action='append',
+        metavar='FIELD=VALUE',
+        help="Only search chunks with this file_name, section_name, page_title or section_path "
+             "(a path such as 'Setup > Python' includes its subsections). Repeat for several.",
+        default=None
+    )
+    parser.add_argument(
+        '--serving_path',
+        type=str,
+        help="Optional folder to export the store to in the read-only, memory-mapped layout that "
+             "search_processor and query_service can serve from several processes.",
+        default=None
+    )
+    parser.add_argument(
+        '--metrics_out',
+        type=str,
+        help="Record per-stage timings and counters and write them to this file on exit "
+             "(Prometheus text format for a .prom file, JSON otherwise).",
+        default=None
+    )
     args = parser.parse_args()
+    try:
+        metadata_filter = parse_filter_args(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.score_threshold is not None and args.search_mode == "lexical":
+        parser.error("--score_threshold applies to vector distances; it cannot be used with lexical search.")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1.")
+    if args.shards > 1 and not args.index_path:
+        parser.error("--shards requires --index_path, where the shards are built.")
+    if args.shards > 1 and args.serving_path:
+        parser.error("--serving_path cannot export a sharded store.")
+    if args.metrics_out:
+        metrics.enable()
+
+    # The ingestion modules pull in LangChain and FAISS, which take about a second
+    # to import, so they are loaded only once the arguments have been accepted.
+    from data_persistance.ann_index import IndexConfig
+    from data_persistance.document_persistance import MANIFEST_FILE_NAME, VectorStoreManager
+    from data_persistance.sharded_store import ShardedStore
 
     try:
         # --- Step 1: Ingestion ---
-        print("--- Step 1: Building Vector Store ---")
-        print(f"Reading markdown files from: {args.input_path}")
+        has_saved_store = (
+            args.index_path is not None
+            and os.path.isfile(os.path.join(args.index_path, MANIFEST_FILE_NAME))
+        )
+        is_sharded = has_saved_store and "shards" in VectorStoreManager.read_manifest(args.index_path)
+        if has_saved_store and not args.rebuild:
+            print("--- Step 1: Loading Saved Vector Store ---")
+            print(f"Loading vector store from: {args.index_path}")
+            if is_sharded:
+                store = ShardedStore.load(args.index_path, embedding_cache_dir=args.embedding_cache_dir)
+            else:
+                store = VectorStoreManager.load_local(args.index_path, embedding_cache_dir=args.embedding_cache_dir)
+                store.parse_workers = args.parse_workers
+            if args.refresh:
+                print(f"Refreshing vector store from: {args.input_path}")
+                if is_sharded:
+                    report = store.update_from_directory(args.input_path)
+                    store.save(args.index_path)
+                else:
+                    report = store.update_store_from_directory(args.input_path)
+                    store.save_local(args.index_path)
+                print(", ".join(f"{len(files)} {status}" for status, files in report.items()))
+        else:
+            print("--- Step 1: Building Vector Store ---")
+            print(f"Reading markdown files from: {args.input_path}")
 
-        # Instantiate the manager and build the store in memory
-        ingestion_manager = VectorStoreManager()
-        ingestion_manager.process_directory_and_build_store(args.input_path)
+            # Instantiate the manager and build the store in memory
+            ingestion_manager = VectorStoreManager(
+                chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, chunk_unit=args.chunk_unit,
+                embedding_cache_dir=args.embedding_cache_dir, parse_workers=args.parse_workers,
+                index_config=IndexConfig(index_type=args.index_type), dedup_threshold=args.dedup_threshold
+            )
+            if args.shards > 1:
+                store = ingestion_manager.build_shards(args.input_path, args.index_path, args.shards)
+                print(f"Vector store saved to: {args.index_path} ({args.shards} shards)")
+            else:
+                ingestion_manager.process_directory_and_build_store(args.input_path)
+                store = ingestion_manager
+                if args.index_path:
+                    ingestion_manager.save_local(args.index_path)
+                    print(f"Vector store saved to: {args.index_path}")
 
+        managers = store.shards if hasattr(store, "shards") else [store]
         # Check if the vector store was created
-        if not ingestion_manager.vector_store:
+        if not any(manager.vector_store for manager in managers):
             print("Error: Vector store could not be built. Please check the input files.")
             sys.exit(1)
+        if args.serving_path:
+            if hasattr(store, "shards"):
+                print("Error: --serving_path cannot export a sharded store.")
+                sys.exit(1)
+            store.export_serving_store(args.serving_path)
+            print(f"Serving store exported to: {args.serving_path}")
+        for manager in managers:
+            if manager.vector_store is not None:
+                manager.set_search_params(nprobe=args.nprobe, ef_search=args.ef_search)
 
         print("--- Vector Store Built Successfully ---")
 
         # --- Step 2: Retrieval Setup ---
         print("\n--- Step 2: Initializing Search Processor ---")
 
-        # Pass the in-memory vector store directly to the SearchProcessor
-        searcher = SearchProcessor(ingestion_manager.vector_store)
+        # Pass the in-memory vector store (or its shards) directly to the search processor
+        searcher = create_search_processor(store, search_mode=args.search_mode,
+                                           score_threshold=args.score_threshold, adaptive_k=args.adaptive_k)
 
         print("--- Search Processor Ready ---")
 
@@ -70,7 +259,8 @@ def run_pipeline():
                 if not user_query:
                     continue
 
-                results = searcher.retrieve_and_reconstruct_sections(user_query, k=args.k)
+                results = searcher.retrieve_and_reconstruct_sections(user_query, k=args.k,
+                                                                     filter=metadata_filter)
 
                 print("\n--- Reconstructed Sections ---")
                 if not results:
@@ -87,6 +277,10 @@ def run_pipeline():
         print(f"\nAn error occurred: {e}")
         print("Please ensure the input path is a valid directory containing markdown files.")
         sys.exit(1)
+    finally:
+        if args.metrics_out:
+            metrics.write_metrics(args.metrics_out)
+            print(f"Metrics written to: {args.metrics_out}")
 
 if __name__ == '__main__':
     run_pipeline()
@@ -11,7 +11,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from data_persistance.document_persistance import VectorStoreManager
+from data_persistance.document_persistance import MANIFEST_FILE_NAME, VectorStoreManager
 from data_persistance.search_processor import SearchProcessor
 
 def add_custom_styling():
@@ -78,9 +78,20 @@ def admin_mode():
     # Use a form to prevent rerunning on every input change
     with st.form("doc_loader_form", clear_on_submit=True):
         doc_path = st.text_input("Enter the path to your markdown documents folder:")
+        index_path = st.text_input("Optional folder to load/save the vector store index:")
+        rebuild = st.checkbox("Rebuild the index even if a saved one exists")
         submitted = st.form_submit_button("Load Documents")
 
-        if submitted and doc_path:
+        has_saved_store = bool(index_path) and os.path.isfile(os.path.join(index_path, MANIFEST_FILE_NAME))
+        if submitted and has_saved_store and not rebuild:
+            with st.spinner(f"Loading saved vector store from '{index_path}'..."):
+                try:
+                    manager = VectorStoreManager.load_local(index_path)
+                    st.session_state.search_processor = SearchProcessor(manager.vector_store, manager.section_index)
+                    st.success("Saved vector store loaded and ready!")
+                except Exception as e:
+                    st.error(f"An error occurred while loading the saved vector store: {e}")
+        elif submitted and doc_path:
             if not os.path.isdir(doc_path):
                 st.error("The provided path is not a valid directory. Please try again.")
             else:
@@ -89,9 +100,11 @@ def admin_mode():
                         # 1. Build the vector store in memory
                         manager = VectorStoreManager()
                         manager.process_directory_and_build_store(doc_path)
+                        if index_path:
+                            manager.save_local(index_path)
 
                         # 2. Initialize the search processor and save to session state
-                        st.session_state.search_processor = SearchProcessor(manager.vector_store)
+                        st.session_state.search_processor = SearchProcessor(manager.vector_store, manager.section_index)
                         st.success("Documents loaded and vector store is ready!")
                     except Exception as e:
                         st.error(f"An error occurred during document processing: {e}")